@@ -0,0 +1,63 @@
+import copy
+
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .cache import get_user_cache
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication loading each user from the database at most once per JWT_USER_CACHE_TTL.
+
+    Authenticated requests are then answered without a query. Deactivating a
+    user or changing their password takes effect once the cached row expires.
+    """
+
+    def get_user(self, validated_token):
+        """Return the user of a validated token, from the user cache when possible."""
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        cache = get_user_cache()
+        user = cache.get(str(user_id))
+        if user is None:
+            # Also checks the user is active and the token is not revoked
+            user = super().get_user(validated_token)
+            cache.set(str(user_id), user)
+        elif api_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+            api_settings.REVOKE_TOKEN_CLAIM
+        ) != get_md5_hash_password(user.password):
+            raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+        # Requests must not share one mutable model instance
+        return copy.copy(user)
+
+
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """
+    Token pair serializer adding the claims read by stateless authentication.
+
+    ``JWTStatelessUserAuthentication`` builds ``request.user`` from the token
+    alone, so permission checks such as IsAdminUser need these claims. They
+    are only added when JWT_AUTH_MODE is "stateless". Access tokens refreshed
+    from a pair keep its claims, so revoking staff status takes effect only
+    once the refresh token expires (REFRESH_TOKEN_LIFETIME).
+    """
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        if settings.JWT_AUTH_MODE != "stateless":
+            return token
+        token["username"] = user.get_username()
+        token["is_staff"] = user.is_staff
+        token["is_superuser"] = user.is_superuser
+        return token
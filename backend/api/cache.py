@@ -0,0 +1,468 @@
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from datetime import date
+
+from django.conf import settings
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+CacheEntry = namedtuple("CacheEntry", ["value", "created_at"])
+
+
+class LRUCache:
+    """Thread-safe, size-bounded LRU cache with per-entry expiry."""
+
+    def __init__(self, maxsize=128, ttl=None, timer=time.time, stale_ttl=0):
+        """
+        Initialize the cache.
+
+        Args:
+            maxsize (int): Maximum number of entries kept before evicting the least recently used
+            ttl (float, optional): Seconds an entry stays valid, None to never expire
+            timer (callable): Clock returning the current time in seconds
+            stale_ttl (float): Extra seconds an expired entry is kept for get_stale
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.timer = timer
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_entry(self, key):
+        """
+        Return the CacheEntry stored for key, or None if missing or expired.
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and self.ttl is not None:
+                age = self.timer() - entry.created_at
+                if age >= self.ttl:
+                    if age >= self.ttl + self.stale_ttl:
+                        del self._data[key]
+                    entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def get(self, key, default=None):
+        """Return the cached value for key, or default."""
+        entry = self.get_entry(key)
+        return default if entry is None else entry.value
+
+    def get_stale(self, key, default=None):
+        """
+        Return the value for key even if it has expired, or default.
+
+        Entries are kept for ``stale_ttl`` seconds after they expire, as a last
+        resort when they cannot be recomputed. Counters are not updated.
+        """
+        with self._lock:
+            entry = self._data.get(key)
+        if entry is None:
+            return default
+        if self.ttl is not None and self.timer() - entry.created_at >= self.ttl + self.stale_ttl:
+            return default
+        return entry.value
+
+    def set(self, key, value, created_at=None):
+        """
+        Store value under key, evicting the least recently used entries if full.
+
+        Returns:
+            CacheEntry: The stored entry
+        """
+        entry = CacheEntry(value, self.timer() if created_at is None else created_at)
+        with self._lock:
+            self._data[key] = entry
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+        return entry
+
+    def delete(self, key):
+        """Remove key from the cache if present."""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def delete_prefix(self, prefix):
+        """Remove every key starting with prefix."""
+        with self._lock:
+            for key in [key for key in self._data if key.startswith(prefix)]:
+                del self._data[key]
+
+    def clear(self):
+        """Remove every entry and reset the counters."""
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        """Return size and hit/miss counters."""
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def __len__(self):
+        return len(self._data)
+
+
+class RefreshingCache:
+    """
+    Stale-while-revalidate cache in front of an expensive loader.
+
+    Fresh entries are served directly. Entries older than ``ttl`` but younger
+    than ``ttl + stale_ttl`` are still served while a background thread
+    reloads them; anything older is reloaded synchronously. Entries live in an
+    in-process LRU and, if ``backend`` names a Django cache, are also shared
+    through it so other workers can reuse them.
+    """
+
+    def __init__(self, name, ttl, stale_ttl=0, maxsize=16, backend=None, timer=time.time):
+        """
+        Initialize the cache.
+
+        Args:
+            name (str): Prefix for keys stored in the Django cache backend
+            ttl (float): Seconds an entry is considered fresh
+            stale_ttl (float): Extra seconds a stale entry may be served while refreshing
+            maxsize (int): Maximum number of entries kept in process
+            backend (str, optional): Alias of a Django cache from settings.CACHES
+            timer (callable): Clock returning the current time in seconds
+        """
+        self.name = name
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.backend = backend
+        self.timer = timer
+        self.local = LRUCache(maxsize=maxsize, ttl=ttl + stale_ttl, timer=timer)
+        self._refreshing = set()
+        self._refresh_lock = threading.Lock()
+        self._tasks = set()
+
+    def _backend_key(self, key):
+        return f"{self.name}:{key}"
+
+    def _get_from_backend(self, key):
+        if not self.backend:
+            return None
+        try:
+            stored = caches[self.backend].get(self._backend_key(key))
+        except Exception as e:
+            logger.warning(f"Error reading {self.name} from cache backend: {str(e)}")
+            return None
+        if stored is None:
+            return None
+        entry = CacheEntry(*stored)
+        if self.timer() - entry.created_at >= self.ttl + self.stale_ttl:
+            return None
+        return self.local.set(key, entry.value, created_at=entry.created_at)
+
+    def _store(self, key, value):
+        entry = self.local.set(key, value)
+        if self.backend:
+            try:
+                caches[self.backend].set(
+                    self._backend_key(key),
+                    tuple(entry),
+                    timeout=self.ttl + self.stale_ttl,
+                )
+            except Exception as e:
+                logger.warning(f"Error writing {self.name} to cache backend: {str(e)}")
+        return entry
+
+    def _lookup(self, key):
+        """
+        Find the entry for key.
+
+        Returns:
+            tuple: The entry (or None) and whether it needs a background refresh
+        """
+        entry = self.local.get_entry(key) or self._get_from_backend(key)
+        if entry is None:
+            return None, False
+        age = self.timer() - entry.created_at
+        if age < self.ttl:
+            return entry, False
+        if age < self.ttl + self.stale_ttl:
+            return entry, True
+        return None, False
+
+    def _start_refresh(self, key):
+        """Claim the refresh of key, returning False if one is already running."""
+        with self._refresh_lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def _end_refresh(self, key):
+        with self._refresh_lock:
+            self._refreshing.discard(key)
+
+    def get(self, key):
+        """Return the value for key, fresh or stale, without loading it; None if missing."""
+        entry, _ = self._lookup(key)
+        return None if entry is None else entry.value
+
+    def get_or_load(self, key, loader):
+        """
+        Return the entry for key, loading or refreshing it as needed.
+
+        Args:
+            key (str): Cache key
+            loader (callable): Zero-argument callable producing the value
+
+        Returns:
+            CacheEntry: The cached value and the time it was loaded
+        """
+        entry, stale = self._lookup(key)
+        if entry is None:
+            return self._store(key, loader())
+        if stale and self._start_refresh(key):
+            threading.Thread(
+                target=self._refresh, args=(key, loader), name=f"{self.name}-refresh", daemon=True
+            ).start()
+        return entry
+
+    async def aget_or_load(self, key, loader):
+        """
+        Asynchronous counterpart of get_or_load.
+
+        Args:
+            key (str): Cache key
+            loader (callable): Zero-argument coroutine function producing the value
+
+        Returns:
+            CacheEntry: The cached value and the time it was loaded
+        """
+        entry, stale = self._lookup(key)
+        if entry is None:
+            return self._store(key, await loader())
+        if stale and self._start_refresh(key):
+            task = asyncio.get_running_loop().create_task(self._arefresh(key, loader))
+            # Keep a reference so the task is not garbage collected mid-flight
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        return entry
+
+    def _refresh(self, key, loader):
+        try:
+            self._store(key, loader())
+        except Exception as e:
+            logger.error(f"Error refreshing {self.name} cache: {str(e)}")
+        finally:
+            self._end_refresh(key)
+
+    async def _arefresh(self, key, loader):
+        try:
+            self._store(key, await loader())
+        except Exception as e:
+            logger.error(f"Error refreshing {self.name} cache: {str(e)}")
+        finally:
+            self._end_refresh(key)
+
+    def invalidate(self, key=None):
+        """Drop key, or every entry when key is None, from both cache tiers."""
+        keys = list(self.local._data) if key is None else [key]
+        if key is None:
+            self.local.clear()
+        else:
+            self.local.delete(key)
+        if self.backend:
+            try:
+                caches[self.backend].delete_many([self._backend_key(k) for k in keys])
+            except Exception as e:
+                logger.warning(f"Error invalidating {self.name} in cache backend: {str(e)}")
+
+
+def _normalize_param(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, (list, tuple, set)):
+        return sorted({_normalize_param(item) for item in value})
+    return value
+
+
+def make_query_key(params, exclude=()):
+    """
+    Build a canonical cache key for validated search parameters.
+
+    Empty values are dropped, list filters are de-duplicated and sorted and
+    dates are rendered as ISO strings, so equivalent searches share a key.
+
+    Args:
+        params (dict): Validated SearchQuerySerializer data
+        exclude (iterable): Parameter names to leave out of the key
+
+    Returns:
+        str: Hex digest identifying the search
+    """
+    normalized = {}
+    for name, value in params.items():
+        if name in exclude or value is None or value == "" or value == []:
+            continue
+        normalized[name] = _normalize_param(value)
+    payload = json.dumps(normalized, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def _get_or_create(name, factory):
+    with _caches_lock:
+        cache = _caches.get(name)
+        if cache is None:
+            cache = _caches[name] = factory()
+        return cache
+
+
+def get_aggregations_cache():
+    """Return the process-wide cache for global aggregations."""
+    return _get_or_create(
+        "aggregations",
+        lambda: RefreshingCache(
+            "aggregations",
+            ttl=settings.AGGREGATIONS_CACHE_TTL,
+            stale_ttl=settings.AGGREGATIONS_CACHE_STALE_TTL,
+            backend=settings.AGGREGATIONS_CACHE_BACKEND or None,
+        ),
+    )
+
+
+def get_photographer_facet_cache():
+    """Return the process-wide cache of photographer facet pages."""
+    return _get_or_create(
+        "photographer_facet",
+        lambda: RefreshingCache(
+            "photographer_facet",
+            ttl=settings.PHOTOGRAPHER_FACET_CACHE_TTL,
+            stale_ttl=settings.PHOTOGRAPHER_FACET_CACHE_STALE_TTL,
+            maxsize=settings.PHOTOGRAPHER_FACET_CACHE_MAXSIZE,
+            backend=settings.AGGREGATIONS_CACHE_BACKEND or None,
+        ),
+    )
+
+
+def get_index_generation_cache():
+    """Return the process-wide cache of index generation markers."""
+    return _get_or_create(
+        "index_generation",
+        lambda: RefreshingCache(
+            "index_generation",
+            ttl=settings.INDEX_GENERATION_TTL,
+            # Outlive the stale search entries keyed on the marker
+            stale_ttl=settings.SEARCH_CACHE_STALE_TTL,
+            maxsize=4,
+        ),
+    )
+
+
+def get_search_cache():
+    """Return the process-wide cache of raw search responses."""
+    return _get_or_create(
+        "search",
+        lambda: LRUCache(
+            maxsize=settings.SEARCH_CACHE_MAXSIZE,
+            ttl=settings.SEARCH_CACHE_TTL,
+            stale_ttl=settings.SEARCH_CACHE_STALE_TTL,
+        ),
+    )
+
+
+def get_search_aggregations_cache():
+    """Return the process-wide cache of per-query aggregations for aggs=auto."""
+    return _get_or_create(
+        "search_aggregations",
+        lambda: LRUCache(
+            maxsize=settings.SEARCH_AGGREGATIONS_CACHE_MAXSIZE,
+            ttl=settings.SEARCH_AGGREGATIONS_CACHE_TTL,
+        ),
+    )
+
+
+def get_user_cache():
+    """Return the process-wide cache of authenticated users by id."""
+    return _get_or_create(
+        "users",
+        lambda: LRUCache(
+            maxsize=settings.JWT_USER_CACHE_MAXSIZE,
+            ttl=settings.JWT_USER_CACHE_TTL,
+        ),
+    )
+
+
+def get_media_cache():
+    """Return the process-wide cache of media documents by id."""
+    return _get_or_create(
+        "media",
+        lambda: LRUCache(
+            maxsize=settings.MEDIA_CACHE_MAXSIZE,
+            ttl=settings.MEDIA_CACHE_TTL,
+        ),
+    )
+
+
+def get_query_cache():
+    """Return the process-wide cache of compiled search query templates."""
+    return _get_or_create(
+        "queries",
+        lambda: LRUCache(maxsize=settings.QUERY_CACHE_MAXSIZE),
+    )
+
+
+def invalidate_search_cache(params=None):
+    """
+    Drop cached search results.
+
+    Args:
+        params (dict, optional): Validated search parameters to invalidate,
+            or None to drop every cached search
+    """
+    cache = get_search_cache()
+    if params is None:
+        cache.clear()
+        get_search_aggregations_cache().clear()
+    else:
+        key = make_query_key(params)
+        cache.delete(key)
+        # Entries stored under any index generation (see ElasticsearchService._generation_key)
+        cache.delete_prefix(f"{key}:")
+
+
+def get_cache_stats():
+    """Return size and hit/miss counters for every process-wide cache."""
+    with _caches_lock:
+        created = dict(_caches)
+    return {
+        name: (cache.local if isinstance(cache, RefreshingCache) else cache).stats()
+        for name, cache in created.items()
+    }
+
+
+def reset_caches():
+    """Forget every process-wide cache so they are rebuilt from settings."""
+    with _caches_lock:
+        _caches.clear()
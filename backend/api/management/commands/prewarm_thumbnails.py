@@ -0,0 +1,86 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.serializers import SearchQuerySerializer
+from api.services import ElasticsearchService
+from api.thumbnails import ThumbnailPrewarmer, get_thumbnail_cache, refs_from_hits
+
+
+class Command(BaseCommand):
+    help = "Pre-warm the local thumbnail cache for every hit of a search."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--query", default="", help="Full-text search query")
+        parser.add_argument("--db", action="append", default=[], help="Database filter, repeatable")
+        parser.add_argument(
+            "--photographer", action="append", default=[], help="Photographer filter, repeatable"
+        )
+        parser.add_argument("--date-from", help="Earliest date (YYYY-MM-DD)")
+        parser.add_argument("--date-to", help="Latest date (YYYY-MM-DD)")
+        parser.add_argument(
+            "--width", type=int, action="append", help="Width to produce, repeatable"
+        )
+        parser.add_argument("--batch-size", type=int, default=200, help="Hits fetched per batch")
+        parser.add_argument("--workers", type=int, default=8, help="Concurrent upstream fetches")
+        parser.add_argument("--limit", type=int, help="Stop after this many hits")
+
+    def handle(self, *args, **options):
+        data = {
+            "query": options["query"],
+            "db": options["db"],
+            "photographer": options["photographer"],
+            "fields": ["thumbnail_url"],
+        }
+        for name in ("date_from", "date_to"):
+            if options[name]:
+                data[name] = options[name]
+        serializer = SearchQuerySerializer(data=data)
+        if not serializer.is_valid():
+            raise CommandError(f"Invalid search: {serializer.errors}")
+
+        cache = get_thumbnail_cache()
+        widths = options["width"] or [cache.widths[0]]
+        unsupported = set(widths) - set(cache.widths)
+        if unsupported:
+            raise CommandError(f"Unsupported widths: {sorted(unsupported)}")
+        # Queue a whole batch at once; the command waits for each batch anyway
+        prewarmer = ThumbnailPrewarmer(
+            cache,
+            widths=widths,
+            max_workers=options["workers"],
+            max_pending=options["batch_size"] * len(widths),
+        )
+
+        hits_seen = 0
+        start = time.perf_counter()
+        batches = ElasticsearchService().iter_hit_batches(
+            serializer.validated_data, batch_size=options["batch_size"]
+        )
+        try:
+            for hits in batches:
+                if options["limit"] is not None:
+                    hits = hits[: options["limit"] - hits_seen]
+                batch_start = time.perf_counter()
+                before = prewarmer.stats()["warmed"]
+                prewarmer.warm(refs_from_hits(hits))
+                hits_seen += len(hits)
+                elapsed = time.perf_counter() - batch_start
+                warmed = prewarmer.stats()["warmed"] - before
+                self.stdout.write(
+                    f"{hits_seen} hits: warmed {warmed} in {elapsed:.2f}s "
+                    f"({warmed / elapsed if elapsed else 0:.1f} images/s)"
+                )
+                if options["limit"] is not None and hits_seen >= options["limit"]:
+                    break
+        finally:
+            batches.close()
+            prewarmer.close()
+
+        elapsed = time.perf_counter() - start
+        stats = prewarmer.stats()
+        self.stdout.write(self.style.SUCCESS(
+            f"Done: {hits_seen} hits in {elapsed:.2f}s, "
+            f"{stats['warmed']} warmed ({stats['warmed'] / elapsed if elapsed else 0:.1f} images/s), "
+            f"{stats['cached']} already cached, {stats['missing']} missing, {stats['failed']} failed"
+        ))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from api.search_templates import get_search_template_id, register_search_template
+from api.services import get_elasticsearch_client
+
+
+class Command(BaseCommand):
+    help = "Store the media search template in Elasticsearch. Safe to run on every deploy."
+
+    def handle(self, *args, **options):
+        template_id = get_search_template_id()
+        if register_search_template(get_elasticsearch_client()):
+            self.stdout.write(self.style.SUCCESS(f"Registered search template {template_id}"))
+        else:
+            self.stdout.write(f"Search template {template_id} is already registered")
@@ -0,0 +1,214 @@
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+from .cache import get_cache_stats
+from .resilience import CircuitBreaker, get_circuit_breaker
+from .timing import LATENCY_BUCKETS_MS
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = tuple(bound / 1000 for bound in LATENCY_BUCKETS_MS)
+RESULT_SIZE_BUCKETS = (0, 1, 5, 10, 20, 50, 100, 250, 500, 1000)
+RESPONSE_BYTES_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# Metrics are collected per process. Under a multi-worker server, set
+# PROMETHEUS_MULTIPROC_DIR to a directory shared by the workers (see
+# gunicorn.conf.py): each worker writes its samples there and /metrics
+# aggregates all of them, whichever worker serves the scrape.
+
+REQUESTS = Counter(
+    "api_requests_total", "API requests served", ["endpoint", "method", "status"]
+)
+REQUEST_LATENCY = Histogram(
+    "api_request_duration_seconds", "Total API request latency", ["endpoint"], buckets=LATENCY_BUCKETS
+)
+PHASE_LATENCY = Histogram(
+    "api_request_phase_duration_seconds",
+    "Time spent per phase of an API request (es, es-took, serialize, render, compress)",
+    ["endpoint", "phase"],
+    buckets=LATENCY_BUCKETS,
+)
+RESPONSE_BYTES = Histogram(
+    "api_response_bytes", "Size of API response bodies", ["endpoint"], buckets=RESPONSE_BYTES_BUCKETS
+)
+RESULT_SIZE = Histogram(
+    "api_search_results", "Hits returned per search page", ["endpoint"], buckets=RESULT_SIZE_BUCKETS
+)
+ES_REQUESTS = Counter(
+    "elasticsearch_requests_total", "Elasticsearch calls made", ["operation"]
+)
+ES_ERRORS = Counter(
+    "elasticsearch_errors_total", "Elasticsearch calls that failed", ["operation"]
+)
+ES_CIRCUIT_REJECTIONS = Counter(
+    "elasticsearch_circuit_rejections_total",
+    "Elasticsearch calls rejected because the circuit breaker was open",
+    ["operation"],
+)
+ES_HEDGED_REQUESTS = Counter(
+    "elasticsearch_hedged_requests_total", "Elasticsearch reads sent a second time", ["operation"]
+)
+ES_CIRCUIT_OPEN = Gauge(
+    "elasticsearch_circuit_open",
+    "Whether the Elasticsearch circuit breaker of any live worker is not closed",
+    multiprocess_mode="livemax",
+)
+COALESCED_CALLS = Counter(
+    "api_coalesced_calls_total", "Calls that waited for an identical call in flight", ["flight"]
+)
+CACHE_HITS = Counter("api_cache_hits_total", "Cache hits", ["cache"])
+CACHE_MISSES = Counter("api_cache_misses_total", "Cache misses", ["cache"])
+POOL_CONNECTIONS = Gauge(
+    "elasticsearch_pool_connections",
+    "Elasticsearch connection pool state, summed over live workers",
+    ["state"],
+    multiprocess_mode="livesum",
+)
+
+
+def observe_request(endpoint, method, status, phases, response_bytes=None):
+    """
+    Record a served API request.
+
+    Args:
+        endpoint (str): URL name of the endpoint
+        method (str): HTTP method
+        status (int): Response status code
+        phases (dict): Phase durations in milliseconds, including ``total``
+        response_bytes (int, optional): Body size, None for streamed responses
+    """
+    REQUESTS.labels(endpoint, method, str(status)).inc()
+    for phase, milliseconds in phases.items():
+        if phase == "total":
+            REQUEST_LATENCY.labels(endpoint).observe(milliseconds / 1000)
+        else:
+            PHASE_LATENCY.labels(endpoint, phase).observe(milliseconds / 1000)
+    if response_bytes is not None:
+        RESPONSE_BYTES.labels(endpoint).observe(response_bytes)
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        _publish_worker_state()
+
+
+def observe_result_size(endpoint, hits):
+    """Record the number of hits returned by a search page."""
+    RESULT_SIZE.labels(endpoint).observe(hits)
+
+
+def observe_es_call(operation, failed=False):
+    """Count an Elasticsearch call and whether it failed."""
+    ES_REQUESTS.labels(operation).inc()
+    if failed:
+        ES_ERRORS.labels(operation).inc()
+
+
+def observe_circuit_rejection(operation):
+    """Count an Elasticsearch call rejected by the open circuit breaker."""
+    ES_CIRCUIT_REJECTIONS.labels(operation).inc()
+
+
+def observe_hedged_call(operation):
+    """Count an Elasticsearch read sent a second time by hedging."""
+    ES_HEDGED_REQUESTS.labels(operation).inc()
+
+
+def observe_coalesced_call(flight):
+    """Count a call answered by an identical call already in flight."""
+    COALESCED_CALLS.labels(flight).inc()
+
+
+def _sync_worker_state():
+    """Copy the cache, connection pool and circuit breaker state into their metrics."""
+    _sync_cache_counters()
+    _update_pool_gauges()
+    _update_circuit_gauge()
+
+
+# Under multiple workers only the one serving a scrape runs render_metrics,
+# so the others publish their state from requests, at most this often
+_next_publish = 0.0
+
+
+def _publish_worker_state():
+    global _next_publish
+    now = time.monotonic()
+    if now < _next_publish:
+        return
+    _next_publish = now + settings.METRICS_WORKER_SYNC_INTERVAL
+    _sync_worker_state()
+
+
+def _update_circuit_gauge():
+    ES_CIRCUIT_OPEN.set(int(get_circuit_breaker().state != CircuitBreaker.CLOSED))
+
+
+# Cache counters already recorded, to turn the caches' totals into increments
+_cache_counts = {}
+_cache_counts_lock = threading.Lock()
+
+
+def _sync_cache_counters():
+    with _cache_counts_lock:
+        for name, stats in get_cache_stats().items():
+            last_hits, last_misses = _cache_counts.get(name, (0, 0))
+            # A cache rebuilt by reset_caches starts counting from zero again
+            if stats["hits"] < last_hits or stats["misses"] < last_misses:
+                last_hits = last_misses = 0
+            CACHE_HITS.labels(name).inc(stats["hits"] - last_hits)
+            CACHE_MISSES.labels(name).inc(stats["misses"] - last_misses)
+            _cache_counts[name] = (stats["hits"], stats["misses"])
+
+
+def _update_pool_gauges():
+    from .services import get_pool_stats
+
+    try:
+        pool_stats = get_pool_stats()
+    except Exception as e:
+        logger.warning(f"Error reading connection pool stats: {str(e)}")
+        return
+
+    totals = {"max": 0, "idle": 0, "active": 0}
+    for client in pool_stats["clients"].values():
+        for node in client["nodes"]:
+            idle = node.get("idle_connections") or 0
+            totals["max"] += node.get("maxsize") or 0
+            totals["idle"] += idle
+            if "active_connections" in node:
+                totals["active"] += node["active_connections"]
+            else:
+                # urllib3 pools only count created connections; the rest are checked out
+                totals["active"] += max((node.get("connections_created") or 0) - idle, 0)
+    for state, value in totals.items():
+        POOL_CONNECTIONS.labels(state).set(value)
+
+
+def render_metrics():
+    """
+    Render every metric in the Prometheus text format.
+
+    Returns:
+        tuple: The payload bytes and its content type
+    """
+    # Cache, pool and breaker state is read at scrape time, not per request
+    _sync_worker_state()
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,231 @@
+import json
+import logging
+import time
+import zlib
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; responses are then only gzipped
+    brotli = None
+
+from .metrics import observe_request
+from .timing import (
+    get_endpoint_latencies,
+    get_request_timings,
+    start_request_timings,
+    stop_request_timings,
+    timed,
+)
+
+logger = logging.getLogger(__name__)
+timing_logger = logging.getLogger("api.timing")
+
+
+class RequestTimingMiddleware:
+    """
+    Record where the time of each API request goes.
+
+    Phases recorded by the service and views (Elasticsearch round trips and
+    their ``took``, serialization) are completed with response rendering and
+    the total, then returned in a ``Server-Timing`` header, logged as one
+    JSON line and counted in the per-endpoint latency histograms and the
+    Prometheus metrics.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self._is_timed(request):
+            return self.get_response(request)
+        timings, token = start_request_timings()
+        try:
+            response = self.get_response(request)
+        finally:
+            stop_request_timings(token)
+        return self._finish(request, response, timings)
+
+    async def __acall__(self, request):
+        if not self._is_timed(request):
+            return await self.get_response(request)
+        timings, token = start_request_timings()
+        try:
+            response = await self.get_response(request)
+        finally:
+            stop_request_timings(token)
+        return self._finish(request, response, timings)
+
+    def _is_timed(self, request):
+        return settings.REQUEST_TIMING_ENABLED and request.path.startswith(settings.REQUEST_TIMING_PATH_PREFIX)
+
+    def process_template_response(self, request, response):
+        """Time the rendering of DRF responses, which happens after the view returns."""
+        timings = get_request_timings()
+        render_started = time.perf_counter()
+
+        def record_render(rendered):
+            if timings is not None:
+                timings.record("render", time.perf_counter() - render_started)
+
+        response.add_post_render_callback(record_render)
+        return response
+
+    def _finish(self, request, response, timings):
+        timings.record("total", timings.elapsed())
+        phases = timings.as_milliseconds()
+        response["Server-Timing"] = timings.server_timing()
+
+        match = getattr(request, "resolver_match", None)
+        endpoint = match.url_name if match is not None and match.url_name else "unresolved"
+        get_endpoint_latencies().observe(endpoint, phases)
+        if settings.METRICS_ENABLED:
+            # Metrics must never fail the request they describe
+            try:
+                observe_request(
+                    endpoint,
+                    request.method,
+                    response.status_code,
+                    phases,
+                    None if response.streaming else len(response.content),
+                )
+            except Exception as e:
+                logger.warning(f"Error recording metrics: {str(e)}")
+        timing_logger.info(json.dumps({
+            "event": "request",
+            "method": request.method,
+            "path": request.path,
+            "endpoint": endpoint,
+            "status": response.status_code,
+            "timings_ms": phases,
+        }))
+        return response
+
+
+# Content types worth compressing. HTML is left out: the browsable API
+# pages carry CSRF tokens, which compression would expose to BREACH.
+COMPRESSIBLE_CONTENT_TYPES = {
+    "application/json",
+    "application/x-ndjson",
+    "text/csv",
+    "text/plain",
+}
+
+
+def negotiate_encoding(accept_encoding):
+    """
+    Pick the content coding for a response from an Accept-Encoding header.
+
+    Brotli is preferred over gzip at equal quality, when it is installed.
+
+    Args:
+        accept_encoding (str): Value of the Accept-Encoding request header
+
+    Returns:
+        str: ``"br"`` or ``"gzip"``, or None to send the response as is
+    """
+    qualities = {}
+    for item in accept_encoding.split(","):
+        coding, *params = item.split(";")
+        quality = 1.0
+        for param in params:
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding.strip():
+            qualities[coding.strip().lower()] = quality
+
+    available = ("br", "gzip") if brotli is not None else ("gzip",)
+    best, best_quality = None, 0.0
+    for coding in available:
+        quality = qualities.get(coding, qualities.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+def _compressor(encoding):
+    """Return the ``(compress, finish)`` functions of a new compressor for encoding."""
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+        return compressor.process, compressor.finish
+    compressor = zlib.compressobj(settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress, compressor.flush
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Compress API responses with brotli or gzip, as negotiated with the client.
+
+    Responses smaller than ``COMPRESSION_MIN_SIZE`` bytes are sent as is,
+    since compressing them costs more time than it saves on the wire.
+    Streaming responses are compressed chunk by chunk as they are sent.
+    """
+
+    def process_response(self, request, response):
+        if not settings.COMPRESSION_ENABLED or response.has_header("Content-Encoding"):
+            return response
+        content_type = response.get("Content-Type", "").split(";")[0].strip().lower()
+        if content_type not in COMPRESSIBLE_CONTENT_TYPES:
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        if not response.streaming and len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+        encoding = negotiate_encoding(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = self._acompress_stream(response.streaming_content, encoding)
+            else:
+                response.streaming_content = self._compress_stream(response.streaming_content, encoding)
+            del response["Content-Length"]
+        else:
+            with timed("compress"):
+                compress, finish = _compressor(encoding)
+                compressed = compress(response.content) + finish()
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response["Content-Length"] = str(len(compressed))
+
+        # The body is no longer byte-for-byte what a strong ETag promised
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = "W/" + etag
+        response["Content-Encoding"] = encoding
+        return response
+
+    @staticmethod
+    def _compress_stream(chunks, encoding):
+        compress, finish = _compressor(encoding)
+        for chunk in chunks:
+            data = compress(chunk)
+            if data:
+                yield data
+        yield finish()
+
+    @staticmethod
+    async def _acompress_stream(chunks, encoding):
+        compress, finish = _compressor(encoding)
+        async for chunk in chunks:
+            data = compress(chunk)
+            if data:
+                yield data
+        yield finish()
@@ -0,0 +1,230 @@
+import json
+from collections import namedtuple
+from functools import lru_cache
+
+from .cache import get_query_cache
+from .serializers import get_source_includes
+
+# Per-query aggregations by the ``aggs`` search parameter
+SEARCH_AGGREGATIONS = {
+    "db_terms": {"terms": {"field": "db", "size": 10}},
+    "photographer_terms": {"terms": {"field": "fotografen", "size": 20}},
+}
+
+# Aggregation block added to the search body for each ``aggs`` mode
+AGGREGATIONS_BY_MODE = {
+    "full": SEARCH_AGGREGATIONS,
+    "auto": SEARCH_AGGREGATIONS,
+    "db": {"db_terms": SEARCH_AGGREGATIONS["db_terms"]},
+    "none": None,
+}
+
+# Map frontend sort fields to Elasticsearch fields
+SORT_FIELD_MAPPING = {
+    "date": "datum",
+    "photographer": "fotografen",
+    "id": "bildnummer",
+}
+
+MULTI_MATCH_FIELDS = ["suchtext^3", "fotografen^2"]
+
+# Name of the photographer source in the composite facet aggregation and its after keys
+PHOTOGRAPHER_FACET_SOURCE = "photographer"
+
+# A compiled search body without its per-page parts, and the same body
+# serialized to JSON with the closing brace left off so they can be appended
+CompiledQuery = namedtuple("CompiledQuery", ["body", "prefix"])
+
+
+@lru_cache(maxsize=64)
+def build_sort(sort_by=None, sort_order="desc"):
+    """
+    Build the sort clause for a sort field and order.
+
+    The result is shared between calls and must not be modified.
+
+    Args:
+        sort_by (str, optional): Frontend or Elasticsearch sort field, ``datum`` by default
+        sort_order (str): ``asc`` or ``desc``
+
+    Returns:
+        list: Elasticsearch sort clause
+    """
+    es_field = SORT_FIELD_MAPPING.get(sort_by or "datum", sort_by or "datum")
+    sort = [{es_field: {"order": sort_order}}]
+    # Tiebreaker so hits with equal sort values have a stable order for search_after
+    if es_field != "bildnummer":
+        sort.append({"bildnummer": {"order": sort_order}})
+    return sort
+
+
+def build_photographer_facet_query(size, after=None):
+    """
+    Build the body fetching one page of photographers with a composite aggregation.
+
+    Args:
+        size (int): Photographers per page
+        after (dict, optional): ``after_key`` of the previous page
+
+    Returns:
+        dict: Elasticsearch search body
+    """
+    composite = {
+        "size": size,
+        "sources": [{PHOTOGRAPHER_FACET_SOURCE: {"terms": {"field": "fotografen"}}}],
+    }
+    if after:
+        composite["after"] = after
+    return {"size": 0, "aggs": {"photographers": {"composite": composite}}}
+
+
+def _template_key(params):
+    """Return a hashable key of every parameter that shapes the search body except its position."""
+    date_from = params.get("date_from")
+    date_to = params.get("date_to")
+    return (
+        params.get("query") or None,
+        tuple(params.get("db") or ()),
+        date_from.isoformat() if date_from else None,
+        date_to.isoformat() if date_to else None,
+        tuple(params.get("photographer") or ()),
+        params.get("page_size", 20),
+        params.get("sort_by") or None,
+        params.get("sort_order", "desc"),
+        params.get("pagination") == "cursor",
+        params.get("aggs", "full"),
+        tuple(params.get("fields") or ()),
+    )
+
+
+def _build_filter(field, values):
+    if len(values) == 1:
+        # Use term query for single value
+        return {"term": {field: values[0]}}
+    # Use terms query for multiple values
+    return {"terms": {field: list(values)}}
+
+
+def build_template(params):
+    """
+    Build the search body for params without ``from`` or ``search_after``.
+
+    Args:
+        params (dict): Search parameters
+
+    Returns:
+        dict: Elasticsearch search body
+    """
+    query = {"bool": {"must": [], "filter": []}}
+
+    if params.get("query"):
+        query["bool"]["must"].append(
+            {
+                "multi_match": {
+                    "query": params["query"],
+                    "fields": MULTI_MATCH_FIELDS,
+                    "type": "best_fields",
+                    "operator": "and",
+                }
+            }
+        )
+
+    if params.get("db"):
+        query["bool"]["filter"].append(_build_filter("db", params["db"]))
+
+    if params.get("date_from") or params.get("date_to"):
+        date_range = {}
+        if params.get("date_from"):
+            date_range["gte"] = params["date_from"].isoformat()
+        if params.get("date_to"):
+            date_range["lte"] = params["date_to"].isoformat()
+        query["bool"]["filter"].append({"range": {"datum": date_range}})
+
+    if params.get("photographer"):
+        query["bool"]["filter"].append(_build_filter("fotografen", params["photographer"]))
+
+    body = {
+        "query": query,
+        "size": params.get("page_size", 20),
+        "sort": build_sort(params.get("sort_by") or None, params.get("sort_order", "desc")),
+        "_source": {"includes": get_source_includes(params.get("fields"))},
+    }
+
+    aggregations = AGGREGATIONS_BY_MODE.get(params.get("aggs", "full"))
+    if aggregations is not None:
+        body["aggs"] = aggregations
+
+    return body
+
+
+def compile_template(params):
+    """
+    Return the compiled template for params, building it on first use.
+
+    Templates are memoized in the process-wide query cache, so searches
+    differing only in page or cursor position share one.
+
+    Args:
+        params (dict): Search parameters
+
+    Returns:
+        CompiledQuery: The shared template body and its serialized prefix
+    """
+    cache = get_query_cache()
+    key = _template_key(params)
+    compiled = cache.get(key)
+    if compiled is None:
+        body = build_template(params)
+        prefix = json.dumps(body, separators=(",", ":"), ensure_ascii=False).encode("utf-8")[:-1]
+        compiled = cache.set(key, CompiledQuery(body, prefix)).value
+    return compiled
+
+
+def _position(params):
+    """Return the per-page body fields of params."""
+    if params.get("pagination") == "cursor":
+        # Cursor mode continues after the last hit instead of skipping hits
+        if params.get("cursor"):
+            return {"search_after": params["cursor"]["after"]}
+        return {}
+    return {"from": (params.get("page", 1) - 1) * params.get("page_size", 20)}
+
+
+def compile_search_query(params):
+    """
+    Build the Elasticsearch search body for params.
+
+    The returned dict is a fresh top level over shared nested parts: callers
+    may add or replace top-level keys but must not modify nested values.
+
+    Args:
+        params (dict): Search parameters
+
+    Returns:
+        dict: Elasticsearch search body
+    """
+    body = dict(compile_template(params).body)
+    body.update(_position(params))
+    return body
+
+
+def compile_search_query_bytes(params, **extra):
+    """
+    Build the Elasticsearch search body for params as JSON bytes.
+
+    Only the per-page fields and extra are serialized per call; the rest
+    comes pre-serialized from the compiled template.
+
+    Args:
+        params (dict): Search parameters
+        **extra: Additional top-level body fields, e.g. ``pit``
+
+    Returns:
+        bytes: UTF-8 encoded JSON search body
+    """
+    parts = [compile_template(params).prefix]
+    for name, value in {**_position(params), **extra}.items():
+        parts.append(b',"' + name.encode("utf-8") + b'":')
+        parts.append(json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode("utf-8"))
+    parts.append(b"}")
+    return b"".join(parts)
@@ -0,0 +1,74 @@
+import orjson
+from django.http import HttpResponse
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+# Types orjson does not know (Decimal, lazy translations, querysets) and
+# datetimes, passed through so they are formatted exactly as DRF does
+_fallback = JSONEncoder().default
+_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+
+def dumps(data, indent=False):
+    """
+    Serialize data to JSON bytes with orjson, falling back to DRF's encoder.
+
+    Args:
+        data: Data to serialize
+        indent (bool): Indent the output by two spaces
+
+    Returns:
+        bytes: UTF-8 encoded JSON
+    """
+    options = _OPTIONS | orjson.OPT_INDENT_2 if indent else _OPTIONS
+    return orjson.dumps(data, default=_fallback, option=options)
+
+
+class ORJSONRenderer(BaseRenderer):
+    """
+    Drop-in replacement for DRF's JSONRenderer serializing with orjson.
+
+    Output is compact UTF-8, unless the client asks for an indented
+    response with an ``indent`` media type parameter.
+    """
+
+    media_type = "application/json"
+    format = "json"
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Render data into JSON bytes."""
+        if data is None:
+            return b""
+        indent = None
+        if accepted_media_type:
+            indent = dict(
+                param.strip().split("=", 1) for param in accepted_media_type.split(";")[1:] if "=" in param
+            ).get("indent")
+        if indent is None and renderer_context:
+            indent = renderer_context.get("indent")
+        return dumps(data, indent=bool(indent and indent != "0"))
+
+
+class ORJSONParser(BaseParser):
+    """Parse JSON request bodies with orjson."""
+
+    media_type = "application/json"
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        """Parse the incoming bytestream as JSON."""
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f"JSON parse error - {str(exc)}")
+
+
+class ORJSONResponse(HttpResponse):
+    """Counterpart of Django's JsonResponse serializing with orjson, for plain views."""
+
+    def __init__(self, data, **kwargs):
+        kwargs.setdefault("content_type", "application/json")
+        super().__init__(content=dumps(data), **kwargs)
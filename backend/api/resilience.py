@@ -0,0 +1,358 @@
+import asyncio
+import contextvars
+import logging
+import math
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+
+from django.conf import settings
+from elasticsearch import ApiError, ConnectionError, ConnectionTimeout
+
+logger = logging.getLogger(__name__)
+
+
+class ElasticsearchUnavailable(Exception):
+    """
+    Elasticsearch cannot answer right now: it timed out, is unreachable or overloaded.
+
+    Attributes:
+        retry_after (int): Seconds after which retrying may succeed
+    """
+
+    def __init__(self, message, retry_after=1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(ElasticsearchUnavailable):
+    """The circuit breaker is open, so the call was not sent."""
+
+
+class DeadlineExceeded(ElasticsearchUnavailable):
+    """The deadline budget ran out before Elasticsearch answered."""
+
+
+def is_unavailable_error(error):
+    """Return whether error means the cluster is unreachable, too slow or overloaded."""
+    if isinstance(error, (ElasticsearchUnavailable, ConnectionError, ConnectionTimeout)):
+        return True
+    if isinstance(error, ApiError):
+        return error.status_code == 429 or error.status_code >= 500
+    return False
+
+
+def is_retryable_error(error):
+    """
+    Return whether a failed attempt may be sent again within the deadline budget.
+
+    Connection failures and the statuses in ELASTICSEARCH_RETRY_ON_STATUS are
+    retried, and timeouts if ELASTICSEARCH_RETRY_ON_TIMEOUT is set. An attempt
+    gets what is left of the budget, so a timed-out attempt inside
+    deadline_budget leaves nothing to retry with.
+    """
+    if isinstance(error, ConnectionError):
+        return True
+    if isinstance(error, ConnectionTimeout):
+        return settings.ELASTICSEARCH_RETRY_ON_TIMEOUT
+    return isinstance(error, ApiError) and error.status_code in settings.ELASTICSEARCH_RETRY_ON_STATUS
+
+
+class CircuitBreaker:
+    """
+    Thread-safe circuit breaker in front of the Elasticsearch cluster.
+
+    Closed, calls go through and consecutive failures are counted. Once
+    ``failure_threshold`` is reached the circuit opens and every call is
+    rejected for ``reset_timeout`` seconds. Then it turns half-open and lets
+    ``half_open_max_calls`` probes through: a successful probe closes the
+    circuit, a failed one opens it again. A probe that has neither succeeded
+    nor failed after ``reset_timeout`` seconds counts as failed, so a lost
+    probe cannot keep the circuit half-open for good.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, half_open_max_calls=1, timer=time.monotonic):
+        """
+        Initialize the breaker.
+
+        Args:
+            failure_threshold (int): Consecutive failures that open the circuit
+            reset_timeout (float): Seconds the circuit stays open before probing
+            half_open_max_calls (int): Probes allowed at once while half-open
+            timer (callable): Monotonic clock returning seconds
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.timer = timer
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.probes = 0
+        self.probe_started_at = None
+        self.times_opened = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Return whether a call may be sent now, claiming a probe slot if half-open."""
+        with self._lock:
+            if self.state == self.OPEN:
+                if self.timer() - self.opened_at < self.reset_timeout:
+                    self.rejected += 1
+                    return False
+                self.state = self.HALF_OPEN
+                self.probes = 0
+                logger.info("Elasticsearch circuit half-open, probing the cluster")
+            if self.state == self.HALF_OPEN:
+                if self.probes >= self.half_open_max_calls:
+                    if self.timer() - self.probe_started_at >= self.reset_timeout:
+                        self._open()
+                    self.rejected += 1
+                    return False
+                self.probes += 1
+                self.probe_started_at = self.timer()
+            return True
+
+    def release(self):
+        """Give back the probe slot of an admitted call that ended without an outcome, e.g. cancelled."""
+        with self._lock:
+            if self.state == self.HALF_OPEN and self.probes > 0:
+                self.probes -= 1
+
+    def record_success(self):
+        """Record a call the cluster answered, closing the circuit."""
+        with self._lock:
+            self.failures = 0
+            if self.state != self.CLOSED:
+                logger.info("Elasticsearch circuit closed")
+                self.state = self.CLOSED
+
+    def record_failure(self):
+        """Record a call that failed because the cluster is unavailable."""
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self._open()
+
+    def _open(self):
+        """Open the circuit; the lock must be held."""
+        if self.state != self.OPEN:
+            self.times_opened += 1
+            logger.warning(
+                f"Elasticsearch circuit opened after {self.failures} failures, "
+                f"rejecting calls for {self.reset_timeout}s"
+            )
+        self.state = self.OPEN
+        self.opened_at = self.timer()
+
+    def retry_after(self):
+        """Return the whole seconds until the circuit lets a probe through."""
+        with self._lock:
+            if self.state != self.OPEN:
+                return 1
+            remaining = self.reset_timeout - (self.timer() - self.opened_at)
+            return max(int(math.ceil(remaining)), 1)
+
+    def before_call(self):
+        """
+        Admit a call or reject it.
+
+        Raises:
+            CircuitOpenError: If the circuit is open
+        """
+        if not self.allow():
+            raise CircuitOpenError("Elasticsearch circuit is open", retry_after=self.retry_after())
+
+    def after_call(self, error=None):
+        """
+        Record the outcome of an admitted call.
+
+        Errors that do not mean the cluster is unavailable, such as a bad
+        request, count as answers.
+
+        Args:
+            error (Exception, optional): What the call raised, None on success
+
+        Returns:
+            bool: Whether error was counted as a failure
+        """
+        if error is not None and is_unavailable_error(error):
+            self.record_failure()
+            return True
+        self.record_success()
+        return False
+
+    def stats(self):
+        """Return the state and counters of the breaker."""
+        with self._lock:
+            return {
+                "state": self.state,
+                "failures": self.failures,
+                "times_opened": self.times_opened,
+                "rejected": self.rejected,
+            }
+
+
+class _DisabledCircuitBreaker(CircuitBreaker):
+    """Breaker that admits every call, used when the breaker is switched off."""
+
+    def allow(self):
+        return True
+
+    def record_failure(self):
+        pass
+
+
+_breaker = None
+_breaker_lock = threading.Lock()
+
+
+def get_circuit_breaker():
+    """Return the process-wide circuit breaker of the Elasticsearch cluster."""
+    global _breaker
+    with _breaker_lock:
+        if _breaker is None:
+            breaker_class = (
+                CircuitBreaker if settings.ELASTICSEARCH_CIRCUIT_BREAKER_ENABLED else _DisabledCircuitBreaker
+            )
+            _breaker = breaker_class(
+                failure_threshold=settings.ELASTICSEARCH_CIRCUIT_FAILURE_THRESHOLD,
+                reset_timeout=settings.ELASTICSEARCH_CIRCUIT_RESET_TIMEOUT,
+            )
+        return _breaker
+
+
+def reset_circuit_breaker():
+    """Forget the process-wide breaker so it is rebuilt closed from settings."""
+    global _breaker
+    with _breaker_lock:
+        _breaker = None
+
+
+_deadline = contextvars.ContextVar("elasticsearch_deadline", default=None)
+
+
+@contextmanager
+def deadline_budget(seconds=None):
+    """
+    Give the Elasticsearch calls made in the block seconds in total.
+
+    Args:
+        seconds (float, optional): The budget, ELASTICSEARCH_DEADLINE_BUDGET by default
+    """
+    if seconds is None:
+        seconds = settings.ELASTICSEARCH_DEADLINE_BUDGET
+    token = _deadline.set(time.monotonic() + seconds)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining_budget():
+    """
+    Return the seconds the next Elasticsearch call may take.
+
+    Inside deadline_budget this is what is left of the block's budget,
+    elsewhere every call gets the full ELASTICSEARCH_DEADLINE_BUDGET.
+    """
+    deadline = _deadline.get()
+    if deadline is None:
+        return settings.ELASTICSEARCH_DEADLINE_BUDGET
+    return deadline - time.monotonic()
+
+
+_hedge_executor = None
+_hedge_lock = threading.Lock()
+
+
+def _get_hedge_executor():
+    global _hedge_executor
+    with _hedge_lock:
+        if _hedge_executor is None:
+            _hedge_executor = ThreadPoolExecutor(
+                max_workers=settings.ELASTICSEARCH_HEDGE_WORKERS, thread_name_prefix="es-hedge"
+            )
+        return _hedge_executor
+
+
+def hedged_call(call, delay, timeout, on_hedge=None):
+    """
+    Run call, and a second copy of it if the first is still running after delay.
+
+    The first copy to succeed wins; the loser finishes in the background and
+    its result is dropped. Only use this for idempotent reads.
+
+    Args:
+        call (callable): Zero-argument callable sending the request
+        delay (float): Seconds to wait before sending the second copy
+        timeout (float): Seconds to wait for an answer in total
+        on_hedge (callable, optional): Called when the second copy is sent
+
+    Returns:
+        The result of the first successful copy
+
+    Raises:
+        DeadlineExceeded: If no copy answered within timeout
+        Exception: The error of the first copy if both failed
+    """
+    executor = _get_hedge_executor()
+    deadline = time.monotonic() + timeout
+    pending = {executor.submit(call)}
+    done, _ = wait(pending, timeout=min(delay, timeout))
+    if not done:
+        if on_hedge is not None:
+            on_hedge()
+        pending.add(executor.submit(call))
+    errors = []
+    while pending:
+        done, pending = wait(pending, timeout=max(deadline - time.monotonic(), 0), return_when=FIRST_COMPLETED)
+        if not done:
+            raise DeadlineExceeded(f"No answer from Elasticsearch within {timeout:.2f}s")
+        for future in done:
+            if future.exception() is None:
+                return future.result()
+            errors.append(future.exception())
+    raise errors[0]
+
+
+async def ahedged_call(call, delay, timeout, on_hedge=None):
+    """
+    Asynchronous counterpart of hedged_call; the losing copy is cancelled.
+
+    Args:
+        call (callable): Zero-argument callable returning a coroutine
+        delay (float): Seconds to wait before sending the second copy
+        timeout (float): Seconds to wait for an answer in total
+        on_hedge (callable, optional): Called when the second copy is sent
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    pending = {asyncio.ensure_future(call())}
+    try:
+        done, _ = await asyncio.wait(pending, timeout=min(delay, timeout))
+        if not done:
+            if on_hedge is not None:
+                on_hedge()
+            pending.add(asyncio.ensure_future(call()))
+        errors = []
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, timeout=max(deadline - loop.time(), 0), return_when=asyncio.FIRST_COMPLETED
+            )
+            if not done:
+                raise DeadlineExceeded(f"No answer from Elasticsearch within {timeout:.2f}s")
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                errors.append(task.exception())
+        raise errors[0]
+    finally:
+        for task in pending:
+            task.cancel()
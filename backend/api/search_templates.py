@@ -0,0 +1,148 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+
+from django.conf import settings
+from elasticsearch import NotFoundError
+
+from .queries import AGGREGATIONS_BY_MODE, MULTI_MATCH_FIELDS, build_sort
+from .serializers import get_source_includes
+
+logger = logging.getLogger(__name__)
+
+
+def _json(value):
+    return json.dumps(value, separators=(",", ":"))
+
+
+# Mustache source of the media search. Optional clauses are switched on by
+# boolean parameters; every filter ends with a comma, closed off by match_all.
+SEARCH_TEMPLATE_SOURCE = (
+    '{"query":{"bool":{'
+    '"must":['
+    '{{#has_query}}{"multi_match":{"query":{{#toJson}}query{{/toJson}},'
+    '"fields":' + _json(MULTI_MATCH_FIELDS) + ',"type":"best_fields","operator":"and"}}{{/has_query}}'
+    '],'
+    '"filter":['
+    '{{#has_db}}{"terms":{"db":{{#toJson}}db{{/toJson}}}},{{/has_db}}'
+    '{{#has_date_from}}{"range":{"datum":{"gte":{{#toJson}}date_from{{/toJson}}}}},{{/has_date_from}}'
+    '{{#has_date_to}}{"range":{"datum":{"lte":{{#toJson}}date_to{{/toJson}}}}},{{/has_date_to}}'
+    '{{#has_photographer}}{"terms":{"fotografen":{{#toJson}}photographer{{/toJson}}}},{{/has_photographer}}'
+    '{"match_all":{}}'
+    ']}},'
+    '{{#aggs_full}}"aggs":' + _json(AGGREGATIONS_BY_MODE["full"]) + ',{{/aggs_full}}'
+    '{{#aggs_db}}"aggs":' + _json(AGGREGATIONS_BY_MODE["db"]) + ',{{/aggs_db}}'
+    '"sort":{{#toJson}}sort{{/toJson}},'
+    '"_source":{"includes":{{#toJson}}includes{{/toJson}}},'
+    '"size":{{size}},'
+    '"from":{{from}}'
+    '}'
+)
+
+
+def get_search_template_id():
+    """
+    Return the stored script id of the search template.
+
+    The id ends with a hash of the source, so a changed template is stored
+    under a new id and workers still running the old code keep theirs.
+    """
+    digest = hashlib.sha1(SEARCH_TEMPLATE_SOURCE.encode("utf-8")).hexdigest()[:12]
+    return f"{settings.ELASTICSEARCH_SEARCH_TEMPLATE_PREFIX}-{digest}"
+
+
+def build_template_params(params):
+    """
+    Build the search template parameters for page-mode search parameters.
+
+    Args:
+        params (dict): Search parameters
+
+    Returns:
+        dict: Parameters for SEARCH_TEMPLATE_SOURCE
+    """
+    page_size = params.get("page_size", 20)
+    aggs = params.get("aggs", "full")
+    template_params = {
+        "sort": build_sort(params.get("sort_by") or None, params.get("sort_order", "desc")),
+        "includes": get_source_includes(params.get("fields")),
+        "size": page_size,
+        "from": (params.get("page", 1) - 1) * page_size,
+    }
+    if params.get("query"):
+        template_params["has_query"] = True
+        template_params["query"] = params["query"]
+    if params.get("db"):
+        template_params["has_db"] = True
+        template_params["db"] = list(params["db"])
+    if params.get("photographer"):
+        template_params["has_photographer"] = True
+        template_params["photographer"] = list(params["photographer"])
+    if params.get("date_from"):
+        template_params["has_date_from"] = True
+        template_params["date_from"] = params["date_from"].isoformat()
+    if params.get("date_to"):
+        template_params["has_date_to"] = True
+        template_params["date_to"] = params["date_to"].isoformat()
+    if aggs in ("full", "auto"):
+        template_params["aggs_full"] = True
+    elif aggs == "db":
+        template_params["aggs_db"] = True
+    return template_params
+
+
+def register_search_template(client):
+    """
+    Store the search template in the cluster unless it is already there.
+
+    Args:
+        client (Elasticsearch): Client of the target cluster
+
+    Returns:
+        bool: Whether the template was stored, False if it already existed
+    """
+    template_id = get_search_template_id()
+    try:
+        stored = client.get_script(id=template_id)
+        if stored.get("script", {}).get("source") == SEARCH_TEMPLATE_SOURCE:
+            return False
+    except NotFoundError:
+        pass
+    client.put_script(id=template_id, script={"lang": "mustache", "source": SEARCH_TEMPLATE_SOURCE})
+    mark_search_template_available()
+    return True
+
+
+def is_missing_template_error(error):
+    """Return whether a NotFoundError means the stored template does not exist."""
+    return getattr(error, "message", None) == "resource_not_found_exception"
+
+
+# Until this time searches skip the template after finding it missing
+_missing_until = 0.0
+_missing_lock = threading.Lock()
+
+
+def use_search_template():
+    """Return whether searches should currently be sent through the template."""
+    return settings.ELASTICSEARCH_SEARCH_TEMPLATES and time.monotonic() >= _missing_until
+
+
+def mark_search_template_missing():
+    """Fall back to inline bodies for a while after the template was not found."""
+    global _missing_until
+    with _missing_lock:
+        _missing_until = time.monotonic() + settings.ELASTICSEARCH_SEARCH_TEMPLATE_RETRY_INTERVAL
+    logger.warning(
+        f"Search template {get_search_template_id()} is missing, sending inline queries; "
+        "run manage.py register_search_templates"
+    )
+
+
+def mark_search_template_available():
+    """Send searches through the template again."""
+    global _missing_until
+    with _missing_lock:
+        _missing_until = 0.0
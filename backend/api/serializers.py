@@ -1,6 +1,25 @@
+from django.conf import settings
+from django.utils import timezone
 from rest_framework import serializers
 
-from api.utils import get_media_url
+from api.utils import decode_cursor, get_media_url
+
+# Public media field name -> Elasticsearch _source field, in response order.
+# Mirrors MediaSourceSerializer.to_representation for the fast path below.
+MEDIA_SOURCE_FIELDS = (
+    ("image_number", "bildnummer", str),
+    ("date", "datum", None),
+    ("search_text", "suchtext", str),
+    ("photographers", "fotografen", str),
+    ("height", "hoehe", int),
+    ("width", "breite", int),
+    ("database", "db", str),
+)
+
+# thumbnail_url is computed from these _source fields
+THUMBNAIL_SOURCE_FIELDS = ("db", "bildnummer")
+
+MEDIA_FIELDS = tuple(name for name, _, _ in MEDIA_SOURCE_FIELDS) + ("thumbnail_url",)
 
 
 class SearchQuerySerializer(serializers.Serializer):
@@ -27,6 +46,55 @@ class SearchQuerySerializer(serializers.Serializer):
         default=list,
         allow_empty=True
     )
+    pagination = serializers.ChoiceField(
+        choices=["page", "cursor"], default="page", required=False
+    )
+    cursor = serializers.CharField(required=False)
+    aggs = serializers.ChoiceField(
+        choices=["full", "db", "none", "auto"], default="full", required=False
+    )
+    fields = serializers.ListField(
+        child=serializers.CharField(),
+        required=False,
+        default=list,
+        allow_empty=True
+    )
+
+    def validate_fields(self, value):
+        """Accept repeated or comma-separated public media field names."""
+        fields = []
+        for item in value:
+            for name in item.split(","):
+                name = name.strip()
+                if not name:
+                    continue
+                if name not in MEDIA_FIELDS:
+                    raise serializers.ValidationError(
+                        f"Unknown field '{name}'. Choose from: {', '.join(MEDIA_FIELDS)}."
+                    )
+                if name not in fields:
+                    fields.append(name)
+        return fields
+
+    def validate_cursor(self, value):
+        """Decode the opaque cursor token returned by a previous cursor-mode search."""
+        try:
+            cursor = decode_cursor(value)
+        except ValueError:
+            raise serializers.ValidationError("Invalid cursor.")
+        if not {"pit", "after", "key"} <= cursor.keys():
+            raise serializers.ValidationError("Invalid cursor.")
+        return cursor
+
+    def validate(self, attrs):
+        if attrs.get("cursor"):
+            attrs["pagination"] = "cursor"
+        elif attrs.get("pagination", "page") == "page":
+            if attrs.get("page", 1) * attrs.get("page_size", 20) > settings.ELASTICSEARCH_MAX_RESULT_WINDOW:
+                raise serializers.ValidationError(
+                    {"page": "Page is too deep for page-number pagination, use pagination=cursor."}
+                )
+        return attrs
 
 
 class MediaSourceSerializer(serializers.Serializer):
@@ -83,6 +151,7 @@ class ElasticsearchResponseSerializer(serializers.Serializer):
     total = serializers.IntegerField()
     results = ElasticsearchHitSerializer(many=True)
     aggregations = serializers.DictField(required=False)
+    next_cursor = serializers.CharField(required=False, allow_null=True)
 
 
 class AggregationBucketSerializer(serializers.Serializer):
@@ -100,3 +169,209 @@ class GlobalAggregationsSerializer(serializers.Serializer):
     """Serializer for global aggregations response."""
     db_terms = AggregationTermsSerializer(required=False)
     photographer_terms = AggregationTermsSerializer(required=False)
+
+
+# Stored fields of MediaSourceSerializer, i.e. everything the API reads from _source
+SOURCE_INCLUDES = tuple(
+    name for name, field in MediaSourceSerializer().fields.items() if not field.read_only
+)
+
+_datetime_field = serializers.DateTimeField()
+
+
+def _render_datetime(value, utc):
+    """Render an Elasticsearch date the way DRF's DateTimeField would."""
+    if value is None:
+        return None
+    # Naive ISO timestamps in a UTC project only need the "Z" suffix
+    if utc and isinstance(value, str) and len(value) == 19 and value[10] == "T":
+        return value + "Z"
+    try:
+        return _datetime_field.to_representation(_datetime_field.to_internal_value(value))
+    except serializers.ValidationError:
+        return value
+
+
+def get_source_includes(fields=None):
+    """
+    Return the ``_source`` fields Elasticsearch must send for a response.
+
+    Args:
+        fields (list, optional): Requested public media field names, all if empty
+
+    Returns:
+        list: Elasticsearch ``_source`` field names
+    """
+    if not fields:
+        return list(SOURCE_INCLUDES)
+    includes = []
+    for name, field, _ in MEDIA_SOURCE_FIELDS:
+        if name in fields:
+            includes.append(field)
+    if "thumbnail_url" in fields:
+        includes.extend(f for f in THUMBNAIL_SOURCE_FIELDS if f not in includes)
+    return includes
+
+
+def serialize_media_source(source, utc=True, fields=None):
+    """
+    Transform an Elasticsearch ``_source`` into the public media shape.
+
+    This is the unvalidated counterpart of MediaSourceSerializer: missing
+    fields become None instead of failing the whole response.
+
+    Args:
+        source (dict): The hit's ``_source``
+        utc (bool): Whether the project renders datetimes in UTC
+        fields (list, optional): Public media field names to include, all if empty
+
+    Returns:
+        dict: The public media representation
+    """
+    data = {}
+    for name, field, convert in MEDIA_SOURCE_FIELDS:
+        if fields and name not in fields:
+            continue
+        value = source.get(field)
+        if convert is None:
+            value = _render_datetime(value, utc)
+        elif value is not None:
+            value = convert(value)
+        data[name] = value
+    if not fields or "thumbnail_url" in fields:
+        data["thumbnail_url"] = get_media_url(source.get("db", "st"), source.get("bildnummer", ""))
+    return data
+
+
+def serialize_search_response(results, strict=False, fields=None):
+    """
+    Build the public search response from the collected Elasticsearch results.
+
+    By default hits are transformed directly, skipping DRF validation. With
+    ``strict`` the full ElasticsearchResponseSerializer validation runs,
+    which is slower but reports malformed documents.
+
+    Args:
+        results (dict): ``total``, ``results`` (raw hits), ``aggregations`` and
+            optionally ``next_cursor``
+        strict (bool): Validate through ElasticsearchResponseSerializer
+        fields (list, optional): Public media field names to include, all if empty
+
+    Returns:
+        dict: The response payload
+
+    Raises:
+        serializers.ValidationError: In strict mode, if the results are invalid
+    """
+    if strict:
+        serializer = ElasticsearchResponseSerializer(data=results)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.data
+        if fields:
+            for hit in data["results"]:
+                hit["source"] = {
+                    name: value for name, value in hit["source"].items() if name in fields
+                }
+        return data
+
+    data = {
+        "total": int(results["total"]),
+        "results": serialize_hits(results["results"], fields=fields),
+        "aggregations": results.get("aggregations", {}),
+        "next_cursor": results.get("next_cursor"),
+    }
+    return data
+
+
+def serialize_hits(hits, strict=False, fields=None):
+    """
+    Transform raw Elasticsearch hits or documents into ``{"id", "source"}`` items.
+
+    Args:
+        hits (list): Items with ``_id`` and ``_source``
+        strict (bool): Validate through ElasticsearchHitSerializer
+        fields (list, optional): Public media field names to include, all if empty
+
+    Returns:
+        list: The public media items
+
+    Raises:
+        serializers.ValidationError: In strict mode, if a hit is invalid
+    """
+    if strict:
+        serializer = ElasticsearchHitSerializer(data=hits, many=True)
+        serializer.is_valid(raise_exception=True)
+        items = serializer.data
+        if fields:
+            for item in items:
+                item["source"] = {
+                    name: value for name, value in item["source"].items() if name in fields
+                }
+        return items
+
+    utc = settings.USE_TZ and timezone.get_current_timezone_name() == "UTC"
+    return [
+        {"id": str(hit["_id"]), "source": serialize_media_source(hit["_source"], utc, fields)}
+        for hit in hits
+    ]
+
+
+class ExportQuerySerializer(SearchQuerySerializer):
+    """Serializer for export parameters: the search filters plus an output format."""
+
+    export_format = serializers.ChoiceField(
+        choices=["ndjson", "csv"], default="ndjson", required=False
+    )
+
+    def validate(self, attrs):
+        # Exports walk every hit, so page depth limits do not apply
+        return attrs
+
+
+class MediaLookupSerializer(serializers.Serializer):
+    """Serializer for bulk media lookup parameters."""
+
+    ids = serializers.ListField(
+        child=serializers.CharField(),
+        allow_empty=False
+    )
+
+    def validate_ids(self, value):
+        """Accept repeated or comma-separated ids, dropping duplicates."""
+        ids = []
+        for item in value:
+            for media_id in item.split(","):
+                media_id = media_id.strip()
+                if media_id and media_id not in ids:
+                    ids.append(media_id)
+        if not ids:
+            raise serializers.ValidationError("At least one id is required.")
+        if len(ids) > settings.MEDIA_LOOKUP_MAX_IDS:
+            raise serializers.ValidationError(
+                f"At most {settings.MEDIA_LOOKUP_MAX_IDS} ids are allowed."
+            )
+        return ids
+
+
+class PhotographerSuggestSerializer(serializers.Serializer):
+    """Serializer for photographer typeahead parameters."""
+
+    q = serializers.CharField(required=False, default="", allow_blank=True, max_length=100)
+    limit = serializers.IntegerField(default=10, min_value=1, max_value=50)
+
+
+class PhotographerFacetSerializer(serializers.Serializer):
+    """Serializer for photographer facet paging parameters."""
+
+    after = serializers.CharField(required=False)
+    size = serializers.IntegerField(default=100, min_value=1, max_value=1000)
+
+    def validate_after(self, value):
+        """Decode the ``next`` token returned with the previous page."""
+        try:
+            after = decode_cursor(value)
+        except ValueError:
+            raise serializers.ValidationError("Invalid cursor.")
+        if len(after) != 1 or not all(isinstance(key, str) for key in after.values()):
+            raise serializers.ValidationError("Invalid cursor.")
+        return after
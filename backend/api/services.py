@@ -1,175 +1,937 @@
+import asyncio
+import hashlib
+import json
 import logging
-from elasticsearch import Elasticsearch
+import os
+import threading
+import time
+import weakref
+from elasticsearch import AsyncElasticsearch, Elasticsearch, NotFoundError
 from django.conf import settings
 from datetime import datetime
 
+from .cache import (
+    get_index_generation_cache,
+    get_media_cache,
+    get_search_aggregations_cache,
+    get_search_cache,
+    make_query_key,
+)
+from .queries import (
+    PHOTOGRAPHER_FACET_SOURCE,
+    build_photographer_facet_query,
+    build_sort,
+    compile_search_query,
+    compile_search_query_bytes,
+)
+from .search_templates import (
+    build_template_params,
+    get_search_template_id,
+    is_missing_template_error,
+    mark_search_template_missing,
+    use_search_template,
+)
+from .serializers import SOURCE_INCLUDES
+from .singleflight import get_flight
+from .metrics import observe_circuit_rejection, observe_es_call, observe_hedged_call
+from .resilience import (
+    CircuitOpenError,
+    DeadlineExceeded,
+    ElasticsearchUnavailable,
+    ahedged_call,
+    deadline_budget,
+    get_circuit_breaker,
+    hedged_call,
+    is_retryable_error,
+    remaining_budget,
+)
+from .timing import record_es_call
+from .utils import encode_cursor
+
+# Parameters that may change between pages of the same cursor-mode search.
+# aggs does not change the hits, and aggs="auto" resolves differently per page.
+CURSOR_EXCLUDED_PARAMS = ("page", "page_size", "pagination", "cursor", "fields", "aggs")
+
+# Parameters that do not change the per-query aggregations
+AGGREGATION_EXCLUDED_PARAMS = CURSOR_EXCLUDED_PARAMS + ("sort_by", "sort_order")
+
+# Headers of searches sent with a pre-serialized body
+SEARCH_HEADERS = {"accept": "application/json", "content-type": "application/json"}
+
 logger = logging.getLogger(__name__)
 
+# Process-wide client registry. Clients own their connection pools, so they
+# are shared by every request handled in this process and rebuilt after fork.
+_clients = {}
+_async_clients = {}
+_clients_pid = os.getpid()
+_clients_lock = threading.Lock()
+
+
+def _es_call_finished(operation, response, started):
+    """Record a successful Elasticsearch call in the request timings and metrics."""
+    record_es_call(response, started)
+    observe_es_call(operation)
+
+
+def _client_options():
+    """Build the Elasticsearch client keyword arguments from settings."""
+    return {
+        "basic_auth": (
+            settings.ELASTICSEARCH_USERNAME,
+            settings.ELASTICSEARCH_PASSWORD,
+        ),
+        "verify_certs": False,
+        "connections_per_node": settings.ELASTICSEARCH_CONNECTIONS_PER_NODE,
+        "request_timeout": settings.ELASTICSEARCH_REQUEST_TIMEOUT,
+        "max_retries": settings.ELASTICSEARCH_MAX_RETRIES,
+        "retry_on_timeout": settings.ELASTICSEARCH_RETRY_ON_TIMEOUT,
+        "retry_on_status": settings.ELASTICSEARCH_RETRY_ON_STATUS,
+        "http_compress": settings.ELASTICSEARCH_HTTP_COMPRESS,
+        "headers": {
+            "Connection": "keep-alive" if settings.ELASTICSEARCH_KEEP_ALIVE else "close"
+        },
+    }
+
+
+def _forget_inherited_clients():
+    """Drop clients created before a fork. Must be called with the registry lock held."""
+    global _clients_pid
+
+    if _clients_pid != os.getpid():
+        # Never close inherited clients: their sockets belong to the parent.
+        _clients.clear()
+        _async_clients.clear()
+        _clients_pid = os.getpid()
+
+
+def get_elasticsearch_client():
+    """
+    Return the shared Elasticsearch client for the current process.
+
+    The client is created lazily on first use. If the process has been forked
+    (e.g. a Gunicorn worker booted from a preloaded master), the parent's
+    client is discarded and a fresh one with its own sockets is created.
+
+    Returns:
+        Elasticsearch: The shared client instance
+    """
+    with _clients_lock:
+        _forget_inherited_clients()
+
+        client = _clients.get("default")
+        if client is None:
+            client = Elasticsearch(
+                f"{settings.ELASTICSEARCH_HOST}:{settings.ELASTICSEARCH_PORT}",
+                **_client_options(),
+            )
+            _clients["default"] = client
+        return client
+
+
+def get_async_elasticsearch_client():
+    """
+    Return the shared AsyncElasticsearch client for the running event loop.
+
+    Async clients hold aiohttp sessions bound to the loop that created them,
+    so there is one per event loop, closed when that loop shuts down. Under
+    an ASGI server that is one client per worker process. The async views
+    are meant for ASGI: under WSGI every request runs on a new event loop,
+    so every request opens and closes its own client and connections.
+
+    Returns:
+        AsyncElasticsearch: The shared async client instance
+    """
+    loop = asyncio.get_running_loop()
+    with _clients_lock:
+        _forget_inherited_clients()
+
+        for key, (loop_ref, _, _) in list(_async_clients.items()):
+            stale_loop = loop_ref()
+            if stale_loop is None or stale_loop.is_closed():
+                # Closed without cancelling its tasks, so the client could not be closed
+                del _async_clients[key]
+
+        loop_ref, client, _ = _async_clients.get(id(loop), (None, None, None))
+        if client is None or loop_ref() is not loop:
+            client = AsyncElasticsearch(
+                f"{settings.ELASTICSEARCH_HOST}:{settings.ELASTICSEARCH_PORT}",
+                **_client_options(),
+            )
+            closer = loop.create_task(_close_with_loop(id(loop), client))
+            _async_clients[id(loop)] = (weakref.ref(loop), client, closer)
+        return client
+
+
+async def _close_with_loop(key, client):
+    """
+    Close an async client when its event loop shuts down.
+
+    asyncio.run, which both ASGI servers and async_to_sync use, cancels the
+    tasks still pending before closing the loop. This task waits until then.
+    """
+    try:
+        await asyncio.get_running_loop().create_future()
+    finally:
+        with _clients_lock:
+            if _async_clients.get(key, (None, None, None))[1] is client:
+                del _async_clients[key]
+        try:
+            await client.close()
+        except Exception as e:
+            logger.warning(f"Error closing async Elasticsearch client: {str(e)}")
+
+
+def close_elasticsearch_clients():
+    """Close and forget every client created by this process."""
+    with _clients_lock:
+        if _clients_pid == os.getpid():
+            for client in _clients.values():
+                try:
+                    client.close()
+                except Exception as e:
+                    logger.warning(f"Error closing Elasticsearch client: {str(e)}")
+        _clients.clear()
+        # Async clients can only be closed from their own event loop, which
+        # still does so when it shuts down
+        _async_clients.clear()
+
+
+def get_pool_stats():
+    """
+    Report connection pool usage of the shared clients in this process.
+
+    Returns:
+        dict: Process id and, per client, the state of each node's pool
+    """
+    stats = {"pid": os.getpid(), "clients": {}}
+    with _clients_lock:
+        if _clients_pid != os.getpid():
+            return stats
+        clients = dict(_clients)
+        for key, (_, client, _) in _async_clients.items():
+            clients[f"async-{key}"] = client
+
+    for name, client in clients.items():
+        nodes = [_node_stats(node) for node in client.transport.node_pool.all()]
+        stats["clients"][name] = {"nodes": nodes}
+    return stats
+
+
+def _node_stats(node):
+    """Describe the connection pool of a single transport node."""
+    pool = getattr(node, "pool", None)
+    if pool is not None:
+        # urllib3 connection pool used by the sync client
+        queue = getattr(getattr(pool, "pool", None), "queue", [])
+        return {
+            "base_url": node.base_url,
+            "maxsize": getattr(pool, "maxsize", None),
+            "connections_created": getattr(pool, "num_connections", None),
+            "requests": getattr(pool, "num_requests", None),
+            "idle_connections": sum(1 for conn in list(queue) if conn is not None),
+        }
+
+    # aiohttp session used by the async client, created on first request
+    connector = getattr(getattr(node, "session", None), "connector", None)
+    return {
+        "base_url": node.base_url,
+        "maxsize": getattr(connector, "limit", None),
+        "active_connections": len(getattr(connector, "_acquired", ())),
+        "idle_connections": sum(len(conns) for conns in getattr(connector, "_conns", {}).values()),
+    }
+
+
+def _reset_clients_after_fork():
+    """Drop clients inherited from the parent process."""
+    global _clients_lock, _clients_pid
+    _clients_lock = threading.Lock()
+    _clients.clear()
+    _async_clients.clear()
+    _clients_pid = os.getpid()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_clients_after_fork)
+
+
+# Filter options over the whole index, independent of any search
+GLOBAL_AGGREGATIONS_QUERY = {
+    "size": 0,  # No hits needed, only aggregations
+    "aggs": {
+        "all_docs": {
+            "global": {},
+            "aggs": {
+                "db_terms": {
+                    "terms": {
+                        "field": "db",
+                        "size": 10,
+                        "order": {"_count": "desc"}
+                    }
+                },
+                "photographer_terms": {
+                    "terms": {
+                        "field": "fotografen",
+                        "size": 10000,
+                        "order": {"_count": "desc"}
+                    }
+                }
+            }
+        }
+    }
+}
+
+
+def make_index_generation(stats):
+    """
+    Build an index generation marker from an index stats response.
+
+    The indexing and delete operation totals only ever grow, so the marker
+    never returns to an earlier value: an update followed by a merge that
+    purges the old document changes it for good. ``docs.deleted`` is left out
+    for that reason. The searchable document count changes once a refresh
+    makes new documents visible.
+
+    Args:
+        stats (dict): Response of the indices stats API with the docs and
+            indexing metrics
+
+    Returns:
+        str: Hash of the index UUIDs, operation totals and document count
+    """
+    primaries = stats["_all"]["primaries"]
+    indexing = primaries["indexing"]
+    indices = sorted((name, index.get("uuid", "")) for name, index in stats.get("indices", {}).items())
+    marker = json.dumps(
+        [indices, indexing["index_total"], indexing["delete_total"], primaries["docs"]["count"]]
+    )
+    return hashlib.md5(marker.encode("utf-8")).hexdigest()
+
+
+class InvalidCursorError(Exception):
+    """Raised when a pagination cursor cannot be used for the requested search."""
+
+
+class CursorExpiredError(InvalidCursorError):
+    """Raised when the point-in-time snapshot behind a cursor has expired."""
+
 
 class ElasticsearchService:
     """Service class for handling Elasticsearch operations."""
 
-    def __init__(self):
-        """Initialize the Elasticsearch client."""
-        self.client = Elasticsearch(
-            f"{settings.ELASTICSEARCH_HOST}:{settings.ELASTICSEARCH_PORT}",
-            basic_auth=(
-                settings.ELASTICSEARCH_USERNAME,
-                settings.ELASTICSEARCH_PASSWORD,
-            ),
-            verify_certs=False,
-        )
+    def __init__(self, client=None):
+        """
+        Initialize the service.
+
+        Args:
+            client (Elasticsearch, optional): Client to use instead of the shared one
+        """
+        self.client = client if client is not None else get_elasticsearch_client()
         self.index = settings.ELASTICSEARCH_INDEX
 
-    def search(self, query_params):
+    def _admit(self, operation):
+        """
+        Let a call through the circuit breaker with what is left of the deadline budget.
+
+        Returns:
+            tuple: The breaker, the call's timeout in seconds and the client
+                to send it with
+
+        Raises:
+            DeadlineExceeded: If the budget is already spent
+            CircuitOpenError: If the circuit is open
+        """
+        timeout = remaining_budget()
+        if timeout <= 0:
+            raise DeadlineExceeded(f"Deadline budget spent before Elasticsearch {operation}")
+        breaker = get_circuit_breaker()
+        try:
+            breaker.before_call()
+        except CircuitOpenError:
+            observe_circuit_rejection(operation)
+            raise
+        return breaker, timeout, self._attempt_client(timeout)
+
+    def _attempt_client(self, timeout):
+        """
+        Return the client for one attempt of a call, timing out after timeout seconds.
+
+        Retries are made by _call within the deadline budget, not by the transport.
+        """
+        return self.client.options(request_timeout=timeout, retry_on_timeout=False, max_retries=0)
+
+    def _retry_plan(self, error, attempt):
+        """
+        Plan another attempt after error.
+
+        Attempts back off exponentially from ELASTICSEARCH_RETRY_BACKOFF_MS, so
+        an overloaded cluster is not sent the retries all at once.
+
+        Returns:
+            tuple: The seconds to wait and the timeout of the next attempt, or
+                None if it must not be retried or the budget would run out
+        """
+        if attempt >= settings.ELASTICSEARCH_MAX_RETRIES or not is_retryable_error(error):
+            return None
+        backoff = settings.ELASTICSEARCH_RETRY_BACKOFF_MS / 1000 * 2 ** attempt
+        timeout = remaining_budget() - backoff
+        return (backoff, timeout) if timeout > 0 else None
+
+    def _settle(self, operation, breaker, error=None):
+        """
+        Record the outcome of an admitted call with the breaker.
+
+        Returns:
+            Exception: The error to raise instead of error, or None to re-raise it
+        """
+        if breaker.after_call(error) and not isinstance(error, ElasticsearchUnavailable):
+            return ElasticsearchUnavailable(
+                f"Elasticsearch {operation} failed: {str(error)}", retry_after=breaker.retry_after()
+            )
+        return None
+
+    def _call(self, operation, call, hedge=True):
+        """
+        Send one request through the circuit breaker within the deadline budget.
+
+        Args:
+            operation (str): Name of the operation, for logs and metrics
+            call (callable): Called with the client to use; sends the request
+            hedge (bool): Whether the request is an idempotent read that may
+                be hedged after ELASTICSEARCH_HEDGE_DELAY_MS
+
+        Returns:
+            The client response
+
+        Raises:
+            ElasticsearchUnavailable: If the circuit is open, the budget ran out
+                or the cluster timed out, was unreachable or overloaded
+        """
+        breaker, timeout, client = self._admit(operation)
+        delay = settings.ELASTICSEARCH_HEDGE_DELAY_MS / 1000
+        try:
+            attempt = 0
+            while True:
+                try:
+                    if hedge and delay > 0:
+                        response = hedged_call(
+                            lambda: call(client), delay, timeout, on_hedge=lambda: observe_hedged_call(operation)
+                        )
+                    else:
+                        response = call(client)
+                    break
+                except Exception as e:
+                    retry = self._retry_plan(e, attempt)
+                    if retry is None:
+                        raise
+                    backoff, timeout = retry
+                    time.sleep(backoff)
+                    attempt += 1
+                    client = self._attempt_client(timeout)
+        except Exception as e:
+            unavailable = self._settle(operation, breaker, e)
+            if unavailable is not None:
+                raise unavailable from e
+            raise
+        except BaseException:
+            breaker.release()
+            raise
+        self._settle(operation, breaker)
+        return response
+
+    def _coalesce(self, flight, key, func):
+        """Run func once for concurrent identical calls; see api.singleflight."""
+        if not settings.SINGLEFLIGHT_ENABLED:
+            return func()
+        return get_flight(flight).do(key, func)
+
+    def search(self, query_params, use_cache=True):
         """
         Search for media items in Elasticsearch.
 
+        Identical searches are answered from the process-wide search cache
+        until their entry expires or is invalidated, and identical searches
+        made at the same time share one Elasticsearch call. Cursor-mode searches
+        (``pagination="cursor"``) are never cached: they page through a
+        point-in-time snapshot with ``search_after``.
+
+        With ``aggs="auto"`` the per-query aggregations are computed on the
+        first page and reused from the aggregations cache for later pages of
+        the same search.
+
         Args:
             query_params (dict): Search parameters including query, filters, pagination, etc.
+            use_cache (bool): Whether the search cache may be read and populated
 
         Returns:
             dict: Raw Elasticsearch response
+
+        Raises:
+            InvalidCursorError: If the cursor belongs to a different search or has expired
+            ElasticsearchUnavailable: If the cluster cannot answer; see search_degraded
+        """
+        query_params, aggregations_key, cached_aggregations = self._prepare_aggregations(query_params)
+        response = self._search(query_params, use_cache)
+        return self._finish_aggregations(response, aggregations_key, cached_aggregations)
+
+    def search_degraded(self, query_params, error):
+        """
+        Answer a search that failed because Elasticsearch is unavailable.
+
+        The expired cache entry of the search is served while it is still kept
+        (see SEARCH_CACHE_STALE_TTL). Failing that, a search with aggregations
+        is retried once without them, the expensive part, within
+        SEARCH_DEGRADED_BUDGET. Cursor-mode searches are not degraded.
+
+        Args:
+            query_params (dict): Parameters of the failed search
+            error (ElasticsearchUnavailable): Why it failed
+
+        Returns:
+            tuple: The raw response and how it was degraded, ``"stale"`` or
+                ``"no-aggregations"``
+
+        Raises:
+            ElasticsearchUnavailable: error, if the search cannot be degraded
+        """
+        stale, retry_params = self._plan_degraded_search(query_params, error)
+        if stale is not None:
+            return stale, "stale"
+        with deadline_budget(settings.SEARCH_DEGRADED_BUDGET):
+            try:
+                response = self.search(retry_params)
+            except ElasticsearchUnavailable:
+                raise error
+        return response, "no-aggregations"
+
+    def _plan_degraded_search(self, query_params, error):
+        """
+        Find a stale response for a failed search, or the parameters to retry it with.
+
+        Returns:
+            tuple: The stale response (or None) and the retry parameters (or None)
+
+        Raises:
+            ElasticsearchUnavailable: error, if the search cannot be degraded
+        """
+        if not settings.SEARCH_DEGRADED_RESPONSES or query_params.get("pagination") == "cursor":
+            raise error
+        prepared, aggregations_key, cached_aggregations = self._prepare_aggregations(query_params)
+        cache, cache_key = self._get_search_cache(prepared, True)
+        stale = cache.get_stale(cache_key) if cache is not None else None
+        if stale is not None:
+            return self._finish_aggregations(stale, aggregations_key, cached_aggregations), None
+        # An open circuit would reject the retry too
+        if prepared.get("aggs") == "none" or isinstance(error, CircuitOpenError):
+            raise error
+        return None, {**query_params, "aggs": "none"}
+
+    def _prepare_aggregations(self, query_params):
+        """
+        Resolve ``aggs="auto"`` into a concrete aggregation mode.
+
+        Returns:
+            tuple: Effective parameters, the aggregations cache key (None unless
+                auto) and the cached aggregations to reuse (None to compute them)
         """
+        if query_params.get("aggs") != "auto":
+            return query_params, None, None
+
+        aggregations_key = self._generation_key(
+            make_query_key(query_params, exclude=AGGREGATION_EXCLUDED_PARAMS)
+        )
+        cached_aggregations = None
+        first_page = query_params.get("page", 1) == 1 and not query_params.get("cursor")
+        if not first_page:
+            cached_aggregations = get_search_aggregations_cache().get(aggregations_key)
+        query_params = {
+            **query_params,
+            "aggs": "full" if cached_aggregations is None else "none",
+        }
+        return query_params, aggregations_key, cached_aggregations
+
+    def _finish_aggregations(self, response, aggregations_key, cached_aggregations):
+        """Attach reused aggregations to a response, or remember fresh ones."""
+        if cached_aggregations is not None:
+            response = dict(response)
+            response["aggregations"] = cached_aggregations
+        elif aggregations_key is not None and response.get("aggregations"):
+            get_search_aggregations_cache().set(aggregations_key, response["aggregations"])
+        return response
+
+    def _get_search_cache(self, query_params, use_cache):
+        """Return the search cache and key for a search, or (None, None) if uncached."""
+        if not use_cache or not settings.SEARCH_CACHE_ENABLED:
+            return None, None
+        return get_search_cache(), self._generation_key(make_query_key(query_params))
+
+    def _generation_key(self, key):
+        """
+        Qualify a cache key with the last known index generation.
+
+        Responses cached before the index changed are then never served, nor
+        validated by an ETag, as answers for the newer generation.
+        """
+        if not settings.SEARCH_ETAG_ENABLED:
+            return key
+        generation = get_index_generation_cache().get(self.index)
+        return key if generation is None else f"{key}:{generation}"
+
+    def _search(self, query_params, use_cache):
+        """Run a search, through the search cache unless it is a cursor-mode search."""
+        if query_params.get("pagination") == "cursor":
+            return self._search_with_cursor(query_params)
+
+        cache, cache_key = self._get_search_cache(query_params, use_cache)
+        if cache is not None:
+            cached = cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        def fetch():
+            try:
+                started = time.perf_counter()
+                response = self._call("search", lambda client: self._send_search(query_params, client=client))
+                _es_call_finished("search", response, started)
+                if cache is not None:
+                    cache.set(cache_key, response)
+                return response
+            except Exception as e:
+                observe_es_call("search", failed=True)
+                logger.error(f"Error searching Elasticsearch: {str(e)}")
+                raise
+
+        return self._coalesce("search", cache_key or make_query_key(query_params), fetch)
+
+    def msearch(self, searches, use_cache=True):
+        """
+        Run several searches in a single _msearch round trip.
+
+        Searches already in the search cache are answered from it and left
+        out of the request. Cursor-mode searches are not supported.
+
+        Args:
+            searches (list): Search parameters, as accepted by search()
+            use_cache (bool): Whether the search cache may be read and populated
+
+        Returns:
+            list: One raw Elasticsearch response per search, in order. Failed
+                searches are returned as the ``error``/``status`` items from
+                Elasticsearch.
+        """
+        results, pending, body = self._plan_msearch(searches, use_cache)
+        if not pending:
+            return results
         try:
-            search_query = self._build_search_query(query_params)
-            response = self.client.search(index=self.index, body=search_query)
-            return response
+            started = time.perf_counter()
+            response = self._call("msearch", lambda client: client.msearch(searches=body))
+            _es_call_finished("msearch", response, started)
+        except Exception as e:
+            observe_es_call("msearch", failed=True)
+            logger.error(f"Error running Elasticsearch multi-search: {str(e)}")
+            raise
+        return self._finish_msearch(results, pending, response)
+
+    def _plan_msearch(self, searches, use_cache):
+        """
+        Answer what the search cache can of a multi-search and build the request for the rest.
+
+        Returns:
+            tuple: The results so far (None where pending), the pending
+                searches and the _msearch body
+        """
+        results = [None] * len(searches)
+        pending = []
+        for position, query_params in enumerate(searches):
+            if query_params.get("pagination") == "cursor":
+                raise ValueError("Cursor pagination is not supported in multi-search.")
+            query_params, aggregations_key, cached_aggregations = self._prepare_aggregations(query_params)
+            cache, cache_key = self._get_search_cache(query_params, use_cache)
+            cached = cache.get(cache_key) if cache is not None else None
+            if cached is not None:
+                results[position] = self._finish_aggregations(cached, aggregations_key, cached_aggregations)
+            else:
+                pending.append((position, query_params, cache, cache_key, aggregations_key, cached_aggregations))
+
+        body = []
+        for _, query_params, _, _, _, _ in pending:
+            body.append({"index": self.index})
+            if settings.ELASTICSEARCH_PRESERIALIZE_QUERIES:
+                body.append(compile_search_query_bytes(query_params))
+            else:
+                body.append(self._build_search_query(query_params))
+        return results, pending, body
+
+    def _finish_msearch(self, results, pending, response):
+        """Fill in and cache the results of the pending searches from an _msearch response."""
+        for (position, _, cache, cache_key, aggregations_key, cached_aggregations), item in zip(
+            pending, response["responses"]
+        ):
+            if "error" in item:
+                logger.error(f"Error in multi-search item {position}: {item['error']}")
+                results[position] = item
+                continue
+            if cache is not None:
+                cache.set(cache_key, item)
+            results[position] = self._finish_aggregations(item, aggregations_key, cached_aggregations)
+        return results
+
+    def _get_cursor_pit(self, params):
+        """
+        Return the point-in-time id of the cursor in params, or None on a first page.
+
+        Raises:
+            InvalidCursorError: If the cursor was issued for different search parameters
+        """
+        cursor = params.get("cursor")
+        if not cursor:
+            return None
+        if cursor["key"] != make_query_key(params, exclude=CURSOR_EXCLUDED_PARAMS):
+            raise InvalidCursorError("Cursor does not match the search parameters.")
+        return cursor["pit"]
+
+    def _send_search(self, params, pit_id=None, client=None, **extra):
+        """
+        Send the search for params through the stored search template if enabled.
+
+        Falls back to an inline body when the template is missing from the
+        cluster, or for point-in-time searches which the template does not cover.
+
+        Args:
+            params (dict): Search parameters
+            pit_id (str, optional): Point in time to search instead of the index
+            client (Elasticsearch, optional): Client to send with instead of self.client
+            **extra: Additional top-level body fields
+
+        Returns:
+            dict: Raw Elasticsearch response
+        """
+        client = client or self.client
+        if pit_id is None and not extra and use_search_template():
+            try:
+                return client.search_template(
+                    index=self.index, id=get_search_template_id(), params=build_template_params(params)
+                )
+            except NotFoundError as e:
+                if not is_missing_template_error(e):
+                    raise
+                mark_search_template_missing()
+        return self._send_inline_search(params, pit_id, client, **extra)
 
+    def _send_inline_search(self, params, pit_id=None, client=None, **extra):
+        """
+        Send the search body for params, as pre-serialized JSON bytes if enabled.
+
+        Args:
+            params (dict): Search parameters
+            pit_id (str, optional): Point in time to search instead of the index
+            client (Elasticsearch, optional): Client to send with instead of self.client
+            **extra: Additional top-level body fields
+
+        Returns:
+            The client response, or a coroutine resolving to it for async clients
+        """
+        client = client or self.client
+        if pit_id is not None:
+            extra["pit"] = {"id": pit_id, "keep_alive": settings.ELASTICSEARCH_PIT_KEEP_ALIVE}
+        if settings.ELASTICSEARCH_PRESERIALIZE_QUERIES:
+            # The index is implied by the point in time
+            path = "/_search" if pit_id is not None else f"/{self.index}/_search"
+            return client.perform_request(
+                "POST", path, headers=SEARCH_HEADERS, body=compile_search_query_bytes(params, **extra)
+            )
+        search_query = self._build_search_query(params)
+        search_query.update(extra)
+        if pit_id is not None:
+            return client.search(body=search_query)
+        return client.search(index=self.index, body=search_query)
+
+    def _search_with_cursor(self, params):
+        """Run a search_after page against a point-in-time snapshot."""
+        pit_id = self._get_cursor_pit(params)
+        if pit_id is None:
+            pit_id = self._call("open_pit", self._open_point_in_time, hedge=False)["id"]
+
+        try:
+            started = time.perf_counter()
+            response = self._call("search", lambda client: self._send_search(params, pit_id, client))
+            _es_call_finished("search", response, started)
+            return response
+        except NotFoundError as e:
+            raise CursorExpiredError("Cursor has expired, restart the search.") from e
         except Exception as e:
+            observe_es_call("search", failed=True)
             logger.error(f"Error searching Elasticsearch: {str(e)}")
             raise
 
+    def _open_point_in_time(self, client):
+        return client.open_point_in_time(index=self.index, keep_alive=settings.ELASTICSEARCH_PIT_KEEP_ALIVE)
+
+    def get_next_cursor(self, params, response):
+        """
+        Build the cursor token for the page following a cursor-mode response.
+
+        The point-in-time snapshot is closed once the last page has been read.
+
+        Args:
+            params (dict): Search parameters the response was produced with
+            response (dict): Raw Elasticsearch response
+
+        Returns:
+            str: Opaque cursor token, or None if there are no further pages
+        """
+        token, finished_pit = self._next_cursor_state(params, response)
+        if finished_pit:
+            try:
+                self.client.close_point_in_time(id=finished_pit)
+            except Exception as e:
+                logger.warning(f"Error closing point in time: {str(e)}")
+        return token
+
+    def _next_cursor_state(self, params, response):
+        """
+        Work out the next cursor for a response.
+
+        Returns:
+            tuple: The next cursor token (or None) and the id of a point in
+                time that is no longer needed (or None)
+        """
+        if params.get("pagination") != "cursor":
+            return None, None
+
+        hits = response.get("hits", {}).get("hits", [])
+        pit_id = response.get("pit_id")
+        if len(hits) < params.get("page_size", 20) or not hits[-1].get("sort"):
+            return None, pit_id
+
+        token = encode_cursor(
+            {
+                "pit": pit_id or params["cursor"]["pit"],
+                "after": hits[-1]["sort"],
+                "key": make_query_key(params, exclude=CURSOR_EXCLUDED_PARAMS),
+            }
+        )
+        return token, None
+
     def _build_search_query(self, params):
         """
         Build the Elasticsearch query based on the provided parameters.
 
+        Bodies are compiled once per distinct search and reused for every
+        page of it; see api.queries.
+
         Args:
             params (dict): Search parameters
 
         Returns:
             dict: Elasticsearch query
         """
-        query = {"bool": {"must": [], "filter": []}}
-
-        # Add text search if query is provided
-        if params.get("query"):
-            query["bool"]["must"].append(
-                {
-                    "multi_match": {
-                        "query": params["query"],
-                        "fields": ["suchtext^3", "fotografen^2"],
-                        "type": "best_fields",
-                        "operator": "and",
-                    }
-                }
-            )
-
-        # Add database filter if db is provided
-        if params.get("db"):
-            if len(params["db"]) == 1:
-                # Use term query for single value
-                query["bool"]["filter"].append({"term": {"db": params["db"][0]}})
-            else:
-                # Use terms query for multiple values
-                query["bool"]["filter"].append({"terms": {"db": params["db"]}})
-
-        # Add date range filter if dates are provided
-        if params.get('date_from') or params.get('date_to'):
-            date_filter = {'range': {'datum': {}}}
-            if params.get('date_from'):
-                date_filter['range']['datum']['gte'] = params['date_from'].isoformat()
-            if params.get('date_to'):
-                date_filter['range']['datum']['lte'] = params['date_to'].isoformat()
-            query['bool']['filter'].append(date_filter)
-
-        # Add photographer filter if provided
-        if params.get("photographer"):
-            if len(params["photographer"]) == 1:
-                # Use term query for single value
-                query["bool"]["filter"].append({"term": {"fotografen": params["photographer"][0]}})
-            else:
-                # Use terms query for multiple values
-                query["bool"]["filter"].append({"terms": {"fotografen": params["photographer"]}})
-
-        # Build the complete search body
-        search_body = {
-            "query": query,
-            "from": (params.get("page", 1) - 1) * params.get("page_size", 20),
-            "size": params.get("page_size", 20),
-            "sort": self._build_sort(params),
-        }
-
-        # Add aggregations
-        search_body["aggs"] = {
-            "db_terms": {"terms": {"field": "db", "size": 10}},
-            "photographer_terms": {"terms": {"field": "fotografen", "size": 20}},
-            # 'date_histogram': {
-            #     'date_histogram': {
-            #         'field': 'datum',
-            #         'calendar_interval': 'month',
-            #         'format': 'yyyy-MM'
-            #     }
-            # }
-        }
-
-        return search_body
+        return compile_search_query(params)
 
     def _build_sort(self, params):
         """Build the sort parameters for the search query."""
-        sort_by = params.get("sort_by", "datum")
-        sort_order = params.get("sort_order", "desc")
-
-        # Map frontend sort fields to Elasticsearch fields
-        sort_field_mapping = {
-            "date": "datum",
-            "photographer": "fotografen",
-            "id": "bildnummer",
-        }
-
-        es_field = sort_field_mapping.get(sort_by, sort_by)
-
-        return [{es_field: {"order": sort_order}}]
+        return build_sort(params.get("sort_by") or None, params.get("sort_order", "desc"))
 
     def get_global_aggregations(self):
         """
         Fetch global aggregations for filter options (db and photographers).
 
+        Concurrent loads share one Elasticsearch call.
+
         Returns:
             dict: Raw Elasticsearch aggregations response.
         """
+        return self._coalesce("aggregations", "global", self._fetch_global_aggregations)
+
+    def _fetch_global_aggregations(self):
         try:
-            aggregation_query = {
-                "size": 0,  # No hits needed, only aggregations
-                "aggs": {
-                    "all_docs": {
-                        "global": {},
-                        "aggs": {
-                            "db_terms": {
-                                "terms": {
-                                    "field": "db",
-                                    "size": 10,
-                                    "order": {"_count": "desc"}
-                                }
-                            },
-                            "photographer_terms": {
-                                "terms": {
-                                    "field": "fotografen",
-                                    "size": 10000,
-                                    "order": {"_count": "desc"}
-                                }
-                            }
-                        }
-                    }
-                }
-            }
-            response = self.client.search(index=self.index, body=aggregation_query)
-            print(f"Raw Elasticsearch aggregations response: {response.get('aggregations')}") # Debug log
+            started = time.perf_counter()
+            response = self._call(
+                "aggregations", lambda client: client.search(index=self.index, body=GLOBAL_AGGREGATIONS_QUERY)
+            )
+            _es_call_finished("aggregations", response, started)
             return response.get("aggregations", {})
         except Exception as e:
+            observe_es_call("aggregations", failed=True)
             logger.error(f"Error fetching global aggregations: {str(e)}")
             raise
 
+    def get_index_generation(self):
+        """
+        Return a marker that changes whenever the searchable content of the index does.
+
+        The marker is derived from the index stats and the UUIDs of the
+        indices behind the alias; see make_index_generation. It is checked at
+        most every INDEX_GENERATION_TTL seconds, and a failed check, e.g. by a
+        user without the monitor privilege, is not retried before then.
+
+        Returns:
+            str: The generation marker, or None if disabled or the stats are unavailable
+        """
+        if not settings.SEARCH_ETAG_ENABLED:
+            return None
+        return get_index_generation_cache().get_or_load(self.index, self._fetch_index_generation).value
+
+    def _fetch_index_generation(self):
+        try:
+            started = time.perf_counter()
+            response = self._call("stats", self._index_stats, hedge=False)
+            _es_call_finished("stats", response, started)
+        except Exception as e:
+            observe_es_call("stats", failed=True)
+            logger.warning(f"Error reading index generation: {str(e)}")
+            # Cached like a marker, so the generation stays unknown until the next check
+            return None
+        return make_index_generation(response)
+
+    def _index_stats(self, client):
+        return client.indices.stats(index=self.index, metric="docs,indexing")
+
+    def get_photographer_facet_page(self, size, after=None):
+        """
+        Fetch one page of photographers and their image counts, in name order.
+
+        Pages come from a composite aggregation, so every photographer is
+        reachable however many there are. Concurrent requests for the same
+        page share one Elasticsearch call.
+
+        Args:
+            size (int): Photographers per page
+            after (dict, optional): ``after_key`` returned with the previous page
+
+        Returns:
+            dict: ``buckets`` (``key``/``doc_count`` dicts) and the ``after_key``
+                of the next page, None on the last page
+        """
+        key = make_query_key({"size": size, "after": after})
+        return self._coalesce(
+            "photographer_facet", key, lambda: self._fetch_photographer_facet_page(size, after)
+        )
+
+    def _fetch_photographer_facet_page(self, size, after):
+        body = build_photographer_facet_query(size, after)
+        try:
+            started = time.perf_counter()
+            response = self._call(
+                "photographer_facet", lambda client: client.search(index=self.index, body=body)
+            )
+            _es_call_finished("photographer_facet", response, started)
+        except Exception as e:
+            observe_es_call("photographer_facet", failed=True)
+            logger.error(f"Error fetching photographer facet page: {str(e)}")
+            raise
+        return self._parse_photographer_facet_page(response, size)
+
+    def _parse_photographer_facet_page(self, response, size):
+        aggregation = response.get("aggregations", {}).get("photographers", {})
+        buckets = [
+            {"key": bucket["key"][PHOTOGRAPHER_FACET_SOURCE], "doc_count": bucket["doc_count"]}
+            for bucket in aggregation.get("buckets", [])
+        ]
+        # A short page is the last one, even if Elasticsearch still sends an after_key
+        after_key = aggregation.get("after_key") if len(buckets) == size else None
+        return {"buckets": buckets, "after_key": after_key}
+
     def get_by_id(self, media_id):
         """
         Retrieve a single media item by ID.
@@ -179,10 +941,411 @@ class ElasticsearchService:
 
         Returns:
             dict: The media item if found, None otherwise
+
+        Raises:
+            ElasticsearchUnavailable: If the cluster cannot answer
         """
         try:
-            response = self.client.get(index=self.index, id=media_id)
+            started = time.perf_counter()
+            response = self._call("get", lambda client: client.get(index=self.index, id=media_id))
+            _es_call_finished("get", response, started)
             return response
+        except ElasticsearchUnavailable:
+            observe_es_call("get", failed=True)
+            raise
         except Exception as e:
+            observe_es_call("get", failed=True)
             logger.error(f"Error retrieving media item {media_id}: {str(e)}")
             return None
+
+    def iter_hit_batches(self, query_params, batch_size=None):
+        """
+        Walk every hit of a search in batches, for exports.
+
+        Pages through a point-in-time snapshot with ``search_after`` so memory
+        use is bounded by the batch size however many hits match. The
+        snapshot is closed when the generator finishes or is closed.
+
+        Args:
+            query_params (dict): Search parameters; pagination and aggregations are ignored
+            batch_size (int, optional): Hits per request, EXPORT_BATCH_SIZE by default
+
+        Yields:
+            list: Raw Elasticsearch hits
+        """
+        batch_size = batch_size or settings.EXPORT_BATCH_SIZE
+        params = self._export_params(query_params, batch_size)
+        pit_id = self._call("open_pit", self._open_point_in_time, hedge=False)["id"]
+        search_after = None
+        try:
+            while True:
+                extra = {"track_total_hits": False}
+                if search_after is not None:
+                    extra["search_after"] = search_after
+                response = self._call(
+                    "export",
+                    lambda client: self._send_inline_search(params, pit_id, client, **extra),
+                    hedge=False,
+                )
+                pit_id = response.get("pit_id", pit_id)
+                hits = response.get("hits", {}).get("hits", [])
+                if hits:
+                    yield hits
+                if len(hits) < batch_size:
+                    return
+                search_after = hits[-1]["sort"]
+        finally:
+            try:
+                self.client.close_point_in_time(id=pit_id)
+            except Exception as e:
+                logger.warning(f"Error closing point in time: {str(e)}")
+
+    def _export_params(self, query_params, batch_size):
+        """Return the cursor-mode search parameters of an export in batches of batch_size."""
+        return {
+            **query_params,
+            "aggs": "none",
+            "pagination": "cursor",
+            "cursor": None,
+            "page_size": batch_size,
+        }
+
+    def get_by_ids(self, media_ids, use_cache=True):
+        """
+        Retrieve several media items in a single _mget round trip.
+
+        Documents are served from the media cache when possible; only the
+        remaining ids are fetched from Elasticsearch.
+
+        Args:
+            media_ids (list): The media item IDs
+            use_cache (bool): Whether the media cache may be read and populated
+
+        Returns:
+            dict: Documents (with ``_id`` and ``_source``) by ID; IDs that do not
+                exist are left out
+        """
+        cache, documents, missing = self._cached_documents(media_ids, use_cache)
+        if missing:
+            try:
+                started = time.perf_counter()
+                response = self._call("mget", lambda client: self._send_mget(client, missing))
+                _es_call_finished("mget", response, started)
+            except Exception as e:
+                observe_es_call("mget", failed=True)
+                logger.error(f"Error retrieving media items {missing}: {str(e)}")
+                raise
+            self._store_documents(response, cache, documents)
+        return documents
+
+    def _cached_documents(self, media_ids, use_cache):
+        """
+        Look media items up in the media cache.
+
+        Returns:
+            tuple: The cache (None if not used), the cached documents by ID
+                and the IDs still to fetch
+        """
+        cache = get_media_cache() if use_cache else None
+        documents = {}
+        missing = []
+        for media_id in media_ids:
+            cached = cache.get(media_id) if cache is not None else None
+            if cached is not None:
+                documents[media_id] = cached
+            else:
+                missing.append(media_id)
+        return cache, documents, missing
+
+    def _send_mget(self, client, media_ids):
+        return client.mget(index=self.index, ids=media_ids, source_includes=list(SOURCE_INCLUDES))
+
+    def _store_documents(self, response, cache, documents):
+        """Add the documents found by an _mget response to documents and the cache."""
+        for doc in response.get("docs", []):
+            if not doc.get("found"):
+                continue
+            document = {"_id": doc["_id"], "_source": doc.get("_source", {})}
+            documents[doc["_id"]] = document
+            if cache is not None:
+                cache.set(doc["_id"], document)
+
+
+class AsyncElasticsearchService(ElasticsearchService):
+    """
+    Asynchronous variant of ElasticsearchService backed by AsyncElasticsearch.
+
+    Query building, caching and cursor handling are shared with the sync
+    service; only the calls to the cluster are awaited.
+    """
+
+    def __init__(self, client=None):
+        """
+        Initialize the service. Must be called from within a running event loop.
+
+        Args:
+            client (AsyncElasticsearch, optional): Client to use instead of the shared one
+        """
+        self.client = client if client is not None else get_async_elasticsearch_client()
+        self.index = settings.ELASTICSEARCH_INDEX
+
+    async def _call(self, operation, call, hedge=True):
+        """Asynchronous counterpart of ElasticsearchService._call."""
+        breaker, timeout, client = self._admit(operation)
+        delay = settings.ELASTICSEARCH_HEDGE_DELAY_MS / 1000
+        try:
+            attempt = 0
+            while True:
+                try:
+                    if hedge and delay > 0:
+                        response = await ahedged_call(
+                            lambda: call(client), delay, timeout, on_hedge=lambda: observe_hedged_call(operation)
+                        )
+                    else:
+                        response = await call(client)
+                    break
+                except Exception as e:
+                    retry = self._retry_plan(e, attempt)
+                    if retry is None:
+                        raise
+                    backoff, timeout = retry
+                    await asyncio.sleep(backoff)
+                    attempt += 1
+                    client = self._attempt_client(timeout)
+        except Exception as e:
+            unavailable = self._settle(operation, breaker, e)
+            if unavailable is not None:
+                raise unavailable from e
+            raise
+        except BaseException:
+            # Cancelled, e.g. the client went away: give the probe slot back
+            breaker.release()
+            raise
+        self._settle(operation, breaker)
+        return response
+
+    async def search(self, query_params, use_cache=True):
+        """Asynchronous counterpart of ElasticsearchService.search."""
+        query_params, aggregations_key, cached_aggregations = self._prepare_aggregations(query_params)
+        response = await self._search(query_params, use_cache)
+        return self._finish_aggregations(response, aggregations_key, cached_aggregations)
+
+    async def search_degraded(self, query_params, error):
+        """Asynchronous counterpart of ElasticsearchService.search_degraded."""
+        stale, retry_params = self._plan_degraded_search(query_params, error)
+        if stale is not None:
+            return stale, "stale"
+        with deadline_budget(settings.SEARCH_DEGRADED_BUDGET):
+            try:
+                response = await self.search(retry_params)
+            except ElasticsearchUnavailable:
+                raise error
+        return response, "no-aggregations"
+
+    async def _search(self, query_params, use_cache):
+        if query_params.get("pagination") == "cursor":
+            return await self._search_with_cursor(query_params)
+
+        cache, cache_key = self._get_search_cache(query_params, use_cache)
+        if cache is not None:
+            cached = cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        async def fetch():
+            try:
+                started = time.perf_counter()
+                response = await self._call("search", lambda client: self._send_search(query_params, client=client))
+                _es_call_finished("search", response, started)
+                if cache is not None:
+                    cache.set(cache_key, response)
+                return response
+            except Exception as e:
+                observe_es_call("search", failed=True)
+                logger.error(f"Error searching Elasticsearch: {str(e)}")
+                raise
+
+        return await self._coalesce("search", cache_key or make_query_key(query_params), fetch)
+
+    async def _send_search(self, params, pit_id=None, client=None, **extra):
+        """Asynchronous counterpart of ElasticsearchService._send_search."""
+        client = client or self.client
+        if pit_id is None and not extra and use_search_template():
+            try:
+                return await client.search_template(
+                    index=self.index, id=get_search_template_id(), params=build_template_params(params)
+                )
+            except NotFoundError as e:
+                if not is_missing_template_error(e):
+                    raise
+                mark_search_template_missing()
+        return await self._send_inline_search(params, pit_id, client, **extra)
+
+    async def _search_with_cursor(self, params):
+        pit_id = self._get_cursor_pit(params)
+        if pit_id is None:
+            pit = await self._call("open_pit", self._open_point_in_time, hedge=False)
+            pit_id = pit["id"]
+
+        try:
+            started = time.perf_counter()
+            response = await self._call("search", lambda client: self._send_search(params, pit_id, client))
+            _es_call_finished("search", response, started)
+            return response
+        except NotFoundError as e:
+            raise CursorExpiredError("Cursor has expired, restart the search.") from e
+        except Exception as e:
+            observe_es_call("search", failed=True)
+            logger.error(f"Error searching Elasticsearch: {str(e)}")
+            raise
+
+    async def get_next_cursor(self, params, response):
+        """Asynchronous counterpart of ElasticsearchService.get_next_cursor."""
+        token, finished_pit = self._next_cursor_state(params, response)
+        if finished_pit:
+            try:
+                await self.client.close_point_in_time(id=finished_pit)
+            except Exception as e:
+                logger.warning(f"Error closing point in time: {str(e)}")
+        return token
+
+    async def _coalesce(self, flight, key, func):
+        """
+        Asynchronous counterpart of ElasticsearchService._coalesce.
+
+        Calls are coalesced within the event loop only; the cache-backed
+        cross-process variant is not used from async code.
+        """
+        if not settings.SINGLEFLIGHT_ENABLED:
+            return await func()
+        return await get_flight(flight).ado(key, func)
+
+    async def get_index_generation(self):
+        """Asynchronous counterpart of ElasticsearchService.get_index_generation."""
+        if not settings.SEARCH_ETAG_ENABLED:
+            return None
+        entry = await get_index_generation_cache().aget_or_load(self.index, self._fetch_index_generation)
+        return entry.value
+
+    async def _fetch_index_generation(self):
+        try:
+            started = time.perf_counter()
+            response = await self._call("stats", self._index_stats, hedge=False)
+            _es_call_finished("stats", response, started)
+        except Exception as e:
+            observe_es_call("stats", failed=True)
+            logger.warning(f"Error reading index generation: {str(e)}")
+            return None
+        return make_index_generation(response)
+
+    async def get_global_aggregations(self):
+        """Asynchronous counterpart of ElasticsearchService.get_global_aggregations."""
+        return await self._coalesce("aggregations", "global", self._fetch_global_aggregations)
+
+    async def _fetch_global_aggregations(self):
+        try:
+            started = time.perf_counter()
+            response = await self._call(
+                "aggregations", lambda client: client.search(index=self.index, body=GLOBAL_AGGREGATIONS_QUERY)
+            )
+            _es_call_finished("aggregations", response, started)
+            return response.get("aggregations", {})
+        except Exception as e:
+            observe_es_call("aggregations", failed=True)
+            logger.error(f"Error fetching global aggregations: {str(e)}")
+            raise
+
+    async def get_by_id(self, media_id):
+        """Asynchronous counterpart of ElasticsearchService.get_by_id."""
+        try:
+            started = time.perf_counter()
+            response = await self._call("get", lambda client: client.get(index=self.index, id=media_id))
+            _es_call_finished("get", response, started)
+            return response
+        except ElasticsearchUnavailable:
+            observe_es_call("get", failed=True)
+            raise
+        except Exception as e:
+            observe_es_call("get", failed=True)
+            logger.error(f"Error retrieving media item {media_id}: {str(e)}")
+            return None
+
+    async def get_by_ids(self, media_ids, use_cache=True):
+        """Asynchronous counterpart of ElasticsearchService.get_by_ids."""
+        cache, documents, missing = self._cached_documents(media_ids, use_cache)
+        if missing:
+            try:
+                started = time.perf_counter()
+                response = await self._call("mget", lambda client: self._send_mget(client, missing))
+                _es_call_finished("mget", response, started)
+            except Exception as e:
+                observe_es_call("mget", failed=True)
+                logger.error(f"Error retrieving media items {missing}: {str(e)}")
+                raise
+            self._store_documents(response, cache, documents)
+        return documents
+
+    async def msearch(self, searches, use_cache=True):
+        """Asynchronous counterpart of ElasticsearchService.msearch."""
+        results, pending, body = self._plan_msearch(searches, use_cache)
+        if not pending:
+            return results
+        try:
+            started = time.perf_counter()
+            response = await self._call("msearch", lambda client: client.msearch(searches=body))
+            _es_call_finished("msearch", response, started)
+        except Exception as e:
+            observe_es_call("msearch", failed=True)
+            logger.error(f"Error running Elasticsearch multi-search: {str(e)}")
+            raise
+        return self._finish_msearch(results, pending, response)
+
+    async def get_photographer_facet_page(self, size, after=None):
+        """Asynchronous counterpart of ElasticsearchService.get_photographer_facet_page."""
+        key = make_query_key({"size": size, "after": after})
+        return await self._coalesce(
+            "photographer_facet", key, lambda: self._fetch_photographer_facet_page(size, after)
+        )
+
+    async def _fetch_photographer_facet_page(self, size, after):
+        body = build_photographer_facet_query(size, after)
+        try:
+            started = time.perf_counter()
+            response = await self._call(
+                "photographer_facet", lambda client: client.search(index=self.index, body=body)
+            )
+            _es_call_finished("photographer_facet", response, started)
+        except Exception as e:
+            observe_es_call("photographer_facet", failed=True)
+            logger.error(f"Error fetching photographer facet page: {str(e)}")
+            raise
+        return self._parse_photographer_facet_page(response, size)
+
+    async def iter_hit_batches(self, query_params, batch_size=None):
+        """Asynchronous counterpart of ElasticsearchService.iter_hit_batches, as an async generator."""
+        batch_size = batch_size or settings.EXPORT_BATCH_SIZE
+        params = self._export_params(query_params, batch_size)
+        pit_id = (await self._call("open_pit", self._open_point_in_time, hedge=False))["id"]
+        search_after = None
+        try:
+            while True:
+                extra = {"track_total_hits": False}
+                if search_after is not None:
+                    extra["search_after"] = search_after
+                response = await self._call(
+                    "export",
+                    lambda client: self._send_inline_search(params, pit_id, client, **extra),
+                    hedge=False,
+                )
+                pit_id = response.get("pit_id", pit_id)
+                hits = response.get("hits", {}).get("hits", [])
+                if hits:
+                    yield hits
+                if len(hits) < batch_size:
+                    return
+                search_after = hits[-1]["sort"]
+        finally:
+            try:
+                await self.client.close_point_in_time(id=pit_id)
+            except Exception as e:
+                logger.warning(f"Error closing point in time: {str(e)}")
@@ -0,0 +1,216 @@
+import asyncio
+import logging
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .metrics import observe_coalesced_call
+from .resilience import DeadlineExceeded, remaining_budget
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    """A call in flight, which followers wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Collapse concurrent identical calls into one.
+
+    The first caller of a key (the leader) runs the call; callers arriving
+    while it is in flight (followers) wait for and share its result or
+    error instead of running it again. Once it finishes the key is free,
+    so later calls run afresh; caching results is left to the caller.
+
+    If ``backend`` names a Django cache, leaders of different processes are
+    coalesced too: only the process holding a lock in that cache runs the
+    call and publishes the result there for the others to pick up.
+    """
+
+    def __init__(self, name, backend=None):
+        """
+        Initialize the flight group.
+
+        Args:
+            name (str): Prefix of the lock and result keys in the cache backend
+            backend (str, optional): Alias of a Django cache from settings.CACHES
+        """
+        self.name = name
+        self.backend = backend
+        self.leaders = 0
+        self.followers = 0
+        self._calls = {}
+        self._async_calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func):
+        """
+        Run func for key unless an identical call is already in flight.
+
+        Followers wait at most the remaining deadline budget.
+
+        Args:
+            key (str): Identity of the call, e.g. a normalized query key
+            func (callable): Zero-argument callable making the call
+
+        Returns:
+            The result of func, possibly from another caller's run
+
+        Raises:
+            DeadlineExceeded: If a follower's budget ran out while waiting
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+            else:
+                self.followers += 1
+
+        if not leader:
+            observe_coalesced_call(self.name)
+            if not call.done.wait(max(remaining_budget(), 0)):
+                raise DeadlineExceeded(f"Timed out waiting for a coalesced {self.name} call")
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._run_shared(key, func) if self.backend else func()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def ado(self, key, func):
+        """
+        Asynchronous counterpart of do, coalescing calls within the event loop.
+
+        Args:
+            key (str): Identity of the call
+            func (callable): Zero-argument coroutine function making the call
+        """
+        loop = asyncio.get_running_loop()
+        flight_key = (id(loop), key)
+        with self._lock:
+            future = self._async_calls.get(flight_key)
+            leader = future is None
+            if leader:
+                future = self._async_calls[flight_key] = loop.create_future()
+                self.leaders += 1
+            else:
+                self.followers += 1
+
+        if not leader:
+            observe_coalesced_call(self.name)
+            try:
+                return await asyncio.wait_for(asyncio.shield(future), timeout=max(remaining_budget(), 0))
+            except asyncio.TimeoutError:
+                raise DeadlineExceeded(f"Timed out waiting for a coalesced {self.name} call")
+
+        try:
+            result = await func()
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the error as retrieved in case no follower is waiting
+            future.exception()
+            raise
+        except BaseException:
+            future.cancel()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._async_calls.pop(flight_key, None)
+
+    def _run_shared(self, key, func):
+        """
+        Run func for key unless another process already is, through the cache backend.
+
+        Falls back to running func locally if the backend fails, or if the
+        other process finishes without publishing a result in time.
+        """
+        cache = caches[self.backend]
+        lock_key = f"singleflight:{self.name}:{key}:lock"
+        result_key = f"singleflight:{self.name}:{key}:result"
+        token = uuid.uuid4().hex
+        try:
+            acquired = cache.add(lock_key, token, timeout=settings.SINGLEFLIGHT_LOCK_TIMEOUT)
+        except Exception as e:
+            logger.warning(f"Error taking {self.name} lock from cache backend: {str(e)}")
+            return func()
+
+        if acquired:
+            try:
+                result = func()
+                try:
+                    cache.set(result_key, result, timeout=settings.SINGLEFLIGHT_RESULT_TTL)
+                except Exception as e:
+                    logger.warning(f"Error publishing {self.name} result to cache backend: {str(e)}")
+                return result
+            finally:
+                try:
+                    if cache.get(lock_key) == token:
+                        cache.delete(lock_key)
+                except Exception as e:
+                    logger.warning(f"Error releasing {self.name} lock in cache backend: {str(e)}")
+
+        observe_coalesced_call(self.name)
+        deadline = time.monotonic() + max(remaining_budget(), 0)
+        interval = settings.SINGLEFLIGHT_POLL_INTERVAL_MS / 1000
+        try:
+            while time.monotonic() < deadline:
+                result = cache.get(result_key)
+                if result is not None:
+                    return result
+                if cache.get(lock_key) is None:
+                    # The other process gave up without a result, e.g. it failed
+                    break
+                time.sleep(interval)
+        except Exception as e:
+            logger.warning(f"Error waiting for {self.name} result in cache backend: {str(e)}")
+        return func()
+
+    def stats(self):
+        """Return the calls in flight and the leader/follower counters."""
+        with self._lock:
+            return {
+                "in_flight": len(self._calls) + len(self._async_calls),
+                "leaders": self.leaders,
+                "followers": self.followers,
+            }
+
+
+_flights = {}
+_flights_lock = threading.Lock()
+
+
+def get_flight(name):
+    """Return the process-wide SingleFlight group called name."""
+    with _flights_lock:
+        flight = _flights.get(name)
+        if flight is None:
+            flight = _flights[name] = SingleFlight(name, backend=settings.SINGLEFLIGHT_BACKEND or None)
+        return flight
+
+
+def reset_flights():
+    """Forget every flight group so they are rebuilt from settings."""
+    with _flights_lock:
+        _flights.clear()
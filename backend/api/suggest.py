@@ -0,0 +1,160 @@
+import heapq
+import threading
+import time
+import unicodedata
+from bisect import bisect_left
+
+# Sorts after every character a folded name can contain
+_PREFIX_END = "\U0010ffff"
+
+
+def fold(text):
+    """
+    Fold text for matching: case-folded, accents stripped, whitespace collapsed.
+
+    ``"Müller,  Jürgen"`` and ``"muller, jurgen"`` fold to the same string.
+    """
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return " ".join(stripped.split())
+
+
+class PrefixIndex:
+    """
+    Read-only prefix index over names with document counts.
+
+    Every word of a folded name is a key, so ``"doe"`` finds ``"John Doe"``.
+    Keys are kept in one sorted array; a prefix selects a contiguous range
+    of it by bisection. Names are numbered by descending count, so the best
+    matches are the smallest numbers in that range, which a sparse table of
+    range minimums yields one at a time in constant time: a query costs
+    O(log n + k log k) however many names match.
+    """
+
+    def __init__(self, buckets):
+        """
+        Build the index.
+
+        Args:
+            buckets (iterable): ``(name, count)`` pairs; repeated names are summed
+        """
+        counts = {}
+        for name, count in buckets:
+            if name:
+                counts[name] = counts.get(name, 0) + count
+        ranked = sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+        self.names = [name for name, _ in ranked]
+        self.counts = [count for _, count in ranked]
+
+        keys = []
+        for rank, name in enumerate(self.names):
+            words = fold(name).split(" ")
+            for position in range(len(words)):
+                keys.append((" ".join(words[position:]), rank))
+        keys.sort()
+        self._keys = [key for key, _ in keys]
+        self._ranks = [rank for _, rank in keys]
+        self._minimums = self._build_minimums(self._ranks)
+        self.built_at = time.time()
+
+    @staticmethod
+    def _build_minimums(ranks):
+        """Return the sparse table: level j holds the position of the minimum of every 2**j run."""
+        table = [list(range(len(ranks)))]
+        width = 1
+        while width * 2 <= len(ranks):
+            previous = table[-1]
+            table.append([
+                previous[i] if ranks[previous[i]] <= ranks[previous[i + width]] else previous[i + width]
+                for i in range(len(ranks) - 2 * width + 1)
+            ])
+            width *= 2
+        return table
+
+    def _range_minimum(self, start, end):
+        """Return the position of the smallest rank in ``[start, end)``."""
+        level = (end - start).bit_length() - 1
+        row = self._minimums[level]
+        left, right = row[start], row[end - (1 << level)]
+        return left if self._ranks[left] <= self._ranks[right] else right
+
+    def __len__(self):
+        return len(self.names)
+
+    def suggest(self, query, limit=10):
+        """
+        Return the most frequent names with a word starting with query.
+
+        Args:
+            query (str): Typed prefix, matched after folding
+            limit (int): Maximum number of suggestions
+
+        Returns:
+            list: ``{"name", "count"}`` dicts by descending count
+        """
+        prefix = fold(query)
+        if not prefix:
+            return self._entries(range(min(limit, len(self.names))))
+
+        start = bisect_left(self._keys, prefix)
+        end = bisect_left(self._keys, prefix + _PREFIX_END, start)
+        ranks = []
+        seen = set()
+        candidates = []
+        if start < end:
+            position = self._range_minimum(start, end)
+            candidates.append((self._ranks[position], position, start, end))
+        while candidates and len(ranks) < limit:
+            rank, position, low, high = heapq.heappop(candidates)
+            # A name is reached once per matching word
+            if rank not in seen:
+                seen.add(rank)
+                ranks.append(rank)
+            for low, high in ((low, position), (position + 1, high)):
+                if low < high:
+                    best = self._range_minimum(low, high)
+                    heapq.heappush(candidates, (self._ranks[best], best, low, high))
+        return self._entries(ranks)
+
+    def _entries(self, ranks):
+        return [{"name": self.names[rank], "count": self.counts[rank]} for rank in ranks]
+
+
+# The current index and the aggregations entry it was built from, as one
+# tuple so readers never see one without the other
+_photographer_index = (None, None)
+_photographer_index_lock = threading.Lock()
+
+
+def get_photographer_index(aggregations_entry):
+    """
+    Return the photographer index for a global aggregations cache entry.
+
+    The index is rebuilt only when the aggregations cache has produced a new
+    entry, so it is refreshed whenever the aggregations are.
+
+    Args:
+        aggregations_entry (CacheEntry): Entry of the global aggregations cache
+
+    Returns:
+        PrefixIndex: Index of the photographer buckets
+    """
+    global _photographer_index
+    version = aggregations_entry.value["etag"]
+    built_from, index = _photographer_index
+    if built_from == version:
+        return index
+    with _photographer_index_lock:
+        built_from, index = _photographer_index
+        if built_from != version:
+            buckets = aggregations_entry.value["data"].get("photographer_terms", {}).get("buckets", [])
+            index = PrefixIndex((bucket["key"], bucket["doc_count"]) for bucket in buckets)
+            _photographer_index = (version, index)
+        return index
+
+
+def reset_photographer_index():
+    """Forget the photographer index so it is rebuilt on next use."""
+    global _photographer_index
+    with _photographer_index_lock:
+        _photographer_index = (None, None)
@@ -1,14 +1,80 @@
+import io
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
 import pytest
 from unittest.mock import Mock, patch
+from PIL import Image
 from rest_framework.test import APIClient
 
 
+@pytest.fixture(autouse=True)
+def reset_elasticsearch_clients():
+    """Fixture to give every test a fresh process-wide client registry."""
+    from api.services import close_elasticsearch_clients
+
+    close_elasticsearch_clients()
+    yield
+    close_elasticsearch_clients()
+
+
+@pytest.fixture(autouse=True)
+def reset_caches():
+    """Fixture to give every test empty process-wide caches."""
+    from api.cache import reset_caches
+
+    reset_caches()
+    yield
+    reset_caches()
+
+
+@pytest.fixture(autouse=True)
+def reset_circuit_breaker():
+    """Fixture to give every test a closed circuit breaker."""
+    from api.resilience import reset_circuit_breaker
+
+    reset_circuit_breaker()
+    yield
+    reset_circuit_breaker()
+
+
+@pytest.fixture(autouse=True)
+def reset_flights():
+    """Fixture to give every test fresh single-flight groups."""
+    from api.singleflight import reset_flights
+
+    reset_flights()
+    yield
+    reset_flights()
+
+
+@pytest.fixture(autouse=True)
+def reset_endpoint_latencies():
+    """Fixture to give every test empty latency histograms."""
+    from api.timing import get_endpoint_latencies
+
+    get_endpoint_latencies().clear()
+    yield
+    get_endpoint_latencies().clear()
+
+
 @pytest.fixture
 def mock_elasticsearch_client():
     """Fixture to mock Elasticsearch client."""
     # Patch the Elasticsearch client in the services module where it's actually used
     with patch("api.services.Elasticsearch") as mock_es:
         mock_client = Mock()
+        # Per-call options such as the deadline budget apply to the same mock
+        mock_client.options.return_value = mock_client
+        mock_client.indices.stats.return_value = {
+            "_all": {
+                "primaries": {
+                    "docs": {"count": 2, "deleted": 0},
+                    "indexing": {"index_total": 2, "delete_total": 0},
+                }
+            },
+            "indices": {"imago": {"uuid": "generation-1"}},
+        }
         mock_es.return_value = mock_client
         yield mock_client
 
@@ -75,3 +141,90 @@ def sample_search_response():
             },
         },
     }
+
+
+@pytest.fixture
+def sample_global_aggregations():
+    """Fixture to provide sample Elasticsearch global aggregations."""
+    return {
+        "all_docs": {
+            "doc_count": 3,
+            "db_terms": {"buckets": [{"key": "st", "doc_count": 3}]},
+            "photographer_terms": {
+                "buckets": [
+                    {"key": "John Doe", "doc_count": 2},
+                    {"key": "Jane Smith", "doc_count": 1},
+                ]
+            },
+        }
+    }
+
+
+class ImageServer:
+    """Local stand-in for the Imago image host."""
+
+    def __init__(self):
+        image = Image.new("RGB", (800, 600), color=(200, 30, 30))
+        output = io.BytesIO()
+        image.save(output, format="JPEG")
+        self.image = output.getvalue()
+        self.requests = []
+        self.missing = set()
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests.append(self.path)
+                if self.path in server.missing:
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "image/jpeg")
+                self.send_header("Content-Length", str(len(server.image)))
+                self.end_headers()
+                self.wfile.write(server.image)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self.thread = threading.Thread(
+            target=self.httpd.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+        )
+        self.thread.start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def image_server(settings, tmp_path):
+    """Fixture serving images locally, with thumbnails cached under tmp_path."""
+    from api.thumbnails import reset_thumbnail_cache
+
+    server = ImageServer()
+    settings.IMAGO_BASE_URL = server.url
+    settings.MEDIA_ROOT = str(tmp_path)
+    reset_thumbnail_cache()
+    yield server
+    reset_thumbnail_cache()
+    server.close()
+
+
+@pytest.fixture
+def fake_elasticsearch(settings):
+    """Fixture pointing the shared clients at a local Elasticsearch stand-in."""
+    from api.services import close_elasticsearch_clients
+    from api.tests.load import FakeElasticsearch
+
+    server = FakeElasticsearch()
+    settings.ELASTICSEARCH_HOST = server.host
+    settings.ELASTICSEARCH_PORT = server.port
+    close_elasticsearch_clients()
+    yield server
+    close_elasticsearch_clients()
+    server.close()
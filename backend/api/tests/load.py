@@ -0,0 +1,281 @@
+import json
+import re
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+
+class FakeElasticsearch:
+    """
+    Local HTTP stand-in for an Elasticsearch cluster.
+
+    Answers ``_search``, ``_search/template``, ``_msearch``, ``_mget`` and
+    point-in-time requests with canned documents, after an optional delay,
+    so the real client and the whole request path can be exercised offline.
+    It runs in the test process, so its threads compete with the code under
+    test; compare numbers between runs on the same machine only.
+
+    Attributes:
+        latency (float): Seconds to wait before every response
+        total_hits (int): Number of documents matching every search
+        aggregation_latency (float): Extra seconds to wait before answering
+            searches that ask for aggregations
+        fail_status (int): If set, every request fails with this status
+        requests (Counter): Requests served, by endpoint
+    """
+
+    def __init__(self, latency=0.0, total_hits=1000):
+        self.latency = latency
+        self.total_hits = total_hits
+        self.aggregation_latency = 0.0
+        self.fail_status = None
+        self.requests = Counter()
+        self._lock = threading.Lock()
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # Keep-alive, like a real cluster, so the client's pool is exercised
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                self._handle()
+
+            def do_POST(self):
+                self._handle()
+
+            def do_PUT(self):
+                self._handle()
+
+            def do_DELETE(self):
+                self._handle()
+
+            def _handle(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                status, payload = server.respond(self.command, urlparse(self.path).path, body)
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.send_header("X-Elastic-Product", "Elasticsearch")
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.host = "http://127.0.0.1"
+        self.port = self.httpd.server_address[1]
+        self.thread = threading.Thread(
+            target=self.httpd.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+        )
+        self.thread.start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def _count(self, endpoint):
+        with self._lock:
+            self.requests[endpoint] += 1
+
+    def respond(self, method, path, body):
+        """Return the status and JSON payload for a request."""
+        if self.latency:
+            time.sleep(self.latency)
+        endpoint = self._endpoint(method, path)
+        self._count(endpoint)
+        if self.fail_status and endpoint != "info":
+            return self.fail_status, {
+                "error": {"type": "fake_failure", "reason": "Configured to fail"},
+                "status": self.fail_status,
+            }
+
+        if endpoint == "msearch":
+            lines = [json.loads(line) for line in body.splitlines() if line.strip()]
+            searches = lines[1::2]
+            return 200, {"took": 1, "responses": [self.search(search) for search in searches]}
+        if endpoint == "search":
+            return 200, self.search(json.loads(body) if body else {})
+        if endpoint == "search_template":
+            params = json.loads(body).get("params", {})
+            return 200, self.search({"size": params.get("size", 20), "from": params.get("from", 0)})
+        if endpoint == "mget":
+            return 200, {"docs": [self.document(media_id) for media_id in json.loads(body).get("ids", [])]}
+        if endpoint == "open_pit":
+            return 200, {"id": "fake-pit"}
+        if endpoint == "close_pit":
+            return 200, {"succeeded": True, "num_freed": 1}
+        if endpoint == "get":
+            return 200, self.document(path.rsplit("/", 1)[1])
+        if endpoint == "stats":
+            return 200, {
+                "_all": {
+                    "primaries": {
+                        "docs": {"count": self.total_hits, "deleted": 0},
+                        "indexing": {"index_total": self.total_hits, "delete_total": 0},
+                    }
+                },
+                "indices": {"imago": {"uuid": "fake-uuid"}},
+            }
+        if endpoint == "info":
+            return 200, {"version": {"number": "8.11.1"}, "tagline": "You Know, for Search"}
+        return 404, {"error": {"type": "resource_not_found_exception", "reason": path}, "status": 404}
+
+    def _endpoint(self, method, path):
+        if path.endswith("/_msearch"):
+            return "msearch"
+        if path.endswith("/_search/template"):
+            return "search_template"
+        if path.endswith("/_search"):
+            return "search"
+        if path.endswith("/_mget"):
+            return "mget"
+        if path.endswith("/_pit"):
+            return "close_pit" if method == "DELETE" else "open_pit"
+        if re.search(r"/_stats(/[^/]+)?$", path):
+            return "stats"
+        if re.search(r"/_doc/[^/]+$", path):
+            return "get"
+        if path == "/":
+            return "info"
+        return "other"
+
+    def source(self, number):
+        """Return the canned ``_source`` of document number."""
+        return {
+            "bildnummer": str(100000 + number),
+            "datum": "2024-01-01T00:00:00",
+            "suchtext": f"Fake image {number}",
+            "fotografen": f"Photographer {number % 25}",
+            "breite": 800,
+            "hoehe": 600,
+            "db": "st" if number % 2 else "sp",
+        }
+
+    def document(self, media_id):
+        """Return an ``_mget``/``GET`` item; ids past total_hits are not found."""
+        try:
+            number = int(media_id)
+        except ValueError:
+            return {"_index": "imago", "_id": media_id, "found": False}
+        if number >= self.total_hits:
+            return {"_index": "imago", "_id": media_id, "found": False}
+        return {"_index": "imago", "_id": media_id, "found": True, "_source": self.source(number)}
+
+    def search(self, body):
+        """Return a search response paginated over total_hits canned documents."""
+        start = body.get("from", 0)
+        size = body.get("size", 20)
+        if "search_after" in body:
+            start = body["search_after"][-1] + 1
+        hits = [
+            {"_index": "imago", "_id": str(number), "_score": 1.0, "_source": self.source(number), "sort": [number, number]}
+            for number in range(start, min(start + size, self.total_hits))
+        ]
+        response = {
+            "took": 1,
+            "timed_out": False,
+            "hits": {"total": {"value": self.total_hits, "relation": "eq"}, "hits": hits},
+        }
+        if "pit" in body:
+            response["pit_id"] = body["pit"]["id"]
+        aggs = body.get("aggs", {})
+        if aggs and self.aggregation_latency:
+            time.sleep(self.aggregation_latency)
+        if "all_docs" in aggs:
+            response["aggregations"] = {"all_docs": {"doc_count": self.total_hits, **self._buckets()}}
+        elif aggs:
+            response["aggregations"] = {name: value for name, value in self._buckets().items() if name in aggs}
+        return response
+
+    def _buckets(self):
+        return {
+            "db_terms": {"buckets": [
+                {"key": "st", "doc_count": self.total_hits // 2},
+                {"key": "sp", "doc_count": self.total_hits - self.total_hits // 2},
+            ]},
+            "photographer_terms": {"buckets": [
+                {"key": f"Photographer {number}", "doc_count": self.total_hits // 25} for number in range(25)
+            ]},
+        }
+
+
+class LoadResult:
+    """Latencies and errors of a load run."""
+
+    def __init__(self, name, latencies, errors, elapsed, concurrency):
+        self.name = name
+        self.latencies = sorted(latencies)
+        self.errors = errors
+        self.elapsed = elapsed
+        self.concurrency = concurrency
+
+    @property
+    def requests(self):
+        return len(self.latencies) + self.errors
+
+    @property
+    def throughput(self):
+        """Requests per second over the whole run."""
+        return self.requests / self.elapsed if self.elapsed else 0.0
+
+    def percentile(self, percent):
+        """Return the latency percentile in seconds (nearest rank)."""
+        if not self.latencies:
+            return 0.0
+        rank = max(int(round(percent / 100 * len(self.latencies))) - 1, 0)
+        return self.latencies[min(rank, len(self.latencies) - 1)]
+
+    def report(self):
+        """Return a one-line summary of the run."""
+        return (
+            f"{self.name}: {self.requests} requests at concurrency {self.concurrency}, "
+            f"{self.throughput:.0f} req/s, p50 {self.percentile(50) * 1000:.1f} ms, "
+            f"p95 {self.percentile(95) * 1000:.1f} ms, p99 {self.percentile(99) * 1000:.1f} ms, "
+            f"{self.errors} errors"
+        )
+
+
+def run_load(name, make_request, requests, concurrency):
+    """
+    Call make_request from concurrency threads until requests calls are done.
+
+    Args:
+        name (str): Label of the run
+        make_request (callable): Called with the request number; must return
+            True on success
+        requests (int): Total number of calls
+        concurrency (int): Number of calls kept in flight
+
+    Returns:
+        LoadResult: Latencies and errors of the run
+    """
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+
+    def call(number):
+        nonlocal errors
+        start = time.perf_counter()
+        try:
+            ok = make_request(number)
+        except Exception:
+            ok = False
+        elapsed = time.perf_counter() - start
+        with lock:
+            if ok:
+                latencies.append(elapsed)
+            else:
+                errors += 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(call, range(requests)))
+    return LoadResult(name, latencies, errors, time.perf_counter() - start, concurrency)
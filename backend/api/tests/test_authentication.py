@@ -0,0 +1,99 @@
+import os
+import subprocess
+import sys
+
+import pytest
+from django.contrib.auth.models import User
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.authentication import CachedJWTAuthentication, ClaimsTokenObtainPairSerializer
+
+
+def _request(token):
+    return APIRequestFactory().get("/api/pool-stats/", HTTP_AUTHORIZATION=f"Bearer {token}")
+
+
+@pytest.mark.django_db
+class TestCachedJWTAuthentication:
+    """Test cases for CachedJWTAuthentication."""
+
+    def test_user_is_loaded_once(self, django_assert_num_queries):
+        """Test that later requests of a user are authenticated without a query."""
+        user = User.objects.create_user(username="editor", password="secret")
+        token = str(AccessToken.for_user(user))
+        authentication = CachedJWTAuthentication()
+
+        with django_assert_num_queries(1):
+            first, _ = authentication.authenticate(_request(token))
+        with django_assert_num_queries(0):
+            second, _ = authentication.authenticate(_request(token))
+
+        assert first == second == user
+        assert first is not second
+
+    def test_inactive_users_are_rejected(self):
+        """Test that the database checks still apply when the user is loaded."""
+        user = User.objects.create_user(username="editor", password="secret", is_active=False)
+
+        with pytest.raises(AuthenticationFailed):
+            CachedJWTAuthentication().authenticate(_request(AccessToken.for_user(user)))
+
+    def test_staff_endpoint_with_token(self, api_client):
+        """Test that a token from the token endpoint authenticates staff requests."""
+        User.objects.create_user(username="admin", password="secret", is_staff=True)
+        response = api_client.post(reverse("token_obtain_pair"), {"username": "admin", "password": "secret"})
+        assert response.status_code == status.HTTP_200_OK
+
+        api_client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.json()['access']}")
+        assert api_client.get(reverse("pool-stats")).status_code == status.HTTP_200_OK
+
+
+@pytest.mark.django_db
+class TestStatelessAuthentication:
+    """Test cases for token claims used by stateless authentication."""
+
+    def test_user_is_built_from_claims(self, django_assert_num_queries, settings):
+        """Test that staff status comes from the token without touching the database."""
+        settings.JWT_AUTH_MODE = "stateless"
+        user = User.objects.create_user(username="admin", password="secret", is_staff=True)
+        token = ClaimsTokenObtainPairSerializer.get_token(user).access_token
+
+        with django_assert_num_queries(0):
+            token_user, _ = JWTStatelessUserAuthentication().authenticate(_request(token))
+
+        assert token_user.id == user.id
+        assert token_user.username == "admin"
+        assert token_user.is_staff is True
+        assert token_user.is_superuser is False
+
+    def test_claims_only_in_stateless_mode(self, settings):
+        """Test that other modes keep staff status out of the token."""
+        settings.JWT_AUTH_MODE = "cached"
+        user = User.objects.create_user(username="admin", password="secret", is_staff=True)
+
+        token = ClaimsTokenObtainPairSerializer.get_token(user).access_token
+
+        assert "is_staff" not in token
+        assert "username" not in token
+
+
+def test_unknown_auth_mode_is_rejected():
+    """Test that a misspelt JWT_AUTH_MODE fails with the allowed values."""
+    env = {**os.environ, "JWT_AUTH_MODE": "statless"}
+    backend = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    result = subprocess.run(
+        [sys.executable, "-c", "import media_manager.settings"],
+        env=env,
+        cwd=backend,
+        capture_output=True,
+        text=True,
+    )
+
+    assert result.returncode != 0
+    assert "ImproperlyConfigured" in result.stderr
+    assert "database, cached, stateless" in result.stderr
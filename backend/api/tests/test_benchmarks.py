@@ -0,0 +1,159 @@
+import gzip
+import json
+import time
+from datetime import date
+
+import brotli
+import pytest
+from rest_framework.renderers import JSONRenderer
+
+from api.queries import build_template, compile_search_query, compile_search_query_bytes
+from api.renderers import ORJSONRenderer
+from api.serializers import serialize_search_response
+from api.suggest import PrefixIndex
+
+
+def _results(count):
+    """Build collected search results with count hits."""
+    return {
+        "total": count,
+        "aggregations": {"db_terms": {"buckets": [{"key": "st", "doc_count": count}]}},
+        "results": [
+            {
+                "_id": str(i),
+                "_score": 1.0,
+                "_source": {
+                    "bildnummer": str(100000 + i),
+                    "datum": "2024-01-01T00:00:00",
+                    "suchtext": f"Test image {i}",
+                    "fotografen": "John Doe",
+                    "breite": 800,
+                    "hoehe": 600,
+                    "db": "st",
+                },
+            }
+            for i in range(count)
+        ],
+    }
+
+
+def _best_of(func, rounds=3, number=5):
+    """Return the best per-call time of func in seconds."""
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+class TestSearchResponseBenchmark:
+    """Benchmarks comparing the fast and strict search response paths."""
+
+    def test_fast_path_matches_strict_path(self):
+        """Test that both paths produce the same payload."""
+        results = _results(100)
+        assert serialize_search_response(results) == serialize_search_response(results, strict=True)
+
+    @pytest.mark.benchmark
+    def test_fast_path_is_faster_for_100_hits(self):
+        """Benchmark serializing a 100-hit page through both paths."""
+        results = _results(100)
+
+        fast = _best_of(lambda: serialize_search_response(results))
+        strict = _best_of(lambda: serialize_search_response(results, strict=True))
+
+        print(f"\n100 hits: fast {fast * 1000:.3f} ms, strict {strict * 1000:.3f} ms, "
+              f"speedup {strict / fast:.1f}x")
+        assert fast < strict
+
+
+class TestQueryBuildBenchmark:
+    """Benchmarks comparing compiled and freshly built search bodies."""
+
+    PARAMS = {
+        "query": "football",
+        "db": ["st", "sp"],
+        "photographer": ["John Doe", "Jane Smith"],
+        "date_from": date(2024, 1, 1),
+        "date_to": date(2024, 12, 31),
+        "page": 3,
+        "page_size": 50,
+        "sort_by": "date",
+        "aggs": "full",
+    }
+
+    @pytest.mark.benchmark
+    def test_compiled_query_is_faster(self):
+        """Benchmark building and serializing a search body per request."""
+        params = self.PARAMS
+
+        def fresh():
+            body = build_template(params)
+            body["from"] = 100
+            return json.dumps(body).encode("utf-8")
+
+        compile_search_query_bytes(params)
+        uncached = _best_of(fresh, number=200)
+        compiled = _best_of(lambda: compile_search_query(params), number=200)
+        preserialized = _best_of(lambda: compile_search_query_bytes(params), number=200)
+
+        print(f"\nquery build: fresh {uncached * 1e6:.1f} us, compiled dict {compiled * 1e6:.1f} us, "
+              f"compiled bytes {preserialized * 1e6:.1f} us, speedup {uncached / preserialized:.1f}x")
+        assert preserialized < uncached
+
+
+class TestPhotographerSuggestBenchmark:
+    """Benchmarks of photographer suggestions over a full-size index."""
+
+    @pytest.mark.benchmark
+    def test_suggestions_take_under_a_millisecond(self):
+        """Benchmark suggesting from 10,000 photographers."""
+        first_names = ["Anna", "Ben", "Carla", "David", "Eva", "Felix", "Greta", "Hans", "Ida", "Jan"]
+        buckets = [
+            (f"{first_names[i % 10]} Müller-{i:05d}", 10000 - i) for i in range(10000)
+        ]
+        index = PrefixIndex(buckets)
+
+        timings = {}
+        for query in ("m", "mu", "mül", "anna mu", "mueller-0042"):
+            timings[query] = _best_of(lambda: index.suggest(query), number=200)
+
+        print("\nsuggest over 10,000 names: " + ", ".join(
+            f"{query!r} {seconds * 1e6:.1f} us" for query, seconds in timings.items()
+        ))
+        assert max(timings.values()) < 0.001
+
+
+class TestResponseEncodingBenchmark:
+    """Benchmarks of rendering and compressing a 100-hit search page."""
+
+    @pytest.mark.benchmark
+    def test_orjson_renders_faster(self):
+        """Benchmark rendering a 100-hit page with orjson and DRF's JSONRenderer."""
+        data = serialize_search_response(_results(100))
+
+        drf = _best_of(lambda: JSONRenderer().render(data), number=50)
+        fast = _best_of(lambda: ORJSONRenderer().render(data), number=50)
+
+        print(f"\nrender 100 hits: json {drf * 1000:.3f} ms, orjson {fast * 1000:.3f} ms, "
+              f"speedup {drf / fast:.1f}x")
+        assert fast < drf
+
+    @pytest.mark.benchmark
+    def test_compressed_bytes_on_the_wire(self):
+        """Benchmark the size and cost of compressing a 100-hit page."""
+        content = ORJSONRenderer().render(serialize_search_response(_results(100)))
+
+        encoded = {
+            "gzip": (lambda: gzip.compress(content, compresslevel=6)),
+            "br": (lambda: brotli.compress(content, quality=4)),
+        }
+        sizes = {name: len(compress()) for name, compress in encoded.items()}
+        timings = {name: _best_of(compress, number=20) for name, compress in encoded.items()}
+
+        print(f"\n100 hits on the wire: identity {len(content)} B, " + ", ".join(
+            f"{name} {sizes[name]} B in {timings[name] * 1000:.3f} ms" for name in encoded
+        ))
+        assert max(sizes.values()) < len(content) / 4
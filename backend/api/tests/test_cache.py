@@ -0,0 +1,167 @@
+import pytest
+import threading
+import time
+from unittest.mock import Mock
+
+from datetime import date
+
+from api.cache import LRUCache, RefreshingCache, make_query_key
+
+
+class FakeClock:
+    """Manually advanced clock for cache expiry tests."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestLRUCache:
+    """Test cases for LRUCache."""
+
+    def test_get_and_set(self):
+        """Test storing and retrieving values with hit/miss counters."""
+        cache = LRUCache(maxsize=2)
+        assert cache.get("a") is None
+        cache.set("a", 1)
+        assert cache.get("a") == 1
+
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+
+    def test_evicts_least_recently_used(self):
+        """Test that the least recently used entry is evicted first."""
+        cache = LRUCache(maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
+        assert cache.stats()["evictions"] == 1
+
+    def test_entries_expire(self):
+        """Test that entries older than the TTL are dropped."""
+        clock = FakeClock()
+        cache = LRUCache(maxsize=2, ttl=10, timer=clock)
+        cache.set("a", 1)
+
+        clock.now += 9
+        assert cache.get("a") == 1
+        clock.now += 1
+        assert cache.get("a") is None
+        assert len(cache) == 0
+
+    def test_expired_entries_are_kept_for_get_stale(self):
+        """Test that expired entries stay readable with get_stale for stale_ttl."""
+        clock = FakeClock()
+        cache = LRUCache(maxsize=2, ttl=10, stale_ttl=5, timer=clock)
+        cache.set("a", 1)
+
+        clock.now += 12
+        assert cache.get("a") is None
+        assert cache.get_stale("a") == 1
+        clock.now += 3
+        assert cache.get("a") is None
+        assert cache.get_stale("a") is None
+        assert len(cache) == 0
+
+
+class TestRefreshingCache:
+    """Test cases for RefreshingCache."""
+
+    def test_fresh_entry_is_not_reloaded(self):
+        """Test that a fresh entry is served without calling the loader."""
+        clock = FakeClock()
+        cache = RefreshingCache("test", ttl=10, stale_ttl=10, timer=clock)
+        loader = Mock(return_value="value")
+
+        cache.get_or_load("key", loader)
+        entry = cache.get_or_load("key", loader)
+
+        assert entry.value == "value"
+        assert entry.created_at == clock.now
+        loader.assert_called_once()
+
+    def test_stale_entry_is_served_while_refreshing(self):
+        """Test stale-while-revalidate behaviour."""
+        clock = FakeClock()
+        cache = RefreshingCache("test", ttl=10, stale_ttl=10, timer=clock)
+        cache.get_or_load("key", lambda: "old")
+
+        refreshed = threading.Event()
+
+        def loader():
+            refreshed.set()
+            return "new"
+
+        clock.now += 15
+        entry = cache.get_or_load("key", loader)
+        assert entry.value == "old"
+
+        assert refreshed.wait(timeout=5)
+        for _ in range(100):
+            if cache.local.get("key") == "new":
+                break
+            time.sleep(0.01)
+        assert cache.get_or_load("key", loader).value == "new"
+
+    def test_expired_entry_is_reloaded_synchronously(self):
+        """Test that entries past the stale window are reloaded inline."""
+        clock = FakeClock()
+        cache = RefreshingCache("test", ttl=10, stale_ttl=10, timer=clock)
+        cache.get_or_load("key", lambda: "old")
+
+        clock.now += 25
+        assert cache.get_or_load("key", lambda: "new").value == "new"
+
+    def test_entries_are_shared_through_django_cache(self):
+        """Test that a second process-local cache reuses the backend entry."""
+        first = RefreshingCache("shared-test", ttl=10, backend="default")
+        second = RefreshingCache("shared-test", ttl=10, backend="default")
+        first.get_or_load("key", lambda: "value")
+
+        loader = Mock(return_value="other")
+        assert second.get_or_load("key", loader).value == "value"
+        loader.assert_not_called()
+
+        first.invalidate()
+        assert second.local.get("key") == "value"
+        second.local.clear()
+        assert second.get_or_load("key", loader).value == "other"
+
+
+class TestMakeQueryKey:
+    """Test cases for make_query_key."""
+
+    def test_equivalent_searches_share_a_key(self):
+        """Test that filter order, duplicates and empty values are ignored."""
+        first = {
+            "query": "football ",
+            "db": ["st", "sp"],
+            "photographer": [],
+            "date_from": date(2024, 1, 1),
+            "page": 1,
+        }
+        second = {
+            "query": "football",
+            "db": ["sp", "st", "st"],
+            "date_from": date(2024, 1, 1),
+            "page": 1,
+            "sort_by": "",
+        }
+        assert make_query_key(first) == make_query_key(second)
+
+    def test_different_searches_have_different_keys(self):
+        """Test that any meaningful parameter changes the key."""
+        base = {"query": "football", "page": 1}
+        assert make_query_key(base) != make_query_key({**base, "page": 2})
+        assert make_query_key(base) != make_query_key({**base, "db": ["st"]})
+        assert make_query_key(base, exclude=("page",)) == make_query_key(
+            {**base, "page": 2}, exclude=("page",)
+        )
@@ -0,0 +1,93 @@
+import os
+import threading
+
+import pytest
+from django.test import Client
+from django.urls import reverse
+
+from api.services import ElasticsearchService
+from api.tests.load import run_load
+
+# Knobs for longer runs, e.g. LOAD_TEST_REQUESTS=5000 pytest api/tests/test_load.py -s
+REQUESTS = int(os.getenv("LOAD_TEST_REQUESTS", "200"))
+CONCURRENCY = int(os.getenv("LOAD_TEST_CONCURRENCY", "8"))
+FAKE_LATENCY = float(os.getenv("LOAD_TEST_ES_LATENCY_MS", "5")) / 1000
+# Generous by default so slow CI machines pass; tighten locally to catch regressions
+MAX_P95 = float(os.getenv("LOAD_TEST_MAX_P95_MS", "1000")) / 1000
+
+
+def _drive(name, url, params_for):
+    """Run the load against url with one Django test client per thread."""
+    clients = threading.local()
+
+    def make_request(number):
+        if not hasattr(clients, "client"):
+            clients.client = Client()
+        response = clients.client.get(url, params_for(number))
+        return response.status_code == 200
+
+    result = run_load(name, make_request, REQUESTS, CONCURRENCY)
+    print(f"\n{result.report()}")
+    assert result.errors == 0
+    assert result.percentile(95) < MAX_P95
+    return result
+
+
+class TestFakeElasticsearch:
+    """Test cases for the Elasticsearch stand-in itself."""
+
+    def test_serves_the_real_client(self, fake_elasticsearch):
+        """Test _search, _msearch, _mget and point-in-time paging through the real client."""
+        service = ElasticsearchService()
+
+        page = service.search({"query": "x", "page": 2, "page_size": 10, "aggs": "db"})
+        assert [hit["_id"] for hit in page["hits"]["hits"]][:2] == ["10", "11"]
+        assert set(page["aggregations"]) == {"db_terms"}
+
+        first, second = service.msearch([{"page": 1, "page_size": 5}, {"page": 3, "page_size": 5}])
+        assert first["hits"]["hits"][0]["_id"] == "0"
+        assert second["hits"]["hits"][0]["_id"] == "10"
+
+        documents = service.get_by_ids(["1", "999999"])
+        assert list(documents) == ["1"]
+
+        fake_elasticsearch.total_hits = 25
+        batches = list(service.iter_hit_batches({}, batch_size=10))
+        assert [len(batch) for batch in batches] == [10, 10, 5]
+        assert fake_elasticsearch.requests["close_pit"] == 1
+
+
+@pytest.mark.load
+class TestLoad:
+    """Throughput and latency percentiles of the API against the stand-in."""
+
+    def test_search_uncached(self, fake_elasticsearch, settings):
+        """Load /api/search/ with every request reaching Elasticsearch."""
+        settings.SEARCH_CACHE_ENABLED = False
+        # Overlapping repeats of a query would otherwise share one call
+        settings.SINGLEFLIGHT_ENABLED = False
+        fake_elasticsearch.latency = FAKE_LATENCY
+
+        _drive("search (uncached)", reverse("media-list"), lambda n: {"query": f"q{n % 50}", "page": n % 5 + 1})
+
+        assert fake_elasticsearch.requests["search"] == REQUESTS
+
+    def test_search_cached(self, fake_elasticsearch):
+        """Load /api/search/ over a small set of repeated searches."""
+        fake_elasticsearch.latency = FAKE_LATENCY
+
+        _drive("search (cached)", reverse("media-list"), lambda n: {"query": f"q{n % 10}"})
+
+        assert fake_elasticsearch.requests["search"] < REQUESTS
+
+    def test_aggregations(self, fake_elasticsearch):
+        """Load /api/aggregations/, served from the refreshing cache after the first load."""
+        fake_elasticsearch.latency = FAKE_LATENCY
+
+        _drive("aggregations", reverse("aggregations-list"), lambda n: {})
+
+    def test_media_lookup(self, fake_elasticsearch):
+        """Load /api/media/, which batches ids into _mget."""
+        fake_elasticsearch.latency = FAKE_LATENCY
+
+        _drive("media lookup", reverse("media-lookup"), lambda n: {"ids": ",".join(str(n + i) for i in range(10))})
@@ -0,0 +1,89 @@
+import os
+import subprocess
+import sys
+from unittest.mock import patch
+
+import pytest
+from django.urls import reverse
+
+
+def _sample(payload, name):
+    """Return the value of the first sample line starting with name."""
+    for line in payload.splitlines():
+        if line.startswith(name):
+            return float(line.rsplit(" ", 1)[1])
+    return None
+
+
+class TestMetricsView:
+    """Test cases for the Prometheus metrics endpoint."""
+
+    def test_search_is_counted(self, api_client, mock_elasticsearch_client, sample_search_response):
+        """Test request, latency, result size and Elasticsearch call metrics."""
+        mock_elasticsearch_client.search.return_value = sample_search_response
+        before = _sample(
+            api_client.get("/metrics").content.decode(),
+            'elasticsearch_requests_total{operation="search"}',
+        ) or 0
+
+        api_client.get(reverse("media-list"), {"query": "metrics"})
+        api_client.get(reverse("media-list"), {"query": "metrics"})
+        payload = api_client.get("/metrics").content.decode()
+
+        assert _sample(payload, 'api_requests_total{endpoint="media-list",method="GET",status="200"}') >= 2
+        assert _sample(payload, 'api_request_duration_seconds_count{endpoint="media-list"}') >= 2
+        assert _sample(payload, 'api_search_results_bucket{endpoint="media-list",le="5.0"}') >= 2
+        # The second search was answered from the search cache
+        assert _sample(payload, 'elasticsearch_requests_total{operation="search"}') == before + 1
+        assert _sample(payload, 'api_cache_hits_total{cache="search"}') >= 1
+
+    def test_token_is_required_when_configured(self, api_client, settings):
+        """Test that METRICS_AUTH_TOKEN protects the endpoint."""
+        settings.METRICS_AUTH_TOKEN = "secret"
+
+        assert api_client.get("/metrics").status_code == 401
+        response = api_client.get("/metrics", HTTP_AUTHORIZATION="Bearer secret")
+        assert response.status_code == 200
+        assert response["Content-Type"].startswith("text/plain")
+
+    def test_gauges_are_synced_at_scrape_time(self, api_client):
+        """Test that requests leave cache and pool state to the scrape."""
+        with patch("api.metrics._sync_worker_state") as sync:
+            api_client.get(reverse("media-list"), {"page_size": 0})
+            sync.assert_not_called()
+
+            api_client.get("/metrics")
+            sync.assert_called_once()
+
+
+WORKER = """
+import django
+django.setup()
+from api.metrics import REQUESTS
+REQUESTS.labels("media-list", "GET", "200").inc()
+"""
+
+SCRAPE = """
+import django
+django.setup()
+from api.metrics import render_metrics
+print(render_metrics()[0].decode())
+"""
+
+
+def test_multiprocess_metrics_are_aggregated(tmp_path):
+    """Test that a scrape reports samples of every worker process."""
+    env = {
+        **os.environ,
+        "DJANGO_SETTINGS_MODULE": "media_manager.settings",
+        "PROMETHEUS_MULTIPROC_DIR": str(tmp_path),
+    }
+    backend = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    for _ in range(2):
+        subprocess.run([sys.executable, "-c", WORKER], env=env, cwd=backend, check=True)
+
+    scrape = subprocess.run(
+        [sys.executable, "-c", SCRAPE], env=env, cwd=backend, check=True, capture_output=True, text=True
+    )
+
+    assert _sample(scrape.stdout, 'api_requests_total{endpoint="media-list",method="GET",status="200"}') == 2
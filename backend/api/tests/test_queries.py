@@ -0,0 +1,64 @@
+import json
+from datetime import date
+
+from api.cache import get_query_cache
+from api.queries import build_template, compile_search_query, compile_search_query_bytes
+
+
+PARAMS = {
+    "query": "football",
+    "db": ["st", "sp"],
+    "photographer": ["John Doe"],
+    "date_from": date(2024, 1, 1),
+    "page": 1,
+    "page_size": 20,
+    "sort_by": "date",
+    "sort_order": "asc",
+    "aggs": "db",
+}
+
+
+class TestCompileSearchQuery:
+    """Test cases for compiled search queries."""
+
+    def test_pages_share_one_template(self):
+        """Test that pages of a search reuse the compiled template."""
+        first = compile_search_query(PARAMS)
+        third = compile_search_query({**PARAMS, "page": 3})
+
+        assert first["from"] == 0
+        assert third["from"] == 40
+        assert first["query"] is third["query"]
+        assert len(get_query_cache()) == 1
+        assert first["query"]["bool"]["filter"][0] == {"terms": {"db": ["st", "sp"]}}
+        assert first["sort"] == [{"datum": {"order": "asc"}}, {"bildnummer": {"order": "asc"}}]
+
+    def test_callers_cannot_change_the_template(self):
+        """Test that top-level changes to a compiled body do not leak into later ones."""
+        body = compile_search_query(PARAMS)
+        body["pit"] = {"id": "pit-1"}
+        body["size"] = 1
+
+        assert "pit" not in compile_search_query(PARAMS)
+        assert compile_search_query(PARAMS)["size"] == 20
+
+    def test_cursor_mode_uses_search_after(self):
+        """Test that cursor pages continue after the cursor instead of skipping hits."""
+        params = {**PARAMS, "pagination": "cursor", "cursor": {"after": [1, "2"], "pit": "p", "key": "k"}}
+
+        body = compile_search_query(params)
+
+        assert body["search_after"] == [1, "2"]
+        assert "from" not in body
+
+    def test_bytes_match_the_body(self):
+        """Test that pre-serialized bodies decode to the same search."""
+        params = {**PARAMS, "page": 2, "query": "Müller \"quoted\""}
+
+        data = compile_search_query_bytes(params, pit={"id": "pit-1", "keep_alive": "1m"})
+
+        assert json.loads(data) == {
+            **json.loads(json.dumps(build_template(params))),
+            "from": 20,
+            "pit": {"id": "pit-1", "keep_alive": "1m"},
+        }
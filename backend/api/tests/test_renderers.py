@@ -0,0 +1,108 @@
+import gzip
+import io
+import json
+from datetime import datetime, timezone
+from decimal import Decimal
+from unittest.mock import Mock, patch
+
+import brotli
+import pytest
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+
+from api.middleware import negotiate_encoding
+from api.renderers import ORJSONParser, ORJSONRenderer
+
+
+class TestORJSONRenderer:
+    """Test cases for ORJSONRenderer and ORJSONParser."""
+
+    def test_output_matches_drf(self):
+        """Test that orjson renders the same JSON as DRF's renderer."""
+        data = {
+            "text": "Müller ✓",
+            "number": Decimal("1.50"),
+            "date": datetime(2024, 1, 1, 12, 0, 0, 123456, tzinfo=timezone.utc),
+            "nested": [{"a": None, "b": True}],
+            1: "int key",
+        }
+
+        rendered = ORJSONRenderer().render(data)
+
+        assert json.loads(rendered) == json.loads(JSONRenderer().render(data))
+        assert json.loads(rendered)["date"] == "2024-01-01T12:00:00.123456Z"
+        assert ORJSONRenderer().render(None) == b""
+
+    def test_indent(self):
+        """Test that an indent media type parameter indents the output."""
+        rendered = ORJSONRenderer().render({"a": 1}, "application/json; indent=4")
+        assert rendered == b'{\n  "a": 1\n}'
+
+    def test_parser(self):
+        """Test that bodies are parsed and malformed ones rejected."""
+        assert ORJSONParser().parse(io.BytesIO(b'{"searches": [1]}')) == {"searches": [1]}
+        with pytest.raises(ParseError):
+            ORJSONParser().parse(io.BytesIO(b"{not json"))
+
+
+class TestCompression:
+    """Test cases for CompressionMiddleware."""
+
+    def test_negotiate_encoding(self):
+        """Test that brotli is preferred and quality values are honoured."""
+        assert negotiate_encoding("gzip, deflate, br") == "br"
+        assert negotiate_encoding("gzip, br;q=0.5") == "gzip"
+        assert negotiate_encoding("br;q=0, gzip") == "gzip"
+        assert negotiate_encoding("*") == "br"
+        assert negotiate_encoding("identity") is None
+        assert negotiate_encoding("") is None
+
+    @patch('api.views.ElasticsearchService')
+    def test_large_responses_are_compressed(self, mock_es_service, api_client, sample_global_aggregations):
+        """Test that responses are brotli or gzip encoded as negotiated."""
+        buckets = [{"key": f"Photographer {i}", "doc_count": i} for i in range(200)]
+        sample_global_aggregations["all_docs"]["photographer_terms"]["buckets"] = buckets
+        mock_service_instance = Mock()
+        mock_service_instance.get_global_aggregations.return_value = sample_global_aggregations
+        mock_es_service.return_value = mock_service_instance
+        url = reverse('aggregations-list')
+
+        plain = api_client.get(url)
+        assert "Content-Encoding" not in plain
+        assert "Accept-Encoding" in plain["Vary"]
+
+        response = api_client.get(url, HTTP_ACCEPT_ENCODING="gzip, br")
+        assert response["Content-Encoding"] == "br"
+        assert brotli.decompress(response.content) == plain.content
+        assert len(response.content) < len(plain.content)
+        assert response["ETag"] == "W/" + plain["ETag"]
+
+        response = api_client.get(url, HTTP_ACCEPT_ENCODING="gzip")
+        assert response["Content-Encoding"] == "gzip"
+        assert gzip.decompress(response.content) == plain.content
+
+        # The weakened ETag still validates the cached copy
+        response = api_client.get(url, HTTP_ACCEPT_ENCODING="gzip", HTTP_IF_NONE_MATCH=response["ETag"])
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_small_responses_are_not_compressed(self, api_client):
+        """Test that responses under COMPRESSION_MIN_SIZE are sent as is."""
+        response = api_client.get(reverse('media-list'), {'page_size': 0}, HTTP_ACCEPT_ENCODING="gzip, br")
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "Content-Encoding" not in response
+
+    @patch('api.views.ElasticsearchService')
+    def test_streaming_responses_are_compressed(self, mock_es_service, api_client, sample_search_response):
+        """Test that streamed exports are compressed as they are sent."""
+        mock_service_instance = Mock()
+        mock_service_instance.iter_hit_batches.return_value = iter([sample_search_response["hits"]["hits"]])
+        mock_es_service.return_value = mock_service_instance
+
+        response = api_client.get(reverse('media-export'), {'query': 'test'}, HTTP_ACCEPT_ENCODING="gzip")
+
+        assert response["Content-Encoding"] == "gzip"
+        assert not response.has_header("Content-Length")
+        lines = gzip.decompress(b"".join(response.streaming_content)).decode().splitlines()
+        assert json.loads(lines[0])["id"] == sample_search_response["hits"]["hits"][0]["_id"]
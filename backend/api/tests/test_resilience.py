@@ -0,0 +1,364 @@
+import asyncio
+import time
+
+from unittest.mock import Mock
+
+import pytest
+from django.test import Client
+from django.urls import reverse
+from elastic_transport import ApiResponseMeta, HttpHeaders
+from elasticsearch import ApiError, ConnectionTimeout
+
+from api.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    DeadlineExceeded,
+    ElasticsearchUnavailable,
+    ahedged_call,
+    deadline_budget,
+    hedged_call,
+    is_unavailable_error,
+    remaining_budget,
+)
+
+
+class FakeClock:
+    """Manually advanced clock for circuit breaker tests."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _api_error(status):
+    meta = ApiResponseMeta(status=status, http_version="1.1", headers=HttpHeaders(), duration=0.0, node=None)
+    return ApiError("error", meta, {})
+
+
+class TestCircuitBreaker:
+    """Test cases for CircuitBreaker."""
+
+    def test_opens_after_consecutive_failures(self):
+        """Test that the circuit opens at the threshold and a success resets the count."""
+        breaker = CircuitBreaker(failure_threshold=3, reset_timeout=10, timer=FakeClock())
+        breaker.after_call(ConnectionTimeout("timed out"))
+        breaker.after_call(ConnectionTimeout("timed out"))
+        breaker.after_call()
+        breaker.after_call(ConnectionTimeout("timed out"))
+        breaker.after_call(ConnectionTimeout("timed out"))
+        assert breaker.state == CircuitBreaker.CLOSED
+
+        breaker.after_call(_api_error(503))
+        assert breaker.state == CircuitBreaker.OPEN
+        with pytest.raises(CircuitOpenError) as excinfo:
+            breaker.before_call()
+        assert excinfo.value.retry_after == 10
+        assert breaker.stats()["rejected"] == 1
+
+    def test_client_errors_do_not_count(self):
+        """Test that errors which mean the cluster answered count as successes."""
+        breaker = CircuitBreaker(failure_threshold=1, timer=FakeClock())
+        assert breaker.after_call(_api_error(400)) is False
+        assert breaker.after_call(ValueError("bug")) is False
+        assert breaker.state == CircuitBreaker.CLOSED
+        assert is_unavailable_error(_api_error(429))
+
+    def test_half_open_probe(self):
+        """Test that one probe is let through after the reset timeout."""
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, timer=clock)
+        breaker.after_call(ConnectionTimeout("timed out"))
+
+        clock.now += 10
+        assert breaker.allow() is True
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        assert breaker.allow() is False
+
+        # A failed probe opens the circuit for another reset timeout
+        breaker.after_call(ConnectionTimeout("timed out"))
+        assert breaker.state == CircuitBreaker.OPEN
+        assert breaker.allow() is False
+
+        clock.now += 10
+        assert breaker.allow() is True
+        breaker.after_call()
+        assert breaker.state == CircuitBreaker.CLOSED
+        assert breaker.allow() is True
+        assert breaker.stats()["times_opened"] == 2
+
+    def test_lost_probe_does_not_block_the_circuit(self):
+        """Test that a released or forgotten probe lets another probe through."""
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, timer=clock)
+        breaker.after_call(ConnectionTimeout("timed out"))
+        clock.now += 10
+        assert breaker.allow() is True
+
+        # A cancelled probe gives its slot back
+        breaker.release()
+        assert breaker.allow() is True
+
+        # A probe never settled counts as failed after the reset timeout
+        clock.now += 10
+        assert breaker.allow() is False
+        assert breaker.state == CircuitBreaker.OPEN
+        clock.now += 10
+        assert breaker.allow() is True
+
+    def test_cancelled_async_probe_is_released(self, settings):
+        """Test that cancelling an async call during a half-open probe frees the slot."""
+        from api.resilience import get_circuit_breaker
+        from api.services import AsyncElasticsearchService
+
+        settings.ELASTICSEARCH_CIRCUIT_FAILURE_THRESHOLD = 1
+        settings.ELASTICSEARCH_CIRCUIT_RESET_TIMEOUT = 0
+        breaker = get_circuit_breaker()
+        breaker.after_call(ConnectionTimeout("timed out"))
+        service = AsyncElasticsearchService.__new__(AsyncElasticsearchService)
+        service.client = Mock()
+        service.client.options.return_value = service.client
+
+        async def probe(client):
+            await asyncio.sleep(1)
+
+        async def run():
+            task = asyncio.ensure_future(service._call("search", probe))
+            await asyncio.sleep(0.01)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(run())
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        assert breaker.allow() is True
+
+
+class TestDeadlineBudget:
+    """Test cases for deadline budgets and hedged calls."""
+
+    def test_budget_is_shared_by_the_block(self, settings):
+        """Test that calls inside deadline_budget get what is left of it."""
+        settings.ELASTICSEARCH_DEADLINE_BUDGET = 5
+        assert remaining_budget() == 5
+        with deadline_budget(0.5):
+            time.sleep(0.1)
+            assert 0.3 < remaining_budget() < 0.41
+
+    def test_spent_budget_is_not_sent(self, es_service, mock_elasticsearch_client):
+        """Test that no call is sent once the budget is spent, nor counted by the breaker."""
+        with deadline_budget(0):
+            with pytest.raises(DeadlineExceeded):
+                es_service.search({"query": "test"})
+        mock_elasticsearch_client.search.assert_not_called()
+
+    def test_calls_carry_the_remaining_budget(self, es_service, mock_elasticsearch_client, sample_search_response):
+        """Test that the client is asked to time out when the budget runs out."""
+        mock_elasticsearch_client.search.return_value = sample_search_response
+        with deadline_budget(2):
+            es_service.search({"query": "test"})
+        options = mock_elasticsearch_client.options.call_args[1]
+        assert 1.5 < options["request_timeout"] <= 2
+        assert options["retry_on_timeout"] is False
+
+    def test_retries_stay_within_the_budget(self, settings, es_service, mock_elasticsearch_client):
+        """Test that retries get what is left of the budget and stop once it is spent."""
+        settings.ELASTICSEARCH_MAX_RETRIES = 5
+        settings.ELASTICSEARCH_RETRY_BACKOFF_MS = 0
+
+        def get(**kwargs):
+            time.sleep(0.06)
+            raise _api_error(503)
+
+        mock_elasticsearch_client.get.side_effect = get
+        with deadline_budget(0.2):
+            with pytest.raises(ElasticsearchUnavailable):
+                es_service.get_by_id("1")
+
+        # Attempts of 60 ms fit about three times in 200 ms, not the six allowed
+        assert 2 <= mock_elasticsearch_client.get.call_count <= 4
+        timeouts = [call[1]["request_timeout"] for call in mock_elasticsearch_client.options.call_args_list]
+        assert timeouts == sorted(timeouts, reverse=True)
+        assert all(call[1]["max_retries"] == 0 for call in mock_elasticsearch_client.options.call_args_list)
+
+    def test_retries_back_off(self, settings, es_service, mock_elasticsearch_client):
+        """Test that retries wait longer each time and are not sent past the budget."""
+        settings.ELASTICSEARCH_MAX_RETRIES = 5
+        settings.ELASTICSEARCH_RETRY_BACKOFF_MS = 100
+        mock_elasticsearch_client.get.side_effect = _api_error(429)
+
+        started = time.perf_counter()
+        with deadline_budget(0.25):
+            with pytest.raises(ElasticsearchUnavailable):
+                es_service.get_by_id("1")
+
+        # The second retry would start after 300 ms, past the budget
+        assert mock_elasticsearch_client.get.call_count == 2
+        assert 0.1 <= time.perf_counter() - started < 0.25
+
+    def test_timeouts_retried_as_configured(self, settings, es_service, mock_elasticsearch_client):
+        """Test that ELASTICSEARCH_RETRY_ON_TIMEOUT decides whether timed-out attempts are retried."""
+        from elasticsearch import ConnectionTimeout
+
+        settings.ELASTICSEARCH_MAX_RETRIES = 1
+        settings.ELASTICSEARCH_RETRY_BACKOFF_MS = 0
+        mock_elasticsearch_client.get.side_effect = ConnectionTimeout("timed out")
+
+        with pytest.raises(ElasticsearchUnavailable):
+            es_service.get_by_id("1")
+        assert mock_elasticsearch_client.get.call_count == 2
+
+        settings.ELASTICSEARCH_RETRY_ON_TIMEOUT = False
+        with pytest.raises(ElasticsearchUnavailable):
+            es_service.get_by_id("2")
+        assert mock_elasticsearch_client.get.call_count == 3
+
+    def test_client_errors_are_not_retried(self, settings, es_service, mock_elasticsearch_client):
+        """Test that only connection errors and retryable statuses are sent again."""
+        mock_elasticsearch_client.mget.side_effect = _api_error(400)
+        with pytest.raises(ApiError):
+            es_service.get_by_ids(["1"])
+        assert mock_elasticsearch_client.mget.call_count == 1
+
+    def test_hedged_call_uses_the_first_answer(self):
+        """Test that a slow read is sent again and the faster copy wins."""
+        calls = []
+        hedges = []
+
+        def call():
+            calls.append(None)
+            if len(calls) == 1:
+                time.sleep(0.5)
+                return "slow"
+            return "fast"
+
+        started = time.perf_counter()
+        assert hedged_call(call, 0.05, 2, on_hedge=lambda: hedges.append(None)) == "fast"
+        assert time.perf_counter() - started < 0.4
+        assert len(hedges) == 1
+
+        # Fast reads are not hedged
+        assert hedged_call(lambda: "quick", 0.5, 2, on_hedge=lambda: hedges.append(None)) == "quick"
+        assert len(hedges) == 1
+
+    def test_hedged_call_deadline(self):
+        """Test that hedged reads give up at the deadline."""
+        with pytest.raises(DeadlineExceeded):
+            hedged_call(lambda: time.sleep(0.5), 0.05, 0.15)
+
+    def test_async_hedged_call_cancels_the_loser(self):
+        """Test that the async variant returns the faster copy and cancels the other."""
+        cancelled = []
+        calls = []
+
+        async def call():
+            calls.append(None)
+            if len(calls) == 1:
+                try:
+                    await asyncio.sleep(1)
+                except asyncio.CancelledError:
+                    cancelled.append(None)
+                    raise
+                return "slow"
+            return "fast"
+
+        async def run():
+            result = await ahedged_call(call, 0.05, 2)
+            await asyncio.sleep(0)
+            return result
+
+        assert asyncio.run(run()) == "fast"
+        assert cancelled == [None]
+
+    def test_service_hedges_reads(self, settings, es_service, mock_elasticsearch_client):
+        """Test that service reads are hedged when ELASTICSEARCH_HEDGE_DELAY_MS is set."""
+        settings.ELASTICSEARCH_HEDGE_DELAY_MS = 50
+        responses = iter([0.5, 0])
+
+        def get(**kwargs):
+            time.sleep(next(responses))
+            return {"_id": kwargs["id"], "found": True}
+
+        mock_elasticsearch_client.get.side_effect = get
+        started = time.perf_counter()
+        assert es_service.get_by_id("1")["_id"] == "1"
+        assert time.perf_counter() - started < 0.4
+        assert mock_elasticsearch_client.get.call_count == 2
+
+
+class TestLoadShedding:
+    """Test cases for shedding load while the cluster is unavailable."""
+
+    def test_open_circuit_rejects_without_calling(self, settings, es_service, mock_elasticsearch_client):
+        """Test that calls fail fast once the circuit has opened."""
+        settings.ELASTICSEARCH_CIRCUIT_FAILURE_THRESHOLD = 2
+        settings.ELASTICSEARCH_RETRY_ON_TIMEOUT = False
+        mock_elasticsearch_client.mget.side_effect = ConnectionTimeout("timed out")
+        for _ in range(2):
+            with pytest.raises(ElasticsearchUnavailable):
+                es_service.get_by_ids(["1"])
+
+        with pytest.raises(CircuitOpenError):
+            es_service.get_by_ids(["1"])
+        assert mock_elasticsearch_client.mget.call_count == 2
+
+    def test_failing_cluster_returns_503(self, settings, fake_elasticsearch):
+        """Test that searches get 503 with Retry-After and stop reaching the cluster."""
+        settings.ELASTICSEARCH_MAX_RETRIES = 0
+        settings.ELASTICSEARCH_CIRCUIT_FAILURE_THRESHOLD = 2
+        settings.ELASTICSEARCH_CIRCUIT_RESET_TIMEOUT = 30
+        # Index stats reads would count towards the threshold too
+        settings.SEARCH_ETAG_ENABLED = False
+        fake_elasticsearch.fail_status = 503
+        client = Client()
+
+        for query in ("one", "two", "three"):
+            response = client.get(reverse("media-list"), {"query": query, "aggs": "none"})
+            assert response.status_code == 503
+            assert int(response["Retry-After"]) >= 1
+        assert fake_elasticsearch.requests["search"] == 2
+
+    def test_slow_cluster_sheds_within_budget(self, settings, fake_elasticsearch):
+        """Test that a slow cluster is given up on at the deadline instead of the client timeout."""
+        settings.ELASTICSEARCH_DEADLINE_BUDGET = 0.2
+        fake_elasticsearch.latency = 1.0
+
+        started = time.perf_counter()
+        response = Client().get(reverse("media-detail", args=["1"]))
+        assert response.status_code == 503
+        assert time.perf_counter() - started < 0.9
+
+    def test_stale_response_is_served(self, settings, fake_elasticsearch):
+        """Test that an expired cached search answers while the cluster fails."""
+        settings.SEARCH_CACHE_TTL = 0
+        settings.ELASTICSEARCH_MAX_RETRIES = 0
+        client = Client()
+        fresh = client.get(reverse("media-list"), {"query": "test"})
+        assert fresh.status_code == 200
+        assert "X-Search-Degraded" not in fresh
+
+        fake_elasticsearch.fail_status = 503
+        stale = client.get(reverse("media-list"), {"query": "test"})
+        assert stale.status_code == 200
+        assert stale["X-Search-Degraded"] == "stale"
+        assert stale.json() == fresh.json()
+
+    def test_slow_aggregations_are_dropped(self, settings, fake_elasticsearch):
+        """Test that a search timing out on its aggregations is answered without them."""
+        settings.ELASTICSEARCH_DEADLINE_BUDGET = 0.3
+        fake_elasticsearch.aggregation_latency = 1.0
+
+        response = Client().get(reverse("media-list"), {"query": "test"})
+        assert response.status_code == 200
+        assert response["X-Search-Degraded"] == "no-aggregations"
+        data = response.json()
+        assert len(data["results"]) == 20
+        assert data["aggregations"] == {}
+
+    def test_cursor_searches_are_not_degraded(self, es_service, mock_elasticsearch_client):
+        """Test that cursor-mode searches fail instead of being degraded."""
+        error = CircuitOpenError("open", retry_after=5)
+        with pytest.raises(CircuitOpenError):
+            es_service.search_degraded({"query": "test", "pagination": "cursor"}, error)
+        mock_elasticsearch_client.search.assert_not_called()
@@ -0,0 +1,127 @@
+import json
+import re
+from datetime import date
+from unittest.mock import Mock
+
+import pytest
+from elasticsearch import NotFoundError
+
+from api.search_templates import (
+    SEARCH_TEMPLATE_SOURCE,
+    build_template_params,
+    get_search_template_id,
+    mark_search_template_available,
+    register_search_template,
+)
+
+
+def render(source, params):
+    """Render the subset of mustache the search template uses."""
+    def section(match):
+        return match.group(2) if params.get(match.group(1)) else ""
+
+    previous = None
+    while previous != source:
+        previous = source
+        source = re.sub(r"\{\{#(?!toJson)(\w+)\}\}(.*?)\{\{/\1\}\}", section, source)
+    source = re.sub(r"\{\{#toJson\}\}(\w+)\{\{/toJson\}\}", lambda m: json.dumps(params[m.group(1)]), source)
+    return re.sub(r"\{\{(\w+)\}\}", lambda m: json.dumps(params[m.group(1)]), source)
+
+
+@pytest.fixture(autouse=True)
+def search_template_available():
+    """Fixture to forget a template marked missing by an earlier test."""
+    mark_search_template_available()
+    yield
+    mark_search_template_available()
+
+
+class TestSearchTemplateSource:
+    """Test cases for the search template and its parameters."""
+
+    @pytest.mark.parametrize("params", [
+        {},
+        {"query": "ball \"quoted\"", "aggs": "db", "page": 3},
+        {
+            "db": ["st"],
+            "photographer": ["John Doe", "Jane Smith"],
+            "date_from": date(2024, 1, 1),
+            "date_to": date(2024, 2, 1),
+            "aggs": "none",
+            "fields": ["thumbnail_url"],
+        },
+    ])
+    def test_renders_valid_search(self, es_service, params):
+        """Test that every combination of clauses renders to the inline search."""
+        body = json.loads(render(SEARCH_TEMPLATE_SOURCE, build_template_params(params)))
+        inline = es_service._build_search_query(params)
+
+        for key in ("size", "from", "sort", "_source", "aggs"):
+            assert body.get(key) == inline.get(key)
+        assert body["query"]["bool"]["must"] == inline["query"]["bool"]["must"]
+        filters = body["query"]["bool"]["filter"]
+        assert filters[-1] == {"match_all": {}}
+        assert len(filters) - 1 == len(inline["query"]["bool"]["filter"]) + bool(
+            params.get("date_from") and params.get("date_to")
+        )
+
+    def test_registration_is_idempotent(self):
+        """Test that an already stored template is not stored again."""
+        client = Mock()
+        client.get_script.side_effect = NotFoundError("resource_not_found_exception", Mock(status=404), {})
+
+        assert register_search_template(client) is True
+        client.put_script.assert_called_once_with(
+            id=get_search_template_id(), script={"lang": "mustache", "source": SEARCH_TEMPLATE_SOURCE}
+        )
+
+        client.reset_mock()
+        client.get_script.side_effect = None
+        client.get_script.return_value = {"found": True, "script": {"lang": "mustache", "source": SEARCH_TEMPLATE_SOURCE}}
+
+        assert register_search_template(client) is False
+        client.put_script.assert_not_called()
+
+
+class TestSearchTemplateMode:
+    """Test cases for searching through the stored template."""
+
+    def test_search_uses_template(self, es_service, mock_elasticsearch_client, sample_search_response, settings):
+        """Test that page-mode searches send only the template parameters."""
+        settings.ELASTICSEARCH_SEARCH_TEMPLATES = True
+        mock_elasticsearch_client.search_template.return_value = sample_search_response
+
+        assert es_service.search({"query": "test", "page": 2}) == sample_search_response
+
+        mock_elasticsearch_client.search.assert_not_called()
+        kwargs = mock_elasticsearch_client.search_template.call_args[1]
+        assert kwargs["id"] == get_search_template_id()
+        assert kwargs["params"]["query"] == "test"
+        assert kwargs["params"]["from"] == 20
+
+    def test_missing_template_falls_back_to_inline(
+        self, es_service, mock_elasticsearch_client, sample_search_response, settings
+    ):
+        """Test that a missing template is skipped until the retry interval passes."""
+        settings.ELASTICSEARCH_SEARCH_TEMPLATES = True
+        mock_elasticsearch_client.search_template.side_effect = NotFoundError(
+            "resource_not_found_exception", Mock(status=404), {}
+        )
+        mock_elasticsearch_client.search.return_value = sample_search_response
+
+        assert es_service.search({"query": "first"}) == sample_search_response
+        assert es_service.search({"query": "second"}) == sample_search_response
+
+        assert mock_elasticsearch_client.search_template.call_count == 1
+        assert mock_elasticsearch_client.search.call_count == 2
+
+    def test_other_not_found_errors_are_raised(self, es_service, mock_elasticsearch_client, settings):
+        """Test that a missing index is not mistaken for a missing template."""
+        settings.ELASTICSEARCH_SEARCH_TEMPLATES = True
+        mock_elasticsearch_client.search_template.side_effect = NotFoundError(
+            "index_not_found_exception", Mock(status=404), {}
+        )
+
+        with pytest.raises(NotFoundError):
+            es_service.search({"query": "test"})
+        mock_elasticsearch_client.search.assert_not_called()
@@ -1,5 +1,5 @@
 import pytest
-from api.serializers import SearchQuerySerializer, MediaSourceSerializer
+from api.serializers import SearchQuerySerializer, MediaSourceSerializer, serialize_search_response
 
 
 class TestSerializers:
@@ -53,4 +53,98 @@ class TestSerializers:
         assert 'height' in representation
         assert 'width' in representation
         assert 'database' in representation
-        assert 'thumbnail_url' in representation 
\ No newline at end of file
+        assert 'thumbnail_url' in representation
+
+    def test_search_query_serializer_cursor(self):
+        """Test cursor decoding and page depth validation."""
+        from api.utils import encode_cursor
+
+        token = encode_cursor({'pit': 'pit-1', 'after': [1, '2'], 'key': 'abc'})
+        serializer = SearchQuerySerializer(data={'cursor': token})
+        assert serializer.is_valid()
+        assert serializer.validated_data['pagination'] == 'cursor'
+        assert serializer.validated_data['cursor']['after'] == [1, '2']
+
+        serializer = SearchQuerySerializer(data={'cursor': 'not-a-cursor'})
+        assert not serializer.is_valid()
+        assert 'cursor' in serializer.errors
+
+        serializer = SearchQuerySerializer(data={'page': 101, 'page_size': 100})
+        assert not serializer.is_valid()
+        assert 'page' in serializer.errors
+
+        serializer = SearchQuerySerializer(
+            data={'page': 101, 'page_size': 100, 'pagination': 'cursor'}
+        )
+        assert serializer.is_valid()
+
+    def test_serialize_search_response(self, sample_search_response):
+        """Test the fast search response transform."""
+        results = {
+            'total': 2,
+            'aggregations': sample_search_response['aggregations'],
+            'results': sample_search_response['hits']['hits'],
+        }
+        data = serialize_search_response(results)
+
+        assert data['total'] == 2
+        assert data['results'][0] == {
+            'id': '1',
+            'source': {
+                'image_number': '12345',
+                'date': '2024-01-01T00:00:00Z',
+                'search_text': 'Test image 1',
+                'photographers': 'John Doe',
+                'height': 600,
+                'width': 800,
+                'database': 'st',
+                'thumbnail_url': 'https://www.imago-images.de/bild/st/0000012345/s.jpg',
+            },
+        }
+        assert data == serialize_search_response(results, strict=True)
+
+    def test_serialize_search_response_strict_rejects_invalid_hits(self):
+        """Test that strict mode validates hits."""
+        from rest_framework.exceptions import ValidationError
+
+        results = {'total': 1, 'results': [{'_id': '1', '_source': {'bildnummer': '1'}}]}
+
+        with pytest.raises(ValidationError):
+            serialize_search_response(results, strict=True)
+        assert serialize_search_response(results)['results'][0]['source']['date'] is None
+
+    def test_search_query_serializer_fields(self):
+        """Test parsing of the fields projection parameter."""
+        from django.http import QueryDict
+
+        serializer = SearchQuerySerializer(
+            data=QueryDict('fields=image_number,date&fields=thumbnail_url&fields=date')
+        )
+        assert serializer.is_valid()
+        assert serializer.validated_data['fields'] == ['image_number', 'date', 'thumbnail_url']
+
+        serializer = SearchQuerySerializer(data=QueryDict('fields=bildnummer'))
+        assert not serializer.is_valid()
+        assert 'fields' in serializer.errors
+
+    def test_get_source_includes(self):
+        """Test mapping public fields to Elasticsearch _source fields."""
+        from api.serializers import get_source_includes
+
+        assert get_source_includes() == [
+            'bildnummer', 'datum', 'suchtext', 'fotografen', 'breite', 'hoehe', 'db'
+        ]
+        assert get_source_includes(['date', 'thumbnail_url']) == ['datum', 'db', 'bildnummer']
+
+    def test_serialize_search_response_fields(self, sample_search_response):
+        """Test that only requested fields are rendered in both modes."""
+        results = {'total': 2, 'aggregations': {}, 'results': sample_search_response['hits']['hits']}
+
+        data = serialize_search_response(results, fields=['image_number', 'thumbnail_url'])
+        assert data['results'][0]['source'] == {
+            'image_number': '12345',
+            'thumbnail_url': 'https://www.imago-images.de/bild/st/0000012345/s.jpg',
+        }
+        assert data == serialize_search_response(
+            results, strict=True, fields=['image_number', 'thumbnail_url']
+        )
@@ -1,5 +1,8 @@
+import asyncio
 import pytest
-from unittest.mock import Mock, patch
+from unittest.mock import AsyncMock, Mock, patch
+
+from api.utils import decode_cursor
 
 
 class TestElasticsearchService:
@@ -149,4 +152,662 @@ class TestElasticsearchService:
             index=es_service.index,
             id="1"
         )
-        assert result == mock_response 
\ No newline at end of file
+        assert result == mock_response 
+
+class TestElasticsearchClientRegistry:
+    """Test cases for the process-wide Elasticsearch client registry."""
+
+    def test_client_is_shared_between_services(self, mock_elasticsearch_client):
+        """Test that services reuse a single client per process."""
+        from api.services import ElasticsearchService, Elasticsearch
+
+        first = ElasticsearchService()
+        second = ElasticsearchService()
+
+        assert first.client is second.client
+        Elasticsearch.assert_called_once()
+
+    def test_client_uses_pool_settings(self, mock_elasticsearch_client, settings):
+        """Test that pool size, timeouts and retries come from settings."""
+        from api.services import get_elasticsearch_client, Elasticsearch
+
+        settings.ELASTICSEARCH_CONNECTIONS_PER_NODE = 25
+        settings.ELASTICSEARCH_REQUEST_TIMEOUT = 2.5
+        settings.ELASTICSEARCH_MAX_RETRIES = 1
+        settings.ELASTICSEARCH_KEEP_ALIVE = False
+
+        get_elasticsearch_client()
+
+        kwargs = Elasticsearch.call_args[1]
+        assert kwargs["connections_per_node"] == 25
+        assert kwargs["request_timeout"] == 2.5
+        assert kwargs["max_retries"] == 1
+        assert kwargs["headers"] == {"Connection": "close"}
+
+    def test_client_is_recreated_after_fork(self, mock_elasticsearch_client):
+        """Test that a forked process does not reuse the parent's client."""
+        from api import services
+
+        services.get_elasticsearch_client()
+        with patch("api.services.os.getpid", return_value=services._clients_pid + 1):
+            services.get_elasticsearch_client()
+
+        assert services.Elasticsearch.call_count == 2
+        mock_elasticsearch_client.close.assert_not_called()
+
+    def test_get_pool_stats(self, mock_elasticsearch_client):
+        """Test pool statistics reporting for the shared client."""
+        from api.services import get_elasticsearch_client, get_pool_stats
+
+        node = Mock(base_url="https://es:9200")
+        node.pool.maxsize = 10
+        node.pool.num_connections = 3
+        node.pool.num_requests = 42
+        node.pool.pool.queue = [None, Mock(), Mock()]
+        mock_elasticsearch_client.transport.node_pool.all.return_value = [node]
+
+        get_elasticsearch_client()
+        stats = get_pool_stats()
+
+        assert stats["clients"]["default"]["nodes"] == [
+            {
+                "base_url": "https://es:9200",
+                "maxsize": 10,
+                "connections_created": 3,
+                "requests": 42,
+                "idle_connections": 2,
+            }
+        ]
+
+
+class TestSearchCache:
+    """Test cases for the search result cache."""
+
+    def test_identical_search_is_served_from_cache(self, es_service, mock_elasticsearch_client, sample_search_response):
+        """Test that a repeated search does not hit Elasticsearch again."""
+        from api.cache import get_search_cache
+
+        mock_elasticsearch_client.search.return_value = sample_search_response
+
+        first = es_service.search({"query": "test", "db": ["st", "sp"], "page": 1})
+        second = es_service.search({"query": "test", "db": ["sp", "st"], "page": 1})
+
+        assert first == second == sample_search_response
+        mock_elasticsearch_client.search.assert_called_once()
+        assert get_search_cache().stats()["hits"] == 1
+
+    def test_search_cache_can_be_bypassed_and_invalidated(self, es_service, mock_elasticsearch_client, sample_search_response):
+        """Test use_cache=False and explicit invalidation."""
+        from api.cache import invalidate_search_cache
+
+        mock_elasticsearch_client.search.return_value = sample_search_response
+        params = {"query": "test", "page": 1}
+
+        es_service.search(params)
+        es_service.search(params, use_cache=False)
+        assert mock_elasticsearch_client.search.call_count == 2
+
+        invalidate_search_cache(params)
+        es_service.search(params)
+        assert mock_elasticsearch_client.search.call_count == 3
+
+    def test_invalidation_with_known_generation(self, es_service, mock_elasticsearch_client, sample_search_response):
+        """Test that invalidation drops entries keyed on the index generation."""
+        from api.cache import get_search_cache, invalidate_search_cache
+
+        mock_elasticsearch_client.search.return_value = sample_search_response
+        params = {"query": "test", "page": 1}
+        assert es_service.get_index_generation() is not None
+
+        es_service.search(params)
+        es_service.search({"query": "other"})
+        assert len(get_search_cache()) == 2
+
+        invalidate_search_cache(params)
+        assert len(get_search_cache()) == 1
+        es_service.search(params)
+        assert mock_elasticsearch_client.search.call_count == 3
+
+    def test_search_cache_disabled(self, es_service, mock_elasticsearch_client, sample_search_response, settings):
+        """Test that SEARCH_CACHE_ENABLED=False always queries Elasticsearch."""
+        settings.SEARCH_CACHE_ENABLED = False
+        mock_elasticsearch_client.search.return_value = sample_search_response
+
+        es_service.search({"query": "test"})
+        es_service.search({"query": "test"})
+
+        assert mock_elasticsearch_client.search.call_count == 2
+
+
+class TestCursorPagination:
+    """Test cases for search_after cursor pagination."""
+
+    def _hits(self, count):
+        return {
+            "pit_id": "pit-2",
+            "hits": {
+                "total": {"value": 100},
+                "hits": [
+                    {"_id": str(i), "_source": {}, "sort": [1700000000 - i, str(i)]}
+                    for i in range(count)
+                ],
+            },
+        }
+
+    def test_sort_has_bildnummer_tiebreaker(self, es_service):
+        """Test that sorts end with a bildnummer tiebreaker."""
+        assert es_service._build_sort({"sort_by": "date", "sort_order": "asc"}) == [
+            {"datum": {"order": "asc"}},
+            {"bildnummer": {"order": "asc"}},
+        ]
+        assert es_service._build_sort({"sort_by": "id"}) == [{"bildnummer": {"order": "desc"}}]
+
+    def test_first_cursor_page_opens_point_in_time(self, es_service, mock_elasticsearch_client):
+        """Test that the first cursor-mode page opens a PIT and skips from."""
+        mock_elasticsearch_client.open_point_in_time.return_value = {"id": "pit-1"}
+        mock_elasticsearch_client.search.return_value = self._hits(2)
+        params = {"query": "test", "page_size": 2, "pagination": "cursor"}
+
+        response = es_service.search(params)
+
+        body = mock_elasticsearch_client.search.call_args[1]["body"]
+        assert "from" not in body
+        assert "search_after" not in body
+        assert body["pit"] == {"id": "pit-1", "keep_alive": "1m"}
+        assert "index" not in mock_elasticsearch_client.search.call_args[1]
+
+        token = es_service.get_next_cursor(params, response)
+        assert decode_cursor(token)["pit"] == "pit-2"
+        assert decode_cursor(token)["after"] == [1699999999, "1"]
+
+    def test_next_cursor_page_uses_search_after(self, es_service, mock_elasticsearch_client):
+        """Test that following a cursor sends search_after and is not cached."""
+        mock_elasticsearch_client.open_point_in_time.return_value = {"id": "pit-1"}
+        mock_elasticsearch_client.search.return_value = self._hits(2)
+        params = {"query": "test", "page_size": 2, "pagination": "cursor"}
+        token = es_service.get_next_cursor(params, es_service.search(params))
+
+        next_params = {**params, "cursor": decode_cursor(token)}
+        es_service.search(next_params)
+        es_service.search(next_params)
+
+        body = mock_elasticsearch_client.search.call_args[1]["body"]
+        assert body["search_after"] == [1699999999, "1"]
+        assert body["pit"]["id"] == "pit-2"
+        assert mock_elasticsearch_client.search.call_count == 3
+        mock_elasticsearch_client.open_point_in_time.assert_called_once()
+
+    def test_last_cursor_page_closes_point_in_time(self, es_service, mock_elasticsearch_client):
+        """Test that a short page ends pagination and closes the PIT."""
+        params = {"page_size": 5, "pagination": "cursor"}
+
+        assert es_service.get_next_cursor(params, self._hits(3)) is None
+        mock_elasticsearch_client.close_point_in_time.assert_called_once_with(id="pit-2")
+
+    def test_cursor_for_other_search_is_rejected(self, es_service, mock_elasticsearch_client):
+        """Test that a cursor cannot be replayed against different filters."""
+        from api.services import InvalidCursorError
+
+        cursor = {"pit": "pit-1", "after": [1], "key": "other"}
+        with pytest.raises(InvalidCursorError):
+            es_service.search({"query": "test", "pagination": "cursor", "cursor": cursor})
+        mock_elasticsearch_client.search.assert_not_called()
+
+    def test_expired_cursor(self, es_service, mock_elasticsearch_client):
+        """Test that an expired PIT surfaces as CursorExpiredError."""
+        from elasticsearch import NotFoundError
+        from api.cache import make_query_key
+        from api.services import CursorExpiredError, CURSOR_EXCLUDED_PARAMS
+
+        params = {"query": "test", "pagination": "cursor"}
+        params["cursor"] = {
+            "pit": "pit-1",
+            "after": [1],
+            "key": make_query_key(params, exclude=CURSOR_EXCLUDED_PARAMS),
+        }
+        mock_elasticsearch_client.search.side_effect = NotFoundError(
+            "search_context_missing_exception", Mock(status=404), {}
+        )
+
+        with pytest.raises(CursorExpiredError):
+            es_service.search(params)
+
+
+class TestSourceFiltering:
+    """Test cases for _source filtering."""
+
+    def test_search_requests_only_exposed_fields(self, es_service, mock_elasticsearch_client, sample_search_response):
+        """Test that searches only fetch the fields the API exposes."""
+        mock_elasticsearch_client.search.return_value = sample_search_response
+
+        es_service.search({"query": "test"})
+
+        body = mock_elasticsearch_client.search.call_args[1]["body"]
+        assert body["_source"] == {
+            "includes": ["bildnummer", "datum", "suchtext", "fotografen", "breite", "hoehe", "db"]
+        }
+
+    def test_search_projects_requested_fields(self, es_service, mock_elasticsearch_client, sample_search_response):
+        """Test that the fields parameter narrows _source."""
+        mock_elasticsearch_client.search.return_value = sample_search_response
+
+        es_service.search({"query": "test", "fields": ["search_text"]})
+
+        body = mock_elasticsearch_client.search.call_args[1]["body"]
+        assert body["_source"] == {"includes": ["suchtext"]}
+
+
+class TestPreserializedQueries:
+    """Test cases for sending pre-serialized search bodies."""
+
+    def test_search_sends_json_bytes(self, es_service, mock_elasticsearch_client, sample_search_response, settings):
+        """Test that searches bypass the client's body handling when enabled."""
+        import json
+
+        settings.ELASTICSEARCH_PRESERIALIZE_QUERIES = True
+        mock_elasticsearch_client.perform_request.return_value = sample_search_response
+
+        assert es_service.search({"query": "test", "page": 2}) == sample_search_response
+
+        mock_elasticsearch_client.search.assert_not_called()
+        args, kwargs = mock_elasticsearch_client.perform_request.call_args
+        assert args == ("POST", f"/{es_service.index}/_search")
+        assert kwargs["headers"]["content-type"] == "application/json"
+        assert json.loads(kwargs["body"]) == es_service._build_search_query({"query": "test", "page": 2})
+
+    def test_msearch_sends_json_bytes(self, es_service, mock_elasticsearch_client, sample_search_response, settings):
+        """Test that multi-search lines are pre-serialized when enabled."""
+        settings.ELASTICSEARCH_PRESERIALIZE_QUERIES = True
+        mock_elasticsearch_client.msearch.return_value = {"responses": [sample_search_response]}
+
+        es_service.msearch([{"query": "test"}])
+
+        body = mock_elasticsearch_client.msearch.call_args[1]["searches"]
+        assert body[0] == {"index": es_service.index}
+        assert isinstance(body[1], bytes)
+
+
+class TestSearchAggregationsMode:
+    """Test cases for the aggs search parameter."""
+
+    def test_aggs_modes(self, es_service):
+        """Test which aggregations each aggs mode requests."""
+        assert set(es_service._build_search_query({"aggs": "full"})["aggs"]) == {
+            "db_terms", "photographer_terms"
+        }
+        assert set(es_service._build_search_query({"aggs": "db"})["aggs"]) == {"db_terms"}
+        assert "aggs" not in es_service._build_search_query({"aggs": "none"})
+
+    def test_auto_aggs_reused_for_later_pages(self, es_service, mock_elasticsearch_client, sample_search_response):
+        """Test that aggs=auto computes aggregations once per query."""
+        mock_elasticsearch_client.search.return_value = sample_search_response
+        params = {"query": "test", "aggs": "auto", "page_size": 2}
+
+        es_service.search({**params, "page": 1})
+        first_body = mock_elasticsearch_client.search.call_args[1]["body"]
+
+        mock_elasticsearch_client.search.return_value = {"hits": sample_search_response["hits"]}
+        response = es_service.search({**params, "page": 2, "sort_by": "id"})
+        second_body = mock_elasticsearch_client.search.call_args[1]["body"]
+
+        assert "aggs" in first_body
+        assert "aggs" not in second_body
+        assert response["aggregations"] == sample_search_response["aggregations"]
+
+    def test_auto_aggs_computed_when_not_cached(self, es_service, mock_elasticsearch_client, sample_search_response):
+        """Test that a later page computes aggregations if page 1 was never seen."""
+        from api.cache import get_search_aggregations_cache
+
+        mock_elasticsearch_client.search.return_value = sample_search_response
+
+        es_service.search({"query": "test", "aggs": "auto", "page": 3})
+
+        assert "aggs" in mock_elasticsearch_client.search.call_args[1]["body"]
+        assert len(get_search_aggregations_cache()) == 1
+
+
+class TestAsyncElasticsearchService:
+    """Test cases for AsyncElasticsearchService."""
+
+    def test_async_search(self, sample_search_response):
+        """Test that the async service awaits the client and shares the search cache."""
+        from api.services import AsyncElasticsearchService
+
+        client = Mock()
+        client.options.return_value = client
+        client.search = AsyncMock(return_value=sample_search_response)
+
+        async def run():
+            service = AsyncElasticsearchService(client=client)
+            first = await service.search({"query": "test", "db": ["st"]})
+            second = await service.search({"query": "test", "db": ["st"]})
+            return first, second
+
+        first, second = asyncio.run(run())
+
+        assert first == second == sample_search_response
+        client.search.assert_awaited_once()
+        body = client.search.call_args[1]["body"]
+        assert body["query"]["bool"]["filter"] == [{"term": {"db": "st"}}]
+
+    def test_async_batch_methods(self, sample_search_response):
+        """Test that msearch, get_by_ids and the photographer facet are awaited on the async client."""
+        from api.services import AsyncElasticsearchService
+
+        client = Mock()
+        client.options.return_value = client
+        client.msearch = AsyncMock(return_value={"responses": [sample_search_response]})
+        client.mget = AsyncMock(return_value={
+            "docs": [{"_id": "1", "found": True, "_source": {"db": "st"}}, {"_id": "2", "found": False}]
+        })
+        client.search = AsyncMock(return_value={
+            "aggregations": {
+                "photographers": {
+                    "after_key": {"photographer": "John Doe"},
+                    "buckets": [{"key": {"photographer": "John Doe"}, "doc_count": 2}],
+                }
+            }
+        })
+
+        async def run():
+            service = AsyncElasticsearchService(client=client)
+            return (
+                await service.msearch([{"query": "async"}]),
+                await service.get_by_ids(["1", "2"], use_cache=False),
+                await service.get_photographer_facet_page(1),
+            )
+
+        searches, documents, facet = asyncio.run(run())
+
+        assert searches == [sample_search_response]
+        assert documents == {"1": {"_id": "1", "_source": {"db": "st"}}}
+        assert facet == {
+            "buckets": [{"key": "John Doe", "doc_count": 2}],
+            "after_key": {"photographer": "John Doe"},
+        }
+
+    def test_async_export_batches(self):
+        """Test that exports are walked with an async generator that closes its PIT."""
+        from api.services import AsyncElasticsearchService
+
+        client = Mock()
+        client.options.return_value = client
+        client.open_point_in_time = AsyncMock(return_value={"id": "pit-1"})
+        client.close_point_in_time = AsyncMock()
+        client.search = AsyncMock(side_effect=[
+            {"pit_id": "pit-2", "hits": {"hits": [{"_id": "1", "sort": [1]}, {"_id": "2", "sort": [2]}]}},
+            {"pit_id": "pit-2", "hits": {"hits": [{"_id": "3", "sort": [3]}]}},
+        ])
+
+        async def run():
+            service = AsyncElasticsearchService(client=client)
+            return [batch async for batch in service.iter_hit_batches({}, batch_size=2)]
+
+        batches = asyncio.run(run())
+
+        assert [len(batch) for batch in batches] == [2, 1]
+        assert client.search.call_args[1]["body"]["search_after"] == [2]
+        client.close_point_in_time.assert_awaited_once_with(id="pit-2")
+
+    def test_async_client_is_shared_per_event_loop(self):
+        """Test that the async client registry keeps one client per loop."""
+        from api.services import get_async_elasticsearch_client, get_pool_stats
+
+        async def get_twice():
+            return get_async_elasticsearch_client(), get_async_elasticsearch_client()
+
+        with patch("api.services.AsyncElasticsearch") as mock_async_es:
+            mock_async_es.side_effect = lambda *args, **kwargs: Mock(close=AsyncMock())
+            first, second = asyncio.run(get_twice())
+            third, _ = asyncio.run(get_twice())
+
+        assert first is second
+        assert third is not first
+        assert not any(name.startswith("async-") for name in get_pool_stats()["clients"])
+
+    def test_async_client_is_closed_with_its_loop(self):
+        """Test that a request run through async_to_sync, as under WSGI, closes its client."""
+        from asgiref.sync import async_to_sync
+
+        from api.services import get_async_elasticsearch_client, get_pool_stats
+
+        async def get_client():
+            return get_async_elasticsearch_client()
+
+        with patch("api.services.AsyncElasticsearch") as mock_async_es:
+            mock_async_es.side_effect = lambda *args, **kwargs: Mock(close=AsyncMock())
+            first = async_to_sync(get_client)()
+            second = async_to_sync(get_client)()
+
+        assert first is not second
+        first.close.assert_awaited_once()
+        second.close.assert_awaited_once()
+        assert not any(name.startswith("async-") for name in get_pool_stats()["clients"])
+
+
+class TestMultiSearch:
+    """Test cases for ElasticsearchService.msearch."""
+
+    def test_msearch_single_round_trip(self, es_service, mock_elasticsearch_client, sample_search_response):
+        """Test that searches are sent together and errors are kept per search."""
+        error = {"error": {"type": "query_shard_exception"}, "status": 400}
+        mock_elasticsearch_client.msearch.return_value = {
+            "responses": [sample_search_response, error]
+        }
+
+        results = es_service.msearch([{"query": "first"}, {"query": "second", "db": ["st"]}])
+
+        mock_elasticsearch_client.msearch.assert_called_once()
+        body = mock_elasticsearch_client.msearch.call_args[1]["searches"]
+        assert body[0] == {"index": es_service.index}
+        assert body[1]["query"]["bool"]["must"][0]["multi_match"]["query"] == "first"
+        assert body[3]["query"]["bool"]["filter"] == [{"term": {"db": "st"}}]
+        assert results == [sample_search_response, error]
+
+    def test_msearch_uses_search_cache(self, es_service, mock_elasticsearch_client, sample_search_response):
+        """Test that cached searches are left out of the multi-search."""
+        mock_elasticsearch_client.search.return_value = sample_search_response
+        mock_elasticsearch_client.msearch.return_value = {"responses": [sample_search_response]}
+        es_service.search({"query": "cached"})
+
+        results = es_service.msearch([{"query": "cached"}, {"query": "fresh"}])
+
+        body = mock_elasticsearch_client.msearch.call_args[1]["searches"]
+        assert len(body) == 2
+        assert body[1]["query"]["bool"]["must"][0]["multi_match"]["query"] == "fresh"
+        assert results == [sample_search_response, sample_search_response]
+
+
+class TestGetByIds:
+    """Test cases for ElasticsearchService.get_by_ids."""
+
+    def test_get_by_ids_uses_mget_and_cache(self, es_service, mock_elasticsearch_client):
+        """Test bulk lookup in one round trip with per-document caching."""
+        source = {"bildnummer": "12345", "db": "st"}
+        mock_elasticsearch_client.mget.return_value = {
+            "docs": [
+                {"_id": "1", "found": True, "_source": source},
+                {"_id": "2", "found": False},
+            ]
+        }
+
+        documents = es_service.get_by_ids(["1", "2"])
+
+        assert documents == {"1": {"_id": "1", "_source": source}}
+        call_args = mock_elasticsearch_client.mget.call_args[1]
+        assert call_args["ids"] == ["1", "2"]
+        assert "bildnummer" in call_args["source_includes"]
+
+        mock_elasticsearch_client.mget.return_value = {"docs": [{"_id": "3", "found": True, "_source": source}]}
+        documents = es_service.get_by_ids(["1", "3"])
+
+        assert set(documents) == {"1", "3"}
+        assert mock_elasticsearch_client.mget.call_args[1]["ids"] == ["3"]
+
+    def test_get_by_ids_all_cached(self, es_service, mock_elasticsearch_client):
+        """Test that fully cached lookups do not touch Elasticsearch."""
+        from api.cache import get_media_cache
+
+        get_media_cache().set("1", {"_id": "1", "_source": {}})
+
+        assert es_service.get_by_ids(["1"]) == {"1": {"_id": "1", "_source": {}}}
+        mock_elasticsearch_client.mget.assert_not_called()
+
+
+class TestIterHitBatches:
+    """Test cases for ElasticsearchService.iter_hit_batches."""
+
+    def test_walks_all_hits_with_search_after(self, es_service, mock_elasticsearch_client):
+        """Test that batches follow search_after until a short page."""
+        mock_elasticsearch_client.open_point_in_time.return_value = {"id": "pit-1"}
+        mock_elasticsearch_client.search.side_effect = [
+            {"pit_id": "pit-2", "hits": {"hits": [{"_id": "1", "sort": [1]}, {"_id": "2", "sort": [2]}]}},
+            {"pit_id": "pit-3", "hits": {"hits": [{"_id": "3", "sort": [3]}]}},
+        ]
+
+        batches = list(es_service.iter_hit_batches({"query": "test", "page": 7}, batch_size=2))
+
+        assert [[hit["_id"] for hit in batch] for batch in batches] == [["1", "2"], ["3"]]
+        first_body = mock_elasticsearch_client.search.call_args_list[0][1]["body"]
+        second_body = mock_elasticsearch_client.search.call_args_list[1][1]["body"]
+        assert first_body["size"] == 2
+        assert "from" not in first_body
+        assert "aggs" not in first_body
+        assert "search_after" not in first_body
+        assert second_body["search_after"] == [2]
+        assert second_body["pit"]["id"] == "pit-2"
+        mock_elasticsearch_client.close_point_in_time.assert_called_once_with(id="pit-3")
+
+    def test_closes_point_in_time_when_abandoned(self, es_service, mock_elasticsearch_client):
+        """Test that closing the generator early closes the snapshot."""
+        mock_elasticsearch_client.open_point_in_time.return_value = {"id": "pit-1"}
+        mock_elasticsearch_client.search.return_value = {
+            "hits": {"hits": [{"_id": "1", "sort": [1]}, {"_id": "2", "sort": [2]}]}
+        }
+
+        batches = es_service.iter_hit_batches({}, batch_size=2)
+        next(batches)
+        batches.close()
+
+        mock_elasticsearch_client.close_point_in_time.assert_called_once_with(id="pit-1")
+
+
+class TestPhotographerFacet:
+    """Test cases for ElasticsearchService.get_photographer_facet_page."""
+
+    def test_pages_with_composite_aggregation(self, es_service, mock_elasticsearch_client):
+        """Test that pages are requested after the previous page's after key."""
+        mock_elasticsearch_client.search.return_value = {
+            "aggregations": {
+                "photographers": {
+                    "after_key": {"photographer": "John Doe"},
+                    "buckets": [
+                        {"key": {"photographer": "Jane Smith"}, "doc_count": 1},
+                        {"key": {"photographer": "John Doe"}, "doc_count": 2},
+                    ],
+                }
+            }
+        }
+
+        page = es_service.get_photographer_facet_page(2)
+
+        assert page == {
+            "buckets": [{"key": "Jane Smith", "doc_count": 1}, {"key": "John Doe", "doc_count": 2}],
+            "after_key": {"photographer": "John Doe"},
+        }
+        composite = mock_elasticsearch_client.search.call_args[1]["body"]["aggs"]["photographers"]["composite"]
+        assert composite["size"] == 2
+        assert "after" not in composite
+
+        es_service.get_photographer_facet_page(2, after={"photographer": "John Doe"})
+        composite = mock_elasticsearch_client.search.call_args[1]["body"]["aggs"]["photographers"]["composite"]
+        assert composite["after"] == {"photographer": "John Doe"}
+
+    def test_short_page_is_the_last(self, es_service, mock_elasticsearch_client):
+        """Test that a page with fewer buckets than asked for has no next page."""
+        mock_elasticsearch_client.search.return_value = {
+            "aggregations": {
+                "photographers": {
+                    "after_key": {"photographer": "John Doe"},
+                    "buckets": [{"key": {"photographer": "John Doe"}, "doc_count": 2}],
+                }
+            }
+        }
+
+        assert es_service.get_photographer_facet_page(10)["after_key"] is None
+
+
+def _index_stats(count, deleted=0, index_total=None, delete_total=0):
+    """Build an indices stats response for the index generation marker."""
+    return {
+        "_all": {
+            "primaries": {
+                "docs": {"count": count, "deleted": deleted},
+                "indexing": {
+                    "index_total": count if index_total is None else index_total,
+                    "delete_total": delete_total,
+                },
+            }
+        },
+        "indices": {"imago": {"uuid": "generation-1"}},
+    }
+
+
+class TestIndexGeneration:
+    """Test cases for the index generation marker."""
+
+    def test_generation_follows_searchable_documents(self, es_service, mock_elasticsearch_client):
+        """Test that the marker changes with the document counts and is cached."""
+        from api.cache import get_index_generation_cache
+
+        first = es_service.get_index_generation()
+        assert first == es_service.get_index_generation()
+        mock_elasticsearch_client.indices.stats.assert_called_once()
+        assert mock_elasticsearch_client.indices.stats.call_args[1]["metric"] == "docs,indexing"
+
+        mock_elasticsearch_client.indices.stats.return_value = _index_stats(3)
+        get_index_generation_cache().invalidate()
+        assert es_service.get_index_generation() != first
+
+    def test_generation_changes_for_good_after_update_and_merge(self):
+        """Test that purging an updated document does not restore the old marker."""
+        from api.services import make_index_generation
+
+        before = make_index_generation(_index_stats(2))
+        updated = make_index_generation(_index_stats(2, deleted=1, index_total=3))
+        merged = make_index_generation(_index_stats(2, deleted=0, index_total=3))
+
+        assert updated != before
+        assert merged == updated
+
+    def test_generation_unavailable(self, es_service, mock_elasticsearch_client):
+        """Test that stats errors leave the generation unknown instead of failing."""
+        mock_elasticsearch_client.indices.stats.side_effect = Exception("forbidden")
+        assert es_service.get_index_generation() is None
+
+    def test_failed_generation_lookup_is_cached(self, es_service, mock_elasticsearch_client, sample_search_response):
+        """Test that a cluster refusing index stats is asked once per INDEX_GENERATION_TTL."""
+        mock_elasticsearch_client.indices.stats.side_effect = Exception("forbidden")
+        mock_elasticsearch_client.search.return_value = sample_search_response
+
+        for _ in range(5):
+            assert es_service.get_index_generation() is None
+            es_service.search({"query": "test"})
+
+        mock_elasticsearch_client.indices.stats.assert_called_once()
+
+    def test_search_cache_is_keyed_on_generation(self, es_service, mock_elasticsearch_client, sample_search_response):
+        """Test that responses cached before the index changed are not reused."""
+        from api.cache import get_index_generation_cache
+
+        mock_elasticsearch_client.search.return_value = sample_search_response
+        es_service.get_index_generation()
+        es_service.search({"query": "test"})
+        es_service.search({"query": "test"})
+        assert mock_elasticsearch_client.search.call_count == 1
+
+        mock_elasticsearch_client.indices.stats.return_value = _index_stats(3)
+        get_index_generation_cache().invalidate()
+        es_service.get_index_generation()
+        es_service.search({"query": "test"})
+        assert mock_elasticsearch_client.search.call_count == 2
@@ -0,0 +1,193 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from django.core.cache import caches
+
+from api.resilience import DeadlineExceeded, deadline_budget
+from api.singleflight import SingleFlight
+
+
+def _run_concurrently(func, count):
+    """Call func from count threads released at the same moment."""
+    barrier = threading.Barrier(count)
+
+    def call(_):
+        barrier.wait()
+        return func()
+
+    with ThreadPoolExecutor(max_workers=count) as executor:
+        return list(executor.map(call, range(count)))
+
+
+@pytest.fixture
+def shared_cache(settings):
+    """Fixture providing a cache alias standing in for a shared backend."""
+    settings.CACHES = {
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+        "shared": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "shared"},
+    }
+    settings.SINGLEFLIGHT_POLL_INTERVAL_MS = 5
+    caches["shared"].clear()
+    return "shared"
+
+
+class TestSingleFlight:
+    """Test cases for SingleFlight."""
+
+    def test_concurrent_calls_are_coalesced(self):
+        """Test that identical concurrent calls run once and share the result."""
+        flight = SingleFlight("test")
+        calls = []
+
+        def slow():
+            calls.append(None)
+            time.sleep(0.1)
+            return {"answer": 42}
+
+        results = _run_concurrently(lambda: flight.do("key", slow), 8)
+
+        assert len(calls) == 1
+        assert all(result is results[0] for result in results)
+        assert flight.stats() == {"in_flight": 0, "leaders": 1, "followers": 7}
+
+        # The key is free again once the call finished
+        flight.do("key", slow)
+        assert len(calls) == 2
+
+    def test_errors_are_shared(self):
+        """Test that followers get the leader's error."""
+        flight = SingleFlight("test")
+
+        def failing():
+            time.sleep(0.1)
+            raise ValueError("boom")
+
+        def call():
+            try:
+                flight.do("key", failing)
+            except ValueError as e:
+                return str(e)
+
+        assert _run_concurrently(call, 4) == ["boom"] * 4
+        assert flight.stats()["leaders"] == 1
+
+    def test_followers_wait_within_their_budget(self):
+        """Test that a follower gives up when its deadline budget runs out."""
+        flight = SingleFlight("test")
+        started = threading.Event()
+
+        def slow():
+            started.set()
+            time.sleep(0.5)
+            return "late"
+
+        leader = threading.Thread(target=flight.do, args=("key", slow))
+        leader.start()
+        started.wait()
+        with deadline_budget(0.05):
+            with pytest.raises(DeadlineExceeded):
+                flight.do("key", slow)
+        leader.join()
+
+    def test_async_calls_are_coalesced(self):
+        """Test that identical concurrent coroutines run once."""
+        flight = SingleFlight("test")
+        calls = []
+
+        async def slow():
+            calls.append(None)
+            await asyncio.sleep(0.05)
+            return "result"
+
+        async def run():
+            return await asyncio.gather(*(flight.ado("key", slow) for _ in range(5)))
+
+        assert asyncio.run(run()) == ["result"] * 5
+        assert len(calls) == 1
+
+    def test_calls_are_coalesced_across_processes(self, shared_cache):
+        """Test that a second process waits for the result published by the lock holder."""
+        first = SingleFlight("test", backend=shared_cache)
+        second = SingleFlight("test", backend=shared_cache)
+        calls = []
+        started = threading.Event()
+
+        def slow():
+            calls.append(None)
+            started.set()
+            time.sleep(0.1)
+            return "shared"
+
+        leader = threading.Thread(target=first.do, args=("key", slow))
+        leader.start()
+        started.wait()
+        assert second.do("key", slow) == "shared"
+        leader.join()
+        assert len(calls) == 1
+
+    def test_failed_lock_holder_is_not_waited_for(self, shared_cache):
+        """Test that the other process runs the call itself when the lock holder fails."""
+        first = SingleFlight("test", backend=shared_cache)
+        second = SingleFlight("test", backend=shared_cache)
+        started = threading.Event()
+
+        def failing():
+            started.set()
+            time.sleep(0.05)
+            raise ValueError("boom")
+
+        def leader():
+            with pytest.raises(ValueError):
+                first.do("key", failing)
+
+        thread = threading.Thread(target=leader)
+        thread.start()
+        started.wait()
+        assert second.do("key", lambda: "recovered") == "recovered"
+        thread.join()
+
+
+class TestServiceCoalescing:
+    """Test cases for coalescing in ElasticsearchService."""
+
+    def test_identical_searches_share_one_call(self, settings, es_service, mock_elasticsearch_client, sample_search_response):
+        """Test that concurrent identical searches send one request, even uncached."""
+        settings.SEARCH_CACHE_ENABLED = False
+
+        def search(**kwargs):
+            time.sleep(0.1)
+            return sample_search_response
+
+        mock_elasticsearch_client.search.side_effect = search
+        results = _run_concurrently(lambda: es_service.search({"query": "test"}), 6)
+
+        assert all(result == sample_search_response for result in results)
+        assert mock_elasticsearch_client.search.call_count == 1
+
+    def test_global_aggregations_share_one_call(self, es_service, mock_elasticsearch_client, sample_global_aggregations):
+        """Test that concurrent global aggregation loads send one request."""
+        def search(**kwargs):
+            time.sleep(0.1)
+            return {"aggregations": sample_global_aggregations}
+
+        mock_elasticsearch_client.search.side_effect = search
+        results = _run_concurrently(es_service.get_global_aggregations, 4)
+
+        assert results == [sample_global_aggregations] * 4
+        assert mock_elasticsearch_client.search.call_count == 1
+
+    def test_coalescing_can_be_disabled(self, settings, es_service, mock_elasticsearch_client, sample_search_response):
+        """Test that SINGLEFLIGHT_ENABLED=False sends every search."""
+        settings.SINGLEFLIGHT_ENABLED = False
+        settings.SEARCH_CACHE_ENABLED = False
+
+        def search(**kwargs):
+            time.sleep(0.05)
+            return sample_search_response
+
+        mock_elasticsearch_client.search.side_effect = search
+        _run_concurrently(lambda: es_service.search({"query": "test"}), 3)
+        assert mock_elasticsearch_client.search.call_count == 3
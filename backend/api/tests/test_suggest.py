@@ -0,0 +1,101 @@
+import pytest
+from unittest.mock import Mock, patch
+from django.urls import reverse
+from rest_framework import status
+
+from api.cache import CacheEntry
+from api.suggest import PrefixIndex, fold, get_photographer_index, reset_photographer_index
+
+
+@pytest.fixture(autouse=True)
+def photographer_index():
+    """Fixture to give every test a freshly built photographer index."""
+    reset_photographer_index()
+    yield
+    reset_photographer_index()
+
+
+BUCKETS = [
+    ("John Doe", 50),
+    ("Jane Smith", 80),
+    ("Jürgen Müller", 30),
+    ("JOHANNA Doe-Weber", 5),
+    ("Mueller, Hans", 10),
+]
+
+
+class TestPrefixIndex:
+    """Test cases for PrefixIndex."""
+
+    def test_fold(self):
+        """Test that case, accents and whitespace are folded."""
+        assert fold("  Jürgen   MÜLLER ") == "jurgen muller"
+        assert fold("Straße") == "strasse"
+
+    def test_matches_any_word_by_count(self):
+        """Test that a prefix of any word matches, most frequent first."""
+        index = PrefixIndex(BUCKETS)
+
+        assert index.suggest("jo") == [
+            {"name": "John Doe", "count": 50},
+            {"name": "JOHANNA Doe-Weber", "count": 5},
+        ]
+        assert [entry["name"] for entry in index.suggest("doe")] == ["John Doe", "JOHANNA Doe-Weber"]
+        assert [entry["name"] for entry in index.suggest("john d")] == ["John Doe"]
+        assert index.suggest("xyz") == []
+
+    def test_matching_ignores_case_and_accents(self):
+        """Test that typed text matches regardless of case and accents."""
+        index = PrefixIndex(BUCKETS)
+
+        assert [entry["name"] for entry in index.suggest("MULLER")] == ["Jürgen Müller"]
+        assert [entry["name"] for entry in index.suggest("jür")] == ["Jürgen Müller"]
+
+    def test_limit_and_empty_query(self):
+        """Test that the limit applies and an empty query lists the top names."""
+        index = PrefixIndex(BUCKETS)
+
+        assert [entry["name"] for entry in index.suggest("", limit=2)] == ["Jane Smith", "John Doe"]
+        assert len(index.suggest("j", limit=1)) == 1
+        assert [entry["name"] for entry in index.suggest("j", limit=5)] == [
+            "Jane Smith", "John Doe", "Jürgen Müller", "JOHANNA Doe-Weber",
+        ]
+
+    def test_index_follows_the_aggregations_entry(self):
+        """Test that the index is rebuilt only when the aggregations change."""
+        data = {"photographer_terms": {"buckets": [{"key": "John Doe", "doc_count": 2}]}}
+        entry = CacheEntry({"data": data, "etag": "one"}, 1000.0)
+
+        first = get_photographer_index(entry)
+        assert get_photographer_index(CacheEntry(entry.value, 2000.0)) is first
+
+        changed = {"photographer_terms": {"buckets": [{"key": "Jane Smith", "doc_count": 3}]}}
+        second = get_photographer_index(CacheEntry({"data": changed, "etag": "two"}, 3000.0))
+        assert second is not first
+        assert second.suggest("ja") == [{"name": "Jane Smith", "count": 3}]
+
+
+class TestPhotographerSuggestAPIView:
+    """Test cases for PhotographerSuggestAPIView."""
+
+    @patch('api.views.ElasticsearchService')
+    def test_suggest_endpoint(self, mock_es_service, api_client, sample_global_aggregations):
+        """Test that suggestions come from the cached global aggregations."""
+        mock_service_instance = Mock()
+        mock_service_instance.get_global_aggregations.return_value = sample_global_aggregations
+        mock_es_service.return_value = mock_service_instance
+
+        url = reverse('photographer-suggest')
+        response = api_client.get(url, {'q': 'ja'})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == {"results": [{"name": "Jane Smith", "count": 1}]}
+        assert "max-age=60" in response["Cache-Control"]
+
+        response = api_client.get(url, {'q': 'j', 'limit': 1})
+        assert response.json() == {"results": [{"name": "John Doe", "count": 2}]}
+        mock_service_instance.get_global_aggregations.assert_called_once()
+
+    def test_suggest_endpoint_invalid_params(self, api_client):
+        """Test that the limit is validated."""
+        response = api_client.get(reverse('photographer-suggest'), {'q': 'j', 'limit': 0})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
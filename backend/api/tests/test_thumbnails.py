@@ -0,0 +1,249 @@
+import io
+import os
+import time
+from unittest.mock import patch
+
+import pytest
+from PIL import Image
+
+from api.thumbnails import ThumbnailCache, ThumbnailError, ThumbnailNotFound, ThumbnailPrewarmer
+
+
+@pytest.fixture
+def thumbnail_cache(image_server, tmp_path):
+    """Fixture to create a ThumbnailCache backed by the local image server."""
+    return ThumbnailCache(root=str(tmp_path / "thumbnails"), max_bytes=10 * 1024 * 1024, widths=[160, 320])
+
+
+class TestThumbnailCache:
+    """Test cases for ThumbnailCache."""
+
+    def test_fetches_original_once(self, thumbnail_cache, image_server):
+        """Test that every width is produced from a single upstream fetch."""
+        small = thumbnail_cache.get("st", "12345", 160)
+        large = thumbnail_cache.get("st", "12345", 320)
+        thumbnail_cache.get("st", "12345", 320)
+
+        assert image_server.requests == ["/bild/st/0000012345/s.jpg"]
+        with Image.open(small) as image:
+            assert image.format == "WEBP"
+            assert image.size == (160, 120)
+        with Image.open(large) as image:
+            assert image.size == (320, 240)
+
+    def test_rejects_invalid_requests(self, thumbnail_cache, image_server):
+        """Test unsupported widths, unsafe references and missing images."""
+        with pytest.raises(ThumbnailNotFound):
+            thumbnail_cache.get("st", "12345", 999)
+        with pytest.raises(ThumbnailNotFound):
+            thumbnail_cache.get("..", "12345", 160)
+
+        image_server.missing.add("/bild/st/0000000404/s.jpg")
+        with pytest.raises(ThumbnailNotFound):
+            thumbnail_cache.get("st", "404", 160)
+
+    def test_evicts_least_recently_used(self, image_server, tmp_path):
+        """Test that the cache stays under its size bound."""
+        cache = ThumbnailCache(
+            root=str(tmp_path / "small"), max_bytes=len(image_server.image) * 2, widths=[160]
+        )
+
+        first = cache.get("st", "1", 160)
+        os.utime(first, (1, 1))
+        os.utime(os.path.join(os.path.dirname(first), "original.jpg"), (1, 1))
+        cache.get("st", "2", 160)
+        cache.get("st", "3", 160)
+
+        assert not os.path.exists(first)
+        assert cache.size() <= cache.max_bytes
+
+    def test_overwrite_keeps_size(self, thumbnail_cache, image_server):
+        """Test that rewriting a file does not count its old size twice."""
+        path = thumbnail_cache.get("st", "12345", 160)
+        size = thumbnail_cache.size()
+        old_size = os.path.getsize(path)
+
+        thumbnail_cache._write(path, b"x" * 10)
+
+        assert thumbnail_cache.size() == size - old_size + 10
+        assert thumbnail_cache.size() == sum(size for _, size, _ in thumbnail_cache._scan())
+
+    def test_open_regenerates_evicted_files(self, thumbnail_cache, image_server):
+        """Test that a file evicted before it is opened is produced again."""
+        path = thumbnail_cache.get("st", "12345", 160)
+        get = thumbnail_cache.get
+        evicted = []
+
+        def get_then_evict(*args):
+            result = get(*args)
+            if not evicted:
+                evicted.append(result)
+                os.remove(result)
+            return result
+
+        with patch.object(thumbnail_cache, "get", side_effect=get_then_evict):
+            with thumbnail_cache.open("st", "12345", 160) as f:
+                assert f.name == path
+                with Image.open(f) as image:
+                    assert image.size == (160, 120)
+
+    def test_decompression_bombs_are_rejected(self, thumbnail_cache, image_server):
+        """Test that oversized images fail like other undecodable images."""
+        with patch.object(Image, "MAX_IMAGE_PIXELS", 1000):
+            with pytest.raises(ThumbnailError):
+                thumbnail_cache.get("st", "12345", 160)
+
+
+class TestThumbnailPrewarmer:
+    """Test cases for ThumbnailPrewarmer."""
+
+    def test_warms_each_variant_once(self, thumbnail_cache, image_server):
+        """Test that duplicate and already cached images are skipped."""
+        prewarmer = ThumbnailPrewarmer(thumbnail_cache, widths=[160, 320], max_workers=2)
+
+        prewarmer.warm([("st", "1"), ("st", "2"), ("st", "1")])
+        prewarmer.warm([("st", "1")])
+        prewarmer.close()
+
+        assert sorted(image_server.requests) == [
+            "/bild/st/0000000001/s.jpg",
+            "/bild/st/0000000002/s.jpg",
+        ]
+        assert thumbnail_cache.contains("st", "2", 320)
+        stats = prewarmer.stats()
+        assert stats["warmed"] == 4
+        assert stats["cached"] == 2
+        assert stats["pending"] == 0
+
+    def test_drops_work_beyond_max_pending(self, thumbnail_cache, image_server):
+        """Test that the queue is bounded and missing images are counted."""
+        image_server.missing.add("/bild/st/0000000404/s.jpg")
+        prewarmer = ThumbnailPrewarmer(thumbnail_cache, widths=[160], max_pending=1)
+
+        futures = prewarmer.submit([("st", "404"), ("st", "2")])
+        for future in futures:
+            future.result()
+        prewarmer.close()
+
+        stats = prewarmer.stats()
+        assert stats["missing"] == 1
+        assert stats["dropped"] == 1
+
+
+class TestThumbnailAPIView:
+    """Test cases for ThumbnailAPIView."""
+
+    def test_thumbnail_endpoint(self, api_client, image_server):
+        """Test serving a cached thumbnail with long-lived cache headers."""
+        from django.urls import reverse
+
+        response = api_client.get(reverse("thumbnail", args=["st", "12345"]), {"w": 160}, HTTP_ACCEPT="image/webp,image/*")
+
+        assert response.status_code == 200
+        assert response["Content-Type"] == "image/webp"
+        assert "max-age=31536000" in response["Cache-Control"]
+        assert "immutable" in response["Cache-Control"]
+        with Image.open(io.BytesIO(b"".join(response.streaming_content))) as image:
+            assert image.size == (160, 120)
+
+    def test_thumbnail_endpoint_errors(self, api_client, image_server):
+        """Test invalid widths and missing images."""
+        from django.urls import reverse
+
+        url = reverse("thumbnail", args=["st", "12345"])
+        assert api_client.get(url, {"w": "wide"}).status_code == 400
+        assert api_client.get(url, {"w": 100}).status_code == 404
+
+        image_server.missing.add("/bild/st/0000000404/s.jpg")
+        assert api_client.get(reverse("thumbnail", args=["st", "404"])).status_code == 404
+
+        with patch.object(Image, "MAX_IMAGE_PIXELS", 1000):
+            assert api_client.get(reverse("thumbnail", args=["st", "1"])).status_code == 502
+
+
+class TestSearchPrewarming:
+    """Test cases for pre-warming thumbnails from searches."""
+
+    def test_first_page_warms_only_itself(
+        self, api_client, image_server, settings, mock_elasticsearch_client, sample_search_response
+    ):
+        """Test that the first page does not search for the next one."""
+        from django.urls import reverse
+
+        from api.thumbnails import get_thumbnail_prewarmer
+
+        settings.THUMBNAIL_PREWARM_ENABLED = True
+        settings.THUMBNAIL_PREWARM_NEXT_PAGE = True
+        settings.THUMBNAIL_PREWARM_WIDTHS = [160]
+        mock_elasticsearch_client.search.return_value = sample_search_response
+
+        response = api_client.get(reverse("media-list"), {"page_size": 2})
+
+        assert response.status_code == 200
+        prewarmer = get_thumbnail_prewarmer()
+        deadline = time.monotonic() + 5
+        while prewarmer.stats()["warmed"] < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        prewarmer.close()
+        assert mock_elasticsearch_client.search.call_count == 1
+        assert len(image_server.requests) == 2
+
+    def test_later_page_warms_current_and_next_page(
+        self, api_client, image_server, settings, mock_elasticsearch_client, sample_search_response
+    ):
+        """Test that a full follow-up page warms its own and the next page's thumbnails."""
+        from django.urls import reverse
+
+        from api.thumbnails import get_thumbnail_prewarmer
+
+        settings.THUMBNAIL_PREWARM_ENABLED = True
+        settings.THUMBNAIL_PREWARM_NEXT_PAGE = True
+        settings.THUMBNAIL_PREWARM_WIDTHS = [160]
+        next_page = {
+            "hits": {
+                "total": {"value": 3},
+                "hits": [{"_id": "3", "_source": {"db": "st", "bildnummer": "3"}}],
+            },
+        }
+        mock_elasticsearch_client.search.side_effect = [sample_search_response, next_page]
+
+        response = api_client.get(reverse("media-list"), {"page_size": 2, "page": 2})
+
+        assert response.status_code == 200
+        prewarmer = get_thumbnail_prewarmer()
+        deadline = time.monotonic() + 5
+        while prewarmer.stats()["warmed"] < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        prewarmer.close()
+        assert mock_elasticsearch_client.search.call_args_list[1][1]["body"]["from"] == 4
+        assert sorted(image_server.requests) == [
+            "/bild/st/0000000003/s.jpg",
+            "/bild/st/0000012345/s.jpg",
+            "/bild/st/0000067890/s.jpg",
+        ]
+
+
+class TestPrewarmThumbnailsCommand:
+    """Test cases for the prewarm_thumbnails management command."""
+
+    def test_warms_every_hit(self, image_server, mock_elasticsearch_client):
+        """Test that the command walks the search and reports throughput."""
+        from django.core.management import call_command
+
+        mock_elasticsearch_client.open_point_in_time.return_value = {"id": "pit-1"}
+        mock_elasticsearch_client.search.side_effect = [
+            {"hits": {"hits": [
+                {"_id": "1", "sort": [1], "_source": {"db": "st", "bildnummer": "1"}},
+                {"_id": "2", "sort": [2], "_source": {"db": "st", "bildnummer": "2"}},
+            ]}},
+            {"hits": {"hits": [{"_id": "3", "sort": [3], "_source": {"db": "sp", "bildnummer": "3"}}]}},
+        ]
+        output = io.StringIO()
+
+        call_command("prewarm_thumbnails", "--query", "test", "--batch-size", "2", stdout=output)
+
+        assert len(image_server.requests) == 3
+        body = mock_elasticsearch_client.search.call_args_list[0][1]["body"]
+        assert body["_source"]["includes"] == ["db", "bildnummer"]
+        assert "Done: 3 hits" in output.getvalue()
+        assert "3 warmed" in output.getvalue()
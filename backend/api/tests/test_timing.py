@@ -0,0 +1,79 @@
+import json
+import logging
+
+import pytest
+from django.contrib.auth.models import User
+from django.urls import reverse
+
+from api.timing import LatencyHistogram, RequestTimings, get_endpoint_latencies
+
+
+class TestRequestTimings:
+    """Test cases for RequestTimings and LatencyHistogram."""
+
+    def test_server_timing_header(self):
+        """Test that repeated phases are summed and took is recorded."""
+        timings = RequestTimings()
+        timings.record_es_response({"took": 7}, 0.010)
+        timings.record_es_response({"took": 3}, 0.005)
+        timings.record("serialize", 0.002)
+
+        assert timings.as_milliseconds() == {"es": 15.0, "es-took": 10.0, "serialize": 2.0}
+        assert timings.server_timing() == (
+            'es;dur=15.0;desc="Elasticsearch round trip", '
+            'es-took;dur=10.0;desc="Elasticsearch took", '
+            'serialize;dur=2.0;desc="Response serialization"'
+        )
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Test bucket assignment at and between bounds."""
+        histogram = LatencyHistogram(buckets=(10, 100))
+        for milliseconds in (1, 10, 50, 500):
+            histogram.observe(milliseconds)
+
+        assert histogram.snapshot() == {
+            "buckets": [(10, 2), (100, 3), ("+Inf", 4)],
+            "count": 4,
+            "sum": 561.0,
+        }
+
+
+@pytest.mark.django_db
+class TestRequestTimingMiddleware:
+    """Test cases for RequestTimingMiddleware."""
+
+    def test_search_reports_phases(self, api_client, mock_elasticsearch_client, sample_search_response, caplog):
+        """Test Server-Timing, the structured log line and the endpoint histograms."""
+        mock_elasticsearch_client.search.return_value = {**sample_search_response, "took": 4}
+        # The timing logger does not propagate, so attach the capture handler directly
+        timing_logger = logging.getLogger("api.timing")
+        timing_logger.addHandler(caplog.handler)
+        try:
+            response = api_client.get(reverse("media-list"), {"query": "test"})
+        finally:
+            timing_logger.removeHandler(caplog.handler)
+
+        assert response.status_code == 200
+        phases = [entry.split(";")[0] for entry in response["Server-Timing"].split(", ")]
+        assert phases == ["es", "es-took", "serialize", "render", "total"]
+
+        record = json.loads(caplog.records[-1].getMessage())
+        assert record["endpoint"] == "media-list"
+        assert record["status"] == 200
+        assert record["timings_ms"]["es-took"] == 4.0
+
+        histograms = get_endpoint_latencies().snapshot()["media-list"]
+        assert histograms["total"]["count"] == 1
+        assert histograms["es"]["count"] == 1
+
+    def test_timings_endpoint_requires_admin(self, api_client):
+        """Test that histograms are only exposed to staff users."""
+        url = reverse("request-timings")
+        assert api_client.get(url).status_code in (401, 403)
+
+        api_client.force_authenticate(User.objects.create(username="admin", is_staff=True))
+        response = api_client.get(url)
+
+        assert response.status_code == 200
+        # Only the rejected request has finished when the histograms are read
+        assert response.json()["request-timings"]["total"]["count"] == 1
@@ -1,5 +1,5 @@
 import pytest
-from api.utils import get_media_url
+from api.utils import decode_cursor, encode_cursor, get_media_url
 
 
 class TestUtils:
@@ -14,4 +14,14 @@ class TestUtils:
         # Test with single digit number
         url = get_media_url('st', '1')
         expected_url = 'https://www.imago-images.de/bild/st/0000000001/s.jpg'
-        assert url == expected_url 
\ No newline at end of file
+        assert url == expected_url
+
+    def test_cursor_round_trip(self):
+        """Test encode_cursor and decode_cursor."""
+        data = {'pit': 'abc==', 'after': [1704067200000, '12345'], 'key': 'k'}
+        token = encode_cursor(data)
+        assert '=' not in token
+        assert decode_cursor(token) == data
+
+        with pytest.raises(ValueError):
+            decode_cursor('%%%')
@@ -1,5 +1,6 @@
+import json
 import pytest
-from unittest.mock import Mock, patch
+from unittest.mock import AsyncMock, Mock, patch
 from django.urls import reverse
 from rest_framework import status
 
@@ -13,6 +14,7 @@ class TestMediaAPIView:
         # Create a mock instance of ElasticsearchService
         mock_service_instance = Mock()
         mock_service_instance.search.return_value = sample_search_response
+        mock_service_instance.get_index_generation.return_value = 'generation-1'
         mock_es_service.return_value = mock_service_instance
         
         url = reverse('media-list')
@@ -27,6 +29,45 @@ class TestMediaAPIView:
         assert data['total'] == 2
         assert len(data['results']) == 2
         assert 'aggregations' in data
+        assert response['ETag']
+
+    @patch('api.views.ElasticsearchService')
+    def test_search_endpoint_not_modified(self, mock_es_service, api_client, sample_search_response):
+        """Test that a matching If-None-Match returns 304 without searching."""
+        mock_service_instance = Mock()
+        mock_service_instance.search.return_value = sample_search_response
+        mock_service_instance.get_index_generation.return_value = 'generation-1'
+        mock_es_service.return_value = mock_service_instance
+
+        url = reverse('media-list')
+        etag = api_client.get(url, {'query': 'test'})['ETag']
+        # The ETag is built from the normalized query
+        response = api_client.get(url, {'query': ' test ', 'page': 1}, HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response['ETag'] == etag
+        assert not response.content
+        mock_service_instance.search.assert_called_once()
+
+        assert api_client.get(url, {'query': 'other'}, HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_200_OK
+
+        mock_service_instance.get_index_generation.return_value = 'generation-2'
+        response = api_client.get(url, {'query': 'test'}, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_200_OK
+        assert response['ETag'] != etag
+
+    @patch('api.views.ElasticsearchService')
+    def test_search_endpoint_without_generation(self, mock_es_service, api_client, sample_search_response):
+        """Test that searches are answered without an ETag when the generation is unknown."""
+        mock_service_instance = Mock()
+        mock_service_instance.search.return_value = sample_search_response
+        mock_service_instance.get_index_generation.return_value = None
+        mock_es_service.return_value = mock_service_instance
+
+        response = api_client.get(reverse('media-list'), {'query': 'test'}, HTTP_IF_NONE_MATCH='"anything"')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert not response.has_header('ETag')
 
     def test_search_endpoint_invalid_params(self, api_client):
         """Test the search endpoint with invalid parameters."""
@@ -36,4 +77,368 @@ class TestMediaAPIView:
             'page_size': 200  # Invalid page size
         })
         
-        assert response.status_code == status.HTTP_400_BAD_REQUEST 
\ No newline at end of file
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    @patch('api.views.ElasticsearchService')
+    def test_search_endpoint_cursor_mode(self, mock_es_service, api_client, sample_search_response):
+        """Test that cursor mode returns the next cursor token."""
+        mock_service_instance = Mock()
+        mock_service_instance.search.return_value = sample_search_response
+        mock_service_instance.get_next_cursor.return_value = 'next-token'
+        mock_es_service.return_value = mock_service_instance
+
+        response = api_client.get(reverse('media-list'), {'query': 'test', 'pagination': 'cursor'})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()['next_cursor'] == 'next-token'
+
+    @patch('api.views.ElasticsearchService')
+    def test_search_endpoint_generation_shares_budget(self, mock_es_service, api_client, sample_search_response):
+        """Test that the index generation lookup counts against the search's deadline budget."""
+        from api import resilience
+
+        deadlines = []
+        mock_service_instance = Mock()
+        mock_service_instance.get_index_generation.side_effect = (
+            lambda: deadlines.append(resilience._deadline.get()) or 'generation-1'
+        )
+        mock_service_instance.search.side_effect = (
+            lambda params: deadlines.append(resilience._deadline.get()) or sample_search_response
+        )
+        mock_es_service.return_value = mock_service_instance
+
+        response = api_client.get(reverse('media-list'), {'query': 'test'})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert len(deadlines) == 2
+        assert deadlines[0] is not None
+        assert deadlines[0] == deadlines[1]
+
+    def test_search_endpoint_cursor_pages_with_auto_aggs(
+        self, api_client, mock_elasticsearch_client, sample_search_response
+    ):
+        """Test that a cursor issued with aggs=auto is accepted for the next page."""
+        mock_elasticsearch_client.open_point_in_time.return_value = {'id': 'pit-1'}
+        page = {**sample_search_response, 'pit_id': 'pit-2'}
+        page['hits'] = {
+            **page['hits'],
+            'hits': [
+                {**hit, 'sort': [1700000000 - i, str(i)]}
+                for i, hit in enumerate(sample_search_response['hits']['hits'])
+            ],
+        }
+        mock_elasticsearch_client.search.return_value = page
+        params = {'query': 'test', 'pagination': 'cursor', 'aggs': 'auto', 'page_size': 2}
+
+        first = api_client.get(reverse('media-list'), params)
+        assert first.status_code == status.HTTP_200_OK
+        cursor = first.json()['next_cursor']
+        assert cursor
+
+        second = api_client.get(reverse('media-list'), {**params, 'cursor': cursor})
+
+        assert second.status_code == status.HTTP_200_OK
+        body = mock_elasticsearch_client.search.call_args[1]['body']
+        assert body['search_after'] == [1699999999, '1']
+
+    @patch('api.views.ElasticsearchService')
+    def test_search_endpoint_invalid_cursor(self, mock_es_service, api_client):
+        """Test that a cursor rejected by the service returns 400."""
+        from api.services import InvalidCursorError
+        from api.utils import encode_cursor
+
+        mock_service_instance = Mock()
+        mock_service_instance.search.side_effect = InvalidCursorError('Cursor has expired')
+        mock_es_service.return_value = mock_service_instance
+
+        token = encode_cursor({'pit': 'pit-1', 'after': [1], 'key': 'abc'})
+        response = api_client.get(reverse('media-list'), {'cursor': token})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'cursor' in response.json()
+
+class TestAggregationAPIView:
+    """Test cases for AggregationAPIView."""
+
+    @patch('api.views.ElasticsearchService')
+    def test_aggregations_endpoint_is_cached(self, mock_es_service, api_client, sample_global_aggregations):
+        """Test that global aggregations are fetched once and then served from cache."""
+        mock_service_instance = Mock()
+        mock_service_instance.get_global_aggregations.return_value = sample_global_aggregations
+        mock_es_service.return_value = mock_service_instance
+
+        url = reverse('aggregations-list')
+        first = api_client.get(url)
+        second = api_client.get(url)
+
+        assert first.status_code == status.HTTP_200_OK
+        assert second.json() == first.json()
+        assert first.json()['db_terms']['buckets'] == [{'key': 'st', 'doc_count': 3}]
+        assert first['ETag']
+        assert first['Last-Modified']
+        mock_service_instance.get_global_aggregations.assert_called_once()
+
+    @patch('api.views.ElasticsearchService')
+    def test_aggregations_endpoint_not_modified(self, mock_es_service, api_client, sample_global_aggregations):
+        """Test that a matching If-None-Match returns 304 Not Modified."""
+        mock_service_instance = Mock()
+        mock_service_instance.get_global_aggregations.return_value = sample_global_aggregations
+        mock_es_service.return_value = mock_service_instance
+
+        url = reverse('aggregations-list')
+        etag = api_client.get(url)['ETag']
+        response = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response['ETag'] == etag
+        assert not response.content
+
+    @patch('api.views.ElasticsearchService')
+    def test_aggregations_endpoint_error(self, mock_es_service, api_client):
+        """Test that Elasticsearch errors return 500."""
+        mock_service_instance = Mock()
+        mock_service_instance.get_global_aggregations.side_effect = Exception("boom")
+        mock_es_service.return_value = mock_service_instance
+
+        response = api_client.get(reverse('aggregations-list'))
+
+        assert response.status_code == status.HTTP_500_INTERNAL_SERVER_ERROR
+
+
+class TestPhotographerFacetAPIView:
+    """Test cases for PhotographerFacetAPIView."""
+
+    @patch('api.views.ElasticsearchService')
+    def test_facet_pages(self, mock_es_service, api_client):
+        """Test that the next token fetches the following page and pages are cached."""
+        mock_service_instance = Mock()
+        mock_service_instance.get_photographer_facet_page.side_effect = [
+            {"buckets": [{"key": "Jane Smith", "doc_count": 1}], "after_key": {"photographer": "Jane Smith"}},
+            {"buckets": [{"key": "John Doe", "doc_count": 2}], "after_key": None},
+        ]
+        mock_es_service.return_value = mock_service_instance
+
+        url = reverse('photographer-facet')
+        first = api_client.get(url, {'size': 1})
+        assert first.status_code == status.HTTP_200_OK
+        assert first.json()['buckets'] == [{'key': 'Jane Smith', 'doc_count': 1}]
+        assert first['ETag']
+
+        second = api_client.get(url, {'size': 1, 'after': first.json()['next']})
+        assert second.json() == {'buckets': [{'key': 'John Doe', 'doc_count': 2}], 'next': None}
+        mock_service_instance.get_photographer_facet_page.assert_called_with(1, {"photographer": "Jane Smith"})
+
+        assert api_client.get(url, {'size': 1}).json() == first.json()
+        assert mock_service_instance.get_photographer_facet_page.call_count == 2
+
+    def test_facet_invalid_params(self, api_client):
+        """Test that sizes and after tokens are validated."""
+        url = reverse('photographer-facet')
+        assert api_client.get(url, {'size': 0}).status_code == status.HTTP_400_BAD_REQUEST
+        assert api_client.get(url, {'after': 'garbage'}).status_code == status.HTTP_400_BAD_REQUEST
+
+
+class TestAsyncViews:
+    """Test cases for the async search and aggregation views."""
+
+    @patch('api.views.AsyncElasticsearchService')
+    def test_async_search_endpoint(self, mock_es_service, api_client, sample_search_response):
+        """Test the async search endpoint."""
+        mock_service_instance = Mock()
+        mock_service_instance.search = AsyncMock(return_value=sample_search_response)
+        mock_service_instance.get_index_generation = AsyncMock(return_value='generation-1')
+        mock_es_service.return_value = mock_service_instance
+
+        response = api_client.get(reverse('async-media-list'), {'query': 'test'})
+
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert data['total'] == 2
+        assert data['results'][0]['source']['image_number'] == '12345'
+        mock_service_instance.search.assert_awaited_once()
+
+        response = api_client.get(reverse('async-media-list'), {'query': 'test'}, HTTP_IF_NONE_MATCH=response['ETag'])
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        mock_service_instance.search.assert_awaited_once()
+
+    def test_async_search_endpoint_invalid_params(self, api_client):
+        """Test the async search endpoint with invalid parameters."""
+        response = api_client.get(reverse('async-media-list'), {'page': 0})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'page' in response.json()
+
+    @patch('api.views.AsyncElasticsearchService')
+    def test_async_aggregations_endpoint(self, mock_es_service, api_client, sample_global_aggregations):
+        """Test the async aggregations endpoint and its conditional responses."""
+        mock_service_instance = Mock()
+        mock_service_instance.get_global_aggregations = AsyncMock(
+            return_value=sample_global_aggregations
+        )
+        mock_es_service.return_value = mock_service_instance
+
+        url = reverse('async-aggregations-list')
+        response = api_client.get(url)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()['db_terms']['buckets'] == [{'key': 'st', 'doc_count': 3}]
+
+        not_modified = api_client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        assert not_modified.status_code == status.HTTP_304_NOT_MODIFIED
+        mock_service_instance.get_global_aggregations.assert_awaited_once()
+
+
+class TestBatchSearchAPIView:
+    """Test cases for BatchSearchAPIView."""
+
+    @patch('api.views.ElasticsearchService')
+    def test_batch_search_endpoint(self, mock_es_service, api_client, sample_search_response):
+        """Test per-search results, validation errors and search errors."""
+        mock_service_instance = Mock()
+        mock_service_instance.msearch.return_value = [
+            sample_search_response,
+            {"error": {"type": "query_shard_exception"}, "status": 400},
+        ]
+        mock_es_service.return_value = mock_service_instance
+
+        response = api_client.post(reverse('media-batch'), {
+            'searches': [
+                {'query': 'first', 'db': ['st']},
+                {'page': 0},
+                {'query': 'broken'},
+            ]
+        }, format='json')
+
+        assert response.status_code == status.HTTP_200_OK
+        first, invalid, failed = response.json()['responses']
+        assert first['status'] == 200
+        assert first['total'] == 2
+        assert invalid['status'] == 400
+        assert 'page' in invalid['errors']
+        assert failed['status'] == 400
+        assert 'error' in failed
+        searched = mock_service_instance.msearch.call_args[0][0]
+        assert [params['query'] for params in searched] == ['first', 'broken']
+
+    def test_batch_search_endpoint_requires_searches(self, api_client, settings):
+        """Test that empty and oversized batches are rejected."""
+        url = reverse('media-batch')
+        assert api_client.post(url, {}, format='json').status_code == status.HTTP_400_BAD_REQUEST
+
+        settings.SEARCH_BATCH_MAX_SIZE = 1
+        response = api_client.post(url, {'searches': [{}, {}]}, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+class TestMediaLookupViews:
+    """Test cases for the media detail and bulk lookup endpoints."""
+
+    @patch('api.views.ElasticsearchService')
+    def test_media_lookup_endpoint(self, mock_es_service, api_client, sample_search_response):
+        """Test bulk lookup keeps the requested order and reports missing ids."""
+        hits = sample_search_response['hits']['hits']
+        mock_service_instance = Mock()
+        mock_service_instance.get_by_ids.return_value = {'1': hits[0], '2': hits[1]}
+        mock_es_service.return_value = mock_service_instance
+
+        response = api_client.get(reverse('media-lookup'), {'ids': '2,1,9'})
+
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert [item['id'] for item in data['results']] == ['2', '1']
+        assert data['missing'] == ['9']
+        mock_service_instance.get_by_ids.assert_called_once_with(['2', '1', '9'])
+
+    def test_media_lookup_endpoint_requires_ids(self, api_client):
+        """Test that ids is required."""
+        response = api_client.get(reverse('media-lookup'))
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    @patch('api.views.ElasticsearchService')
+    def test_media_detail_endpoint(self, mock_es_service, api_client, sample_search_response):
+        """Test the detail endpoint for found and missing items."""
+        mock_service_instance = Mock()
+        mock_service_instance.get_by_ids.return_value = {'1': sample_search_response['hits']['hits'][0]}
+        mock_es_service.return_value = mock_service_instance
+
+        response = api_client.get(reverse('media-detail', args=['1']))
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()['source']['image_number'] == '12345'
+
+        mock_service_instance.get_by_ids.return_value = {}
+        response = api_client.get(reverse('media-detail', args=['404']))
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+class TestExportAPIView:
+    """Test cases for ExportAPIView."""
+
+    @patch('api.views.ElasticsearchService')
+    def test_export_ndjson(self, mock_es_service, api_client, sample_search_response):
+        """Test streaming an NDJSON export."""
+        hits = sample_search_response['hits']['hits']
+        mock_service_instance = Mock()
+        mock_service_instance.iter_hit_batches.return_value = iter([hits[:1], hits[1:]])
+        mock_es_service.return_value = mock_service_instance
+
+        response = api_client.get(reverse('media-export'), {'query': 'test'})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response['Content-Type'] == 'application/x-ndjson'
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        rows = [json.loads(line) for line in lines]
+        assert [row['id'] for row in rows] == ['1', '2']
+        assert rows[0]['thumbnail_url'] == 'https://www.imago-images.de/bild/st/0000012345/s.jpg'
+
+    @patch('api.views.ElasticsearchService')
+    def test_export_csv(self, mock_es_service, api_client, sample_search_response):
+        """Test streaming a CSV export with selected fields."""
+        mock_service_instance = Mock()
+        mock_service_instance.iter_hit_batches.return_value = iter([sample_search_response['hits']['hits']])
+        mock_es_service.return_value = mock_service_instance
+
+        response = api_client.get(reverse('media-export'), {
+            'export_format': 'csv',
+            'fields': 'image_number,thumbnail_url',
+        })
+
+        assert response['Content-Type'] == 'text/csv'
+        content = b''.join(response.streaming_content).decode().splitlines()
+        assert content[0] == 'id,image_number,thumbnail_url'
+        assert content[1] == '1,12345,https://www.imago-images.de/bild/st/0000012345/s.jpg'
+
+    @patch('api.views.ElasticsearchService')
+    def test_export_error_while_streaming(self, mock_es_service, api_client, sample_search_response):
+        """Test that a batch failing halfway aborts the stream instead of ending it cleanly."""
+        hits = sample_search_response['hits']['hits']
+
+        def failing_batches(params):
+            yield hits[:1]
+            raise Exception('boom')
+
+        mock_service_instance = Mock()
+        mock_service_instance.iter_hit_batches.side_effect = failing_batches
+        mock_es_service.return_value = mock_service_instance
+
+        response = api_client.get(reverse('media-export'), {'query': 'test'})
+        assert response.status_code == status.HTTP_200_OK
+
+        content = iter(response.streaming_content)
+        assert json.loads(next(content))['id'] == '1'
+        with pytest.raises(Exception, match='boom'):
+            next(content)
+
+    @patch('api.views.ElasticsearchService')
+    def test_export_error_before_streaming(self, mock_es_service, api_client):
+        """Test that cluster errors on the first batch return 500."""
+        def failing_batches(params):
+            raise Exception('boom')
+            yield
+
+        mock_service_instance = Mock()
+        mock_service_instance.iter_hit_batches.side_effect = failing_batches
+        mock_es_service.return_value = mock_service_instance
+
+        response = api_client.get(reverse('media-export'))
+
+        assert response.status_code == status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -0,0 +1,393 @@
+import io
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import requests
+from django.conf import settings
+from PIL import Image
+
+from api.utils import get_media_url
+
+logger = logging.getLogger(__name__)
+
+_DB_PATTERN = re.compile(r"^[A-Za-z0-9_-]+$")
+_BILDNUMMER_PATTERN = re.compile(r"^[0-9]+$")
+
+
+class ThumbnailError(Exception):
+    """Raised when a thumbnail cannot be produced."""
+
+
+class ThumbnailNotFound(ThumbnailError):
+    """Raised when the upstream image does not exist."""
+
+
+class ThumbnailCache:
+    """
+    Size-bounded on-disk cache of resized Imago thumbnails.
+
+    The upstream ``s.jpg`` of an image is downloaded once and kept next to
+    its resized variants under ``root/<db>/<bildnummer>/``. Reads refresh a
+    file's modification time, and once the cache grows past ``max_bytes``
+    the least recently used files are deleted.
+    """
+
+    def __init__(self, root, max_bytes, widths, image_format="WEBP", quality=80, timeout=10):
+        """
+        Initialize the cache.
+
+        Args:
+            root (str): Directory holding the cached files
+            max_bytes (int): Total size the cache may grow to before evicting
+            widths (list): Allowed thumbnail widths in pixels
+            image_format (str): Pillow format of the resized variants
+            quality (int): Encoder quality of the resized variants
+            timeout (float): Seconds to wait for the upstream image
+        """
+        self.root = root
+        self.max_bytes = max_bytes
+        self.widths = sorted(widths)
+        self.image_format = image_format
+        self.quality = quality
+        self.timeout = timeout
+        self.extension = image_format.lower()
+        self.content_type = f"image/{self.extension}"
+        self._size = None
+        self._size_lock = threading.Lock()
+        # Striped locks so concurrent requests for one image fetch it only once
+        self._key_locks = [threading.Lock() for _ in range(64)]
+        self._session = requests.Session()
+
+    def _directory(self, db, bildnummer):
+        if not _DB_PATTERN.match(str(db)) or not _BILDNUMMER_PATTERN.match(str(bildnummer)):
+            raise ThumbnailNotFound(f"Invalid image reference {db}/{bildnummer}")
+        return os.path.join(self.root, str(db), str(bildnummer).zfill(10))
+
+    def _lock_for(self, key):
+        return self._key_locks[hash(key) % len(self._key_locks)]
+
+    def contains(self, db, bildnummer, width):
+        """Return whether the variant is already cached."""
+        return os.path.exists(
+            os.path.join(self._directory(db, bildnummer), f"{width}.{self.extension}")
+        )
+
+    def get(self, db, bildnummer, width):
+        """
+        Return the path of a cached thumbnail, producing it if needed.
+
+        Args:
+            db (str): The database identifier for the image
+            bildnummer (str): The Bildnummer of the image
+            width (int): One of the allowed widths
+
+        Returns:
+            str: Path of the resized image on disk
+
+        Raises:
+            ThumbnailNotFound: If the image reference or width is invalid, or
+                the upstream image does not exist
+            ThumbnailError: If the upstream image cannot be fetched or decoded
+        """
+        if width not in self.widths:
+            raise ThumbnailNotFound(f"Unsupported thumbnail width {width}")
+        directory = self._directory(db, bildnummer)
+        path = os.path.join(directory, f"{width}.{self.extension}")
+        if self._touch(path):
+            return path
+
+        with self._lock_for(directory):
+            # Another thread may have produced it while we waited
+            if self._touch(path):
+                return path
+            original = self._get_original(db, bildnummer, directory)
+            self._write(path, self._resize(original, width))
+        self._evict()
+        return path
+
+    def open(self, db, bildnummer, width):
+        """
+        Open a cached thumbnail for reading, producing it if needed.
+
+        Eviction may delete the file between :meth:`get` and opening it, in
+        which case it is produced again.
+
+        Returns:
+            file: The resized image opened in binary mode
+
+        Raises:
+            ThumbnailNotFound: See :meth:`get`
+            ThumbnailError: See :meth:`get`, or if the file keeps disappearing
+        """
+        for _ in range(2):
+            path = self.get(db, bildnummer, width)
+            try:
+                return open(path, "rb")
+            except FileNotFoundError:
+                continue
+        raise ThumbnailError(f"Thumbnail {db}/{bildnummer} was evicted before it could be read")
+
+    def _touch(self, path):
+        try:
+            os.utime(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def _get_original(self, db, bildnummer, directory):
+        path = os.path.join(directory, "original.jpg")
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+            return data
+        except FileNotFoundError:
+            pass
+
+        url = get_media_url(db, bildnummer)
+        try:
+            response = self._session.get(url, timeout=self.timeout)
+        except requests.RequestException as e:
+            raise ThumbnailError(f"Error fetching {url}: {str(e)}") from e
+        if response.status_code == 404:
+            raise ThumbnailNotFound(f"Image {url} not found")
+        if response.status_code != 200:
+            raise ThumbnailError(f"Error fetching {url}: HTTP {response.status_code}")
+        self._write(path, response.content)
+        return response.content
+
+    def _resize(self, data, width):
+        try:
+            with Image.open(io.BytesIO(data)) as image:
+                if image.mode not in ("RGB", "RGBA"):
+                    image = image.convert("RGB")
+                # thumbnail() keeps the aspect ratio and never upscales
+                image.thumbnail((width, width * 10))
+                output = io.BytesIO()
+                image.save(output, format=self.image_format, quality=self.quality)
+                return output.getvalue()
+        except (OSError, ValueError, Image.DecompressionBombError) as e:
+            raise ThumbnailError(f"Error resizing image: {str(e)}") from e
+
+    def _write(self, path, data):
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        # Write to a temporary file first so readers never see partial images
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            try:
+                replaced = os.stat(path).st_size
+            except FileNotFoundError:
+                replaced = 0
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        with self._size_lock:
+            if self._size is not None:
+                self._size += len(data) - replaced
+
+    def _scan(self):
+        files = []
+        for directory, _, names in os.walk(self.root):
+            for name in names:
+                path = os.path.join(directory, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+        return files
+
+    def size(self):
+        """Return the total size of the cached files in bytes."""
+        with self._size_lock:
+            if self._size is None:
+                self._size = sum(size for _, size, _ in self._scan())
+            return self._size
+
+    def _evict(self):
+        if self.size() <= self.max_bytes:
+            return
+        with self._size_lock:
+            files = sorted(self._scan())
+            total = sum(size for _, size, _ in files)
+            # Evict down to 90% so every new file does not trigger a full scan
+            target = self.max_bytes * 0.9
+            for _, size, path in files:
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except FileNotFoundError:
+                    continue
+            self._size = total
+
+
+class ThumbnailPrewarmer:
+    """
+    Background pipeline filling the thumbnail cache ahead of requests.
+
+    Work runs on a thread pool with bounded concurrency. Variants that are
+    already cached or already queued are skipped, and once ``max_pending``
+    variants are queued further work is dropped rather than piling up.
+    """
+
+    def __init__(self, cache, widths, max_workers=4, max_pending=256):
+        """
+        Initialize the pipeline.
+
+        Args:
+            cache (ThumbnailCache): Cache to fill
+            widths (list): Widths to produce for every image
+            max_workers (int): Maximum concurrent upstream fetches
+            max_pending (int): Maximum queued variants before dropping work
+        """
+        self.cache = cache
+        self.widths = widths
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="thumbnail-prewarm"
+        )
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._stats = {
+            "scheduled": 0,
+            "warmed": 0,
+            "cached": 0,
+            "missing": 0,
+            "failed": 0,
+            "dropped": 0,
+            "seconds": 0.0,
+        }
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._stats[name] += amount
+
+    def submit(self, refs):
+        """
+        Queue thumbnails for warming.
+
+        Args:
+            refs (iterable): ``(db, bildnummer)`` pairs
+
+        Returns:
+            list: Futures of the queued variants
+        """
+        futures = []
+        for db, bildnummer in refs:
+            for width in self.widths:
+                key = (str(db), str(bildnummer), width)
+                try:
+                    if self.cache.contains(*key):
+                        self._count("cached")
+                        continue
+                except ThumbnailNotFound:
+                    self._count("missing")
+                    continue
+                with self._lock:
+                    if key in self._pending:
+                        continue
+                    if len(self._pending) >= self.max_pending:
+                        self._stats["dropped"] += 1
+                        continue
+                    self._pending.add(key)
+                    self._stats["scheduled"] += 1
+                futures.append(self._executor.submit(self._warm, key))
+        return futures
+
+    def submit_task(self, func, *args):
+        """Run func on the pipeline's thread pool, e.g. to look up the next page."""
+        return self._executor.submit(func, *args)
+
+    def warm(self, refs):
+        """Warm thumbnails and wait until they are all done."""
+        wait(self.submit(refs))
+
+    def _warm(self, key):
+        start = time.perf_counter()
+        try:
+            self.cache.get(*key)
+            self._count("warmed")
+        except ThumbnailNotFound:
+            self._count("missing")
+        except Exception as e:
+            logger.warning(f"Error pre-warming thumbnail {key}: {str(e)}")
+            self._count("failed")
+        finally:
+            self._count("seconds", time.perf_counter() - start)
+            with self._lock:
+                self._pending.discard(key)
+
+    def close(self):
+        """Stop accepting work and let queued variants finish in the background."""
+        self._executor.shutdown(wait=False)
+
+    def stats(self):
+        """Return the pipeline counters and current queue length."""
+        with self._lock:
+            return {**self._stats, "pending": len(self._pending)}
+
+
+def refs_from_hits(hits):
+    """Return the ``(db, bildnummer)`` pairs of Elasticsearch hits that have both."""
+    refs = []
+    for hit in hits:
+        source = hit.get("_source", {})
+        if source.get("db") and source.get("bildnummer"):
+            refs.append((source["db"], source["bildnummer"]))
+    return refs
+
+
+_cache = None
+_prewarmer = None
+_cache_lock = threading.Lock()
+
+
+def get_thumbnail_cache():
+    """Return the process-wide thumbnail cache configured from settings."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ThumbnailCache(
+                root=os.path.join(settings.MEDIA_ROOT, "thumbnails"),
+                max_bytes=settings.THUMBNAIL_CACHE_MAX_BYTES,
+                widths=settings.THUMBNAIL_WIDTHS,
+                image_format=settings.THUMBNAIL_FORMAT,
+                quality=settings.THUMBNAIL_QUALITY,
+                timeout=settings.THUMBNAIL_FETCH_TIMEOUT,
+            )
+        return _cache
+
+
+def get_thumbnail_prewarmer():
+    """Return the process-wide thumbnail pre-warming pipeline."""
+    global _prewarmer
+    cache = get_thumbnail_cache()
+    with _cache_lock:
+        if _prewarmer is None or _prewarmer.cache is not cache:
+            _prewarmer = ThumbnailPrewarmer(
+                cache,
+                widths=settings.THUMBNAIL_PREWARM_WIDTHS,
+                max_workers=settings.THUMBNAIL_PREWARM_WORKERS,
+                max_pending=settings.THUMBNAIL_PREWARM_MAX_PENDING,
+            )
+        return _prewarmer
+
+
+def reset_thumbnail_cache():
+    """Forget the process-wide thumbnail cache so it is rebuilt from settings."""
+    global _cache, _prewarmer
+    with _cache_lock:
+        _cache = None
+        _prewarmer = None
@@ -0,0 +1,173 @@
+import contextvars
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Upper bounds in milliseconds of the latency histogram buckets
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# Server-Timing descriptions of the recorded phases
+PHASE_DESCRIPTIONS = {
+    "es": "Elasticsearch round trip",
+    "es-took": "Elasticsearch took",
+    "serialize": "Response serialization",
+    "render": "Response rendering",
+    "compress": "Response compression",
+    "total": "Total",
+}
+
+
+class RequestTimings:
+    """Durations of the phases of one request, summed over repeated phases."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = {}
+
+    def record(self, phase, seconds):
+        """Add seconds to phase."""
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    def record_es_response(self, response, seconds):
+        """Record an Elasticsearch round trip and the server-side ``took`` of its response."""
+        self.record("es", seconds)
+        took = response.get("took") if hasattr(response, "get") else None
+        if isinstance(took, (int, float)):
+            self.record("es-took", took / 1000)
+
+    def elapsed(self):
+        """Return the seconds since the request started."""
+        return time.perf_counter() - self.started
+
+    def as_milliseconds(self):
+        """Return the phase durations in milliseconds."""
+        return {phase: round(seconds * 1000, 3) for phase, seconds in self.phases.items()}
+
+    def server_timing(self):
+        """Render the phases as a ``Server-Timing`` header value."""
+        entries = []
+        for phase, milliseconds in self.as_milliseconds().items():
+            entry = f"{phase};dur={milliseconds}"
+            if phase in PHASE_DESCRIPTIONS:
+                entry += f';desc="{PHASE_DESCRIPTIONS[phase]}"'
+            entries.append(entry)
+        return ", ".join(entries)
+
+
+_current = contextvars.ContextVar("request_timings", default=None)
+
+
+def start_request_timings():
+    """
+    Start collecting phase timings for the current request.
+
+    Returns:
+        tuple: The RequestTimings and a token for stop_request_timings
+    """
+    timings = RequestTimings()
+    return timings, _current.set(timings)
+
+
+def stop_request_timings(token):
+    """Stop collecting timings started with start_request_timings."""
+    _current.reset(token)
+
+
+def get_request_timings():
+    """Return the RequestTimings of the current request, or None outside a request."""
+    return _current.get()
+
+
+@contextmanager
+def timed(phase):
+    """Record the duration of the block as phase of the current request, if any."""
+    timings = _current.get()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if timings is not None:
+            timings.record(phase, time.perf_counter() - start)
+
+
+def record_es_call(response, started):
+    """
+    Record an Elasticsearch call of the current request, if any.
+
+    Args:
+        response (dict): Raw Elasticsearch response, for its ``took``
+        started (float): ``time.perf_counter()`` before the call was sent
+    """
+    timings = _current.get()
+    if timings is not None:
+        timings.record_es_response(response, time.perf_counter() - started)
+
+
+class LatencyHistogram:
+    """Cumulative latency histogram with fixed millisecond buckets."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, milliseconds):
+        """Count one observation."""
+        self.counts[bisect_left(self.buckets, milliseconds)] += 1
+        self.count += 1
+        self.sum += milliseconds
+
+    def snapshot(self):
+        """Return the bucket counts, cumulative per upper bound, with count and sum."""
+        cumulative = []
+        total = 0
+        for bound, count in zip(list(self.buckets) + ["+Inf"], self.counts):
+            total += count
+            cumulative.append((bound, total))
+        return {"buckets": cumulative, "count": self.count, "sum": round(self.sum, 3)}
+
+
+class EndpointLatencies:
+    """Per-endpoint, per-phase latency histograms of this process."""
+
+    def __init__(self):
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def observe(self, endpoint, phases):
+        """
+        Count the phase durations of one request.
+
+        Args:
+            endpoint (str): URL name of the endpoint
+            phases (dict): Phase durations in milliseconds
+        """
+        with self._lock:
+            for phase, milliseconds in phases.items():
+                histogram = self._histograms.get((endpoint, phase))
+                if histogram is None:
+                    histogram = self._histograms[(endpoint, phase)] = LatencyHistogram()
+                histogram.observe(milliseconds)
+
+    def snapshot(self):
+        """Return the histograms as ``{endpoint: {phase: snapshot}}``."""
+        with self._lock:
+            result = {}
+            for (endpoint, phase), histogram in sorted(self._histograms.items()):
+                result.setdefault(endpoint, {})[phase] = histogram.snapshot()
+            return result
+
+    def clear(self):
+        """Drop every histogram."""
+        with self._lock:
+            self._histograms.clear()
+
+
+_endpoint_latencies = EndpointLatencies()
+
+
+def get_endpoint_latencies():
+    """Return the process-wide per-endpoint latency histograms."""
+    return _endpoint_latencies
@@ -5,7 +5,21 @@ from rest_framework_simplejwt.views import (
     TokenRefreshView,
 )
 
-from .views import MediaAPIView, AggregationAPIView
+from .views import (
+    MediaAPIView,
+    BatchSearchAPIView,
+    ExportAPIView,
+    MediaListAPIView,
+    MediaDetailAPIView,
+    AggregationAPIView,
+    AsyncMediaAPIView,
+    AsyncAggregationAPIView,
+    PhotographerFacetAPIView,
+    PhotographerSuggestAPIView,
+    PoolStatsAPIView,
+    RequestTimingsAPIView,
+    ThumbnailAPIView,
+)
 
 # Create a router and register our viewsets with it
 router = DefaultRouter()
@@ -14,7 +28,19 @@ router = DefaultRouter()
 urlpatterns = [
     # API endpoints
     path("search/", MediaAPIView.as_view(), name="media-list"),
+    path("search/batch/", BatchSearchAPIView.as_view(), name="media-batch"),
+    path("search/export/", ExportAPIView.as_view(), name="media-export"),
+    path("media/", MediaListAPIView.as_view(), name="media-lookup"),
+    path("media/<str:media_id>/", MediaDetailAPIView.as_view(), name="media-detail"),
     path("aggregations/", AggregationAPIView.as_view(), name="aggregations-list"),
+    path("photographers/", PhotographerFacetAPIView.as_view(), name="photographer-facet"),
+    path("photographers/suggest/", PhotographerSuggestAPIView.as_view(), name="photographer-suggest"),
+    path("thumbnails/<str:db>/<str:bildnummer>/", ThumbnailAPIView.as_view(), name="thumbnail"),
+    path("pool-stats/", PoolStatsAPIView.as_view(), name="pool-stats"),
+    path("timings/", RequestTimingsAPIView.as_view(), name="request-timings"),
+    # Async endpoints, for deployments served by an ASGI server
+    path("async/search/", AsyncMediaAPIView.as_view(), name="async-media-list"),
+    path("async/aggregations/", AsyncAggregationAPIView.as_view(), name="async-aggregations-list"),
     # Authentication endpoints
     path("token/", TokenObtainPairView.as_view(), name="token_obtain_pair"),
     path("token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
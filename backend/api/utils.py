@@ -1,3 +1,6 @@
+import base64
+import json
+
 from django.conf import settings
 
 
@@ -14,3 +17,40 @@ def get_media_url(db, bildnummer):
     """
     padded_id = str(bildnummer).zfill(10)
     return f"{settings.IMAGO_BASE_URL}/bild/{db}/{padded_id}/s.jpg"
+
+
+def encode_cursor(data):
+    """
+    Encode pagination state as an opaque, URL-safe cursor token.
+
+    Args:
+        data (dict): JSON-serializable cursor state
+
+    Returns:
+        str: The cursor token
+    """
+    payload = json.dumps(data, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token):
+    """
+    Decode a cursor token produced by encode_cursor.
+
+    Args:
+        token (str): The cursor token
+
+    Returns:
+        dict: The cursor state
+
+    Raises:
+        ValueError: If the token is malformed
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (TypeError, ValueError, UnicodeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(data, dict):
+        raise ValueError("Invalid cursor")
+    return data
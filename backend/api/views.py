@@ -1,17 +1,183 @@
 from django.shortcuts import render
+import csv
+import hashlib
+import itertools
+import json
 import logging
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.views import View
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
 
-from .serializers import SearchQuerySerializer, ElasticsearchResponseSerializer, GlobalAggregationsSerializer
-from .services import ElasticsearchService
+from .serializers import (
+    SearchQuerySerializer,
+    ExportQuerySerializer,
+    GlobalAggregationsSerializer,
+    MEDIA_FIELDS,
+    MediaLookupSerializer,
+    PhotographerFacetSerializer,
+    PhotographerSuggestSerializer,
+    serialize_hits,
+    serialize_search_response,
+)
+from .services import (
+    AsyncElasticsearchService,
+    ElasticsearchService,
+    InvalidCursorError,
+    get_pool_stats,
+)
+from .cache import get_aggregations_cache, get_photographer_facet_cache, make_query_key
+from .metrics import observe_result_size, render_metrics
+from .renderers import ORJSONResponse
+from .resilience import ElasticsearchUnavailable, deadline_budget
+from .suggest import get_photographer_index
+from .timing import get_endpoint_latencies, timed
+from .utils import encode_cursor
+from .thumbnails import (
+    ThumbnailError,
+    ThumbnailNotFound,
+    get_thumbnail_cache,
+    get_thumbnail_prewarmer,
+    refs_from_hits,
+)
 
 logger = logging.getLogger(__name__)
 
 
+def collect_search_results(results):
+    """Pick the parts of a raw Elasticsearch search response the API returns."""
+    return {
+        "total": results.get("hits", {}).get("total", {}).get("value", 0),
+        "aggregations": results.get("aggregations", {}),
+        "results": results.get("hits", {}).get("hits", []),
+    }
+
+
+def unavailable_response(error, response_class=Response):
+    """
+    Answer a request Elasticsearch could not serve with 503 Service Unavailable.
+
+    Args:
+        error (ElasticsearchUnavailable): Why the cluster could not answer
+        response_class: Response class used to render the error
+
+    Returns:
+        HttpResponse: The error with a Retry-After header
+    """
+    response = response_class(
+        {"error": "The search service is temporarily unavailable, please retry shortly"},
+        status=status.HTTP_503_SERVICE_UNAVAILABLE,
+    )
+    response["Retry-After"] = str(error.retry_after)
+    return response
+
+
+def serialize_global_aggregations(aggregations_data):
+    """
+    Validate and serialize global aggregations for caching.
+
+    Args:
+        aggregations_data (dict): Raw Elasticsearch aggregations response
+
+    Returns:
+        dict: Serialized aggregations and their ETag
+
+    Raises:
+        ValidationError: If the aggregations are malformed
+    """
+    serializer = GlobalAggregationsSerializer(data=aggregations_data.get("all_docs", {}))
+    if not serializer.is_valid():
+        raise ValidationError(serializer.errors)
+    data = dict(serializer.data)
+    return {"data": data, "etag": _make_etag(data)}
+
+
+def serialize_photographer_facet_page(page):
+    """
+    Serialize a photographer facet page for caching.
+
+    Args:
+        page (dict): Output of ElasticsearchService.get_photographer_facet_page
+
+    Returns:
+        dict: The page, with the after key as an opaque ``next`` token, and its ETag
+    """
+    data = {
+        "buckets": page["buckets"],
+        "next": encode_cursor(page["after_key"]) if page["after_key"] else None,
+    }
+    return {"data": data, "etag": _make_etag(data)}
+
+
+def make_search_etag(params, generation):
+    """
+    Build the ETag of a search response from its parameters and the index generation.
+
+    Args:
+        params (dict): Validated search parameters
+        generation (str): Index generation marker, None if unknown
+
+    Returns:
+        str: Quoted ETag, or None if the response cannot be validated
+    """
+    if generation is None:
+        return None
+    return quote_etag(_make_etag([make_query_key(params), generation]))
+
+
+def not_modified_search_response(request, etag):
+    """
+    Answer a search whose results the client already has with 304 Not Modified.
+
+    Returns:
+        HttpResponse: 304 Not Modified, or None if the client's copy is outdated
+    """
+    response = get_conditional_response(request, etag=etag)
+    if response is not None:
+        set_search_validators(response, etag)
+    return response
+
+
+def set_search_validators(response, etag):
+    """Set the ETag of a search response and ask clients to revalidate it."""
+    response["ETag"] = etag
+    patch_cache_control(response, no_cache=True)
+
+
+def _make_etag(data):
+    return hashlib.md5(json.dumps(data, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def conditional_aggregations_response(request, entry, response_class):
+    """
+    Answer an aggregations request from a cache entry, honouring conditional headers.
+
+    Args:
+        request: The HTTP request
+        entry (CacheEntry): Cached output of serialize_global_aggregations
+        response_class: Response class used to render the aggregations
+
+    Returns:
+        HttpResponse: 304 Not Modified, or the aggregations with validators set
+    """
+    etag = quote_etag(entry.value["etag"])
+    last_modified = int(entry.created_at)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = response_class(entry.value["data"])
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
 class MediaAPIView(APIView):
     """
     ViewSet for handling media search operations.
@@ -38,24 +204,54 @@ class MediaAPIView(APIView):
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+        params = serializer.validated_data
+        strict = settings.SEARCH_RESPONSE_STRICT
+        # Strict validation needs complete documents, so only project the response
+        search_params = {**params, "fields": []} if strict else params
+        etag = None
+        degraded = None
         try:
-            results = self.es_service.search(serializer.validated_data)
-            results_dict = {
-                "total": results.get("hits", {}).get("total", {}).get("value", 0),
-                "aggregations": results.get("aggregations", {}),
-                "results": results.get("hits", {}).get("hits", []),
-            }
-            # Pass the raw response directly to the serializer
-            response_serializer = ElasticsearchResponseSerializer(data=results_dict)
-            if not response_serializer.is_valid():
-                logger.error(
-                    f"Serializer validation error: {response_serializer.errors}"
-                )
+            # The generation lookup and the search share one budget
+            with deadline_budget():
+                if params["pagination"] != "cursor":
+                    # Results the client already has are confirmed without searching or rendering
+                    etag = make_search_etag(params, self.es_service.get_index_generation())
+                    not_modified = etag and not_modified_search_response(request, etag)
+                    if not_modified:
+                        return not_modified
+                try:
+                    results = self.es_service.search(search_params)
+                except ElasticsearchUnavailable as e:
+                    logger.warning(f"Elasticsearch unavailable, degrading media search: {str(e)}")
+                    results, degraded = self.es_service.search_degraded(search_params, e)
+            results_dict = collect_search_results(results)
+            observe_result_size(request.resolver_match.url_name, len(results_dict["results"]))
+            if params["pagination"] == "cursor":
+                results_dict["next_cursor"] = self.es_service.get_next_cursor(params, results)
+            if settings.THUMBNAIL_PREWARM_ENABLED and degraded is None:
+                self._prewarm_thumbnails(params, results_dict["results"])
+            try:
+                with timed("serialize"):
+                    data = serialize_search_response(
+                        results_dict, strict=strict, fields=params["fields"]
+                    )
+            except ValidationError as e:
+                logger.error(f"Serializer validation error: {e.detail}")
                 return Response(
                     {"error": "Error processing search results"},
                     status=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 )
-            return Response(response_serializer.data)
+            response = Response(data)
+            if degraded:
+                response["X-Search-Degraded"] = degraded
+            elif etag:
+                set_search_validators(response, etag)
+            return response
+        except InvalidCursorError as e:
+            return Response({"cursor": [str(e)]}, status=status.HTTP_400_BAD_REQUEST)
+        except ElasticsearchUnavailable as e:
+            logger.error(f"Elasticsearch unavailable for media search: {str(e)}")
+            return unavailable_response(e)
         except Exception as e:
             logger.error(f"Error in media search: {str(e)}")
             return Response(
@@ -63,6 +259,285 @@ class MediaAPIView(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
 
+    def _prewarm_thumbnails(self, params, hits):
+        """Warm the thumbnail cache for this page and, once the client pages on, the next one."""
+        prewarmer = get_thumbnail_prewarmer()
+        prewarmer.submit(refs_from_hits(hits))
+        # The next page costs another search, so it is only looked up for
+        # clients that have already moved past the first page
+        if (
+            settings.THUMBNAIL_PREWARM_NEXT_PAGE
+            and params["pagination"] == "page"
+            and params["page"] > 1
+            and len(hits) == params["page_size"]
+        ):
+            prewarmer.submit_task(self._prewarm_next_page, params)
+
+    def _prewarm_next_page(self, params):
+        # Also leaves the next page in the search cache for when it is requested
+        try:
+            results = self.es_service.search({**params, "page": params["page"] + 1})
+        except Exception as e:
+            logger.warning(f"Error looking up next page for thumbnail pre-warming: {str(e)}")
+            return
+        get_thumbnail_prewarmer().submit(refs_from_hits(results.get("hits", {}).get("hits", [])))
+
+
+class BatchSearchAPIView(APIView):
+    """
+    API view running several searches in a single Elasticsearch round trip.
+    """
+
+    permission_classes = []
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.es_service = ElasticsearchService()
+
+    def post(self, request):
+        """
+        Run a batch of searches with _msearch.
+
+        The body is ``{"searches": [...]}`` where every item takes the same
+        parameters as ``/api/search/``. Each search gets its own entry in
+        ``responses`` with a ``status`` and either the results or the errors,
+        so one failing search does not fail the batch.
+        """
+        payloads = request.data.get("searches") if isinstance(request.data, dict) else None
+        if not isinstance(payloads, list) or not payloads:
+            return Response(
+                {"searches": ["A non-empty list of searches is required."]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if len(payloads) > settings.SEARCH_BATCH_MAX_SIZE:
+            return Response(
+                {"searches": [f"At most {settings.SEARCH_BATCH_MAX_SIZE} searches are allowed per batch."]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        strict = settings.SEARCH_RESPONSE_STRICT
+        responses = [None] * len(payloads)
+        valid = []
+        for position, payload in enumerate(payloads):
+            serializer = SearchQuerySerializer(data=payload if isinstance(payload, dict) else {})
+            if not serializer.is_valid():
+                responses[position] = {"status": status.HTTP_400_BAD_REQUEST, "errors": serializer.errors}
+            elif serializer.validated_data["pagination"] == "cursor":
+                responses[position] = {
+                    "status": status.HTTP_400_BAD_REQUEST,
+                    "errors": {"pagination": ["Cursor pagination is not supported in batch searches."]},
+                }
+            else:
+                valid.append((position, serializer.validated_data))
+
+        results = []
+        try:
+            if valid:
+                results = self.es_service.msearch(
+                    [{**params, "fields": []} if strict else params for _, params in valid]
+                )
+        except ElasticsearchUnavailable as e:
+            logger.error(f"Elasticsearch unavailable for batch media search: {str(e)}")
+            return unavailable_response(e)
+        except Exception as e:
+            logger.error(f"Error in batch media search: {str(e)}")
+            return Response(
+                {"error": "An error occurred while searching media items"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
+        for (position, params), result in zip(valid, results):
+            if "error" in result:
+                responses[position] = {
+                    "status": result.get("status", status.HTTP_500_INTERNAL_SERVER_ERROR),
+                    "error": "An error occurred while searching media items",
+                }
+                continue
+            try:
+                with timed("serialize"):
+                    data = serialize_search_response(
+                        collect_search_results(result), strict=strict, fields=params["fields"]
+                    )
+            except ValidationError as e:
+                logger.error(f"Serializer validation error: {e.detail}")
+                responses[position] = {
+                    "status": status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    "error": "Error processing search results",
+                }
+                continue
+            responses[position] = {"status": status.HTTP_200_OK, **data}
+
+        return Response({"responses": responses})
+
+
+class _Echo:
+    """File-like object whose write() returns the value, for streaming csv rows."""
+
+    def write(self, value):
+        return value
+
+
+class ExportAPIView(APIView):
+    """
+    API view streaming every hit of a search as NDJSON or CSV.
+    """
+
+    permission_classes = []
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.es_service = ElasticsearchService()
+
+    def perform_content_negotiation(self, request, force=False):
+        # The export format is chosen by export_format, not the Accept header
+        return super().perform_content_negotiation(request, force=True)
+
+    def get(self, request):
+        """
+        Export all media items matching the search parameters.
+
+        Accepts the ``/api/search/`` filters plus ``fields`` and
+        ``export_format`` (``ndjson`` or ``csv``). Rows are produced batch by
+        batch while the response streams, so memory use stays constant.
+        """
+        serializer = ExportQuerySerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        params = serializer.validated_data
+        batches = self.es_service.iter_hit_batches(params)
+        try:
+            # Fetch the first batch eagerly so cluster errors still produce a 500
+            first_batch = next(batches, None)
+        except ElasticsearchUnavailable as e:
+            logger.error(f"Elasticsearch unavailable for media export: {str(e)}")
+            return unavailable_response(e)
+        except Exception as e:
+            logger.error(f"Error in media export: {str(e)}")
+            return Response(
+                {"error": "An error occurred while exporting media items"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+        if first_batch is not None:
+            batches = itertools.chain([first_batch], batches)
+        else:
+            batches = iter(())
+
+        fields = params["fields"] or list(MEDIA_FIELDS)
+        if params["export_format"] == "csv":
+            rows, content_type = self._csv_rows(batches, fields), "text/csv"
+        else:
+            rows, content_type = self._ndjson_rows(batches, fields), "application/x-ndjson"
+
+        response = StreamingHttpResponse(rows, content_type=content_type)
+        response["Content-Disposition"] = (
+            f'attachment; filename="media-export.{params["export_format"]}"'
+        )
+        return response
+
+    def _items(self, batches, fields):
+        try:
+            for batch in batches:
+                yield from serialize_hits(batch, fields=fields)
+        except Exception as e:
+            # Headers are already sent: re-raise so the server aborts the
+            # response instead of ending it like a complete export
+            logger.error(f"Error in media export: {str(e)}")
+            raise
+
+    def _ndjson_rows(self, batches, fields):
+        for item in self._items(batches, fields):
+            yield json.dumps({"id": item["id"], **item["source"]}) + "\n"
+
+    def _csv_rows(self, batches, fields):
+        writer = csv.writer(_Echo())
+        yield writer.writerow(["id"] + fields)
+        for item in self._items(batches, fields):
+            yield writer.writerow([item["id"]] + [item["source"].get(name) for name in fields])
+
+
+class MediaListAPIView(APIView):
+    """
+    API view resolving several media items by ID in one round trip.
+    """
+
+    permission_classes = []
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.es_service = ElasticsearchService()
+
+    def get(self, request):
+        """
+        Retrieve the media items listed in ``ids`` (repeated or comma-separated).
+
+        Items are returned in the requested order; IDs that do not exist are
+        listed in ``missing``.
+        """
+        serializer = MediaLookupSerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        media_ids = serializer.validated_data["ids"]
+        try:
+            documents = self.es_service.get_by_ids(media_ids)
+            with timed("serialize"):
+                results = serialize_hits(
+                    [documents[media_id] for media_id in media_ids if media_id in documents],
+                    strict=settings.SEARCH_RESPONSE_STRICT,
+                )
+        except ElasticsearchUnavailable as e:
+            logger.error(f"Elasticsearch unavailable for media lookup: {str(e)}")
+            return unavailable_response(e)
+        except Exception as e:
+            logger.error(f"Error in media lookup: {str(e)}")
+            return Response(
+                {"error": "An error occurred while retrieving media items"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+        return Response({
+            "results": results,
+            "missing": [media_id for media_id in media_ids if media_id not in documents],
+        })
+
+
+class MediaDetailAPIView(APIView):
+    """
+    API view retrieving a single media item by ID.
+    """
+
+    permission_classes = []
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.es_service = ElasticsearchService()
+
+    def get(self, request, media_id):
+        """
+        Retrieve a single media item.
+        """
+        try:
+            documents = self.es_service.get_by_ids([media_id])
+            if media_id not in documents:
+                return Response(
+                    {"error": "Media item not found"},
+                    status=status.HTTP_404_NOT_FOUND,
+                )
+            with timed("serialize"):
+                result = serialize_hits(
+                    [documents[media_id]], strict=settings.SEARCH_RESPONSE_STRICT
+                )[0]
+        except ElasticsearchUnavailable as e:
+            logger.error(f"Elasticsearch unavailable for media item {media_id}: {str(e)}")
+            return unavailable_response(e)
+        except Exception as e:
+            logger.error(f"Error retrieving media item {media_id}: {str(e)}")
+            return Response(
+                {"error": "An error occurred while retrieving the media item"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+        return Response(result)
+
 
 class AggregationAPIView(APIView):
     """
@@ -74,23 +549,321 @@ class AggregationAPIView(APIView):
         super().__init__(*args, **kwargs)
         self.es_service = ElasticsearchService()
 
+    def _load_aggregations(self):
+        """
+        Fetch and serialize global aggregations, raising if they are invalid.
+
+        Returns:
+            dict: Serialized aggregations and their ETag
+        """
+        return serialize_global_aggregations(self.es_service.get_global_aggregations())
+
     def get(self, request):
         """
         Retrieve global aggregations for filter options.
+
+        Results are cached and revalidated with ETag/Last-Modified, so
+        clients holding a current copy receive 304 Not Modified.
         """
         try:
-            aggregations_data = self.es_service.get_global_aggregations()
-            serializer = GlobalAggregationsSerializer(data=aggregations_data.get("all_docs", {}))
-            if not serializer.is_valid():
-                logger.error(f"Aggregation serializer validation error: {serializer.errors}")
-                return Response(
-                    {"error": "Error processing aggregations"},
-                    status=status.HTTP_500_INTERNAL_SERVER_ERROR
-                )
-            return Response(serializer.data)
+            entry = get_aggregations_cache().get_or_load("global", self._load_aggregations)
+        except ValidationError as e:
+            logger.error(f"Aggregation serializer validation error: {e.detail}")
+            return Response(
+                {"error": "Error processing aggregations"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+        except ElasticsearchUnavailable as e:
+            logger.error(f"Elasticsearch unavailable for aggregations: {str(e)}")
+            return unavailable_response(e)
         except Exception as e:
             logger.error(f"Error fetching aggregations: {str(e)}")
             return Response(
                 {"error": "An error occurred while fetching aggregations"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
+
+        return conditional_aggregations_response(request, entry, Response)
+
+
+class PhotographerSuggestAPIView(APIView):
+    """
+    API view suggesting photographers for a typed prefix.
+    """
+    permission_classes = []
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.es_service = ElasticsearchService()
+
+    def get(self, request):
+        """
+        Retrieve the photographers with most images that have a word starting with ``q``.
+
+        Matching ignores case and accents. Suggestions come from an in-memory
+        index of the global aggregations, rebuilt whenever those are refreshed.
+        """
+        serializer = PhotographerSuggestSerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            entry = get_aggregations_cache().get_or_load(
+                "global", lambda: serialize_global_aggregations(self.es_service.get_global_aggregations())
+            )
+        except ValidationError as e:
+            logger.error(f"Aggregation serializer validation error: {e.detail}")
+            return Response(
+                {"error": "Error processing aggregations"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+        except ElasticsearchUnavailable as e:
+            logger.error(f"Elasticsearch unavailable for photographer suggestions: {str(e)}")
+            return unavailable_response(e)
+        except Exception as e:
+            logger.error(f"Error fetching photographer suggestions: {str(e)}")
+            return Response(
+                {"error": "An error occurred while fetching photographer suggestions"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
+        params = serializer.validated_data
+        results = get_photographer_index(entry).suggest(params["q"], params["limit"])
+        response = Response({"results": results})
+        patch_cache_control(response, public=True, max_age=settings.PHOTOGRAPHER_SUGGEST_MAX_AGE)
+        return response
+
+
+class PhotographerFacetAPIView(APIView):
+    """
+    API view paging through every photographer with their image counts.
+    """
+    permission_classes = []
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.es_service = ElasticsearchService()
+
+    def get(self, request):
+        """
+        Retrieve one page of photographers in name order.
+
+        Pass the ``next`` token of a page as ``after`` to get the following
+        page; ``next`` is null on the last one. Pages are cached and honour
+        conditional headers like the global aggregations.
+        """
+        serializer = PhotographerFacetSerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        params = serializer.validated_data
+        size, after = params["size"], params.get("after")
+        key = f"{size}:{encode_cursor(after) if after else ''}"
+        try:
+            entry = get_photographer_facet_cache().get_or_load(
+                key,
+                lambda: serialize_photographer_facet_page(self.es_service.get_photographer_facet_page(size, after)),
+            )
+        except ElasticsearchUnavailable as e:
+            logger.error(f"Elasticsearch unavailable for photographer facet: {str(e)}")
+            return unavailable_response(e)
+        except Exception as e:
+            logger.error(f"Error fetching photographer facet: {str(e)}")
+            return Response(
+                {"error": "An error occurred while fetching photographers"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+        return conditional_aggregations_response(request, entry, Response)
+
+
+class AsyncMediaAPIView(View):
+    """
+    Asynchronous counterpart of MediaAPIView for ASGI deployments.
+
+    Searches are awaited on the shared AsyncElasticsearch client, so one
+    worker can keep many searches in flight. This needs an ASGI server: under
+    WSGI each request runs on a new event loop with a client of its own.
+    """
+
+    async def get(self, request):
+        """
+        Search for media items in Elasticsearch.
+
+        Args:
+            request: The HTTP request containing search parameters
+
+        Returns:
+            ORJSONResponse: The search results
+        """
+        serializer = SearchQuerySerializer(data=request.GET)
+        if not serializer.is_valid():
+            return ORJSONResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        params = serializer.validated_data
+        es_service = AsyncElasticsearchService()
+        strict = settings.SEARCH_RESPONSE_STRICT
+        search_params = {**params, "fields": []} if strict else params
+        etag = None
+        degraded = None
+        try:
+            with deadline_budget():
+                if params["pagination"] != "cursor":
+                    etag = make_search_etag(params, await es_service.get_index_generation())
+                    not_modified = etag and not_modified_search_response(request, etag)
+                    if not_modified:
+                        return not_modified
+                try:
+                    results = await es_service.search(search_params)
+                except ElasticsearchUnavailable as e:
+                    logger.warning(f"Elasticsearch unavailable, degrading media search: {str(e)}")
+                    results, degraded = await es_service.search_degraded(search_params, e)
+            results_dict = collect_search_results(results)
+            observe_result_size(request.resolver_match.url_name, len(results_dict["results"]))
+            if params["pagination"] == "cursor":
+                results_dict["next_cursor"] = await es_service.get_next_cursor(params, results)
+            try:
+                with timed("serialize"):
+                    data = serialize_search_response(
+                        results_dict, strict=strict, fields=params["fields"]
+                    )
+            except ValidationError as e:
+                logger.error(f"Serializer validation error: {e.detail}")
+                return ORJSONResponse(
+                    {"error": "Error processing search results"},
+                    status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                )
+            response = ORJSONResponse(data)
+            if degraded:
+                response["X-Search-Degraded"] = degraded
+            elif etag:
+                set_search_validators(response, etag)
+            return response
+        except InvalidCursorError as e:
+            return ORJSONResponse({"cursor": [str(e)]}, status=status.HTTP_400_BAD_REQUEST)
+        except ElasticsearchUnavailable as e:
+            logger.error(f"Elasticsearch unavailable for media search: {str(e)}")
+            return unavailable_response(e, ORJSONResponse)
+        except Exception as e:
+            logger.error(f"Error in media search: {str(e)}")
+            return ORJSONResponse(
+                {"error": "An error occurred while searching media items"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
+
+class AsyncAggregationAPIView(View):
+    """
+    Asynchronous counterpart of AggregationAPIView for ASGI deployments.
+    """
+
+    async def get(self, request):
+        """
+        Retrieve global aggregations for filter options.
+        """
+        es_service = AsyncElasticsearchService()
+
+        async def load_aggregations():
+            return serialize_global_aggregations(await es_service.get_global_aggregations())
+
+        try:
+            entry = await get_aggregations_cache().aget_or_load("global", load_aggregations)
+        except ValidationError as e:
+            logger.error(f"Aggregation serializer validation error: {e.detail}")
+            return ORJSONResponse(
+                {"error": "Error processing aggregations"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+        except ElasticsearchUnavailable as e:
+            logger.error(f"Elasticsearch unavailable for aggregations: {str(e)}")
+            return unavailable_response(e, ORJSONResponse)
+        except Exception as e:
+            logger.error(f"Error fetching aggregations: {str(e)}")
+            return ORJSONResponse(
+                {"error": "An error occurred while fetching aggregations"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
+        return conditional_aggregations_response(request, entry, ORJSONResponse)
+
+
+class ThumbnailAPIView(APIView):
+    """
+    API view serving resized Imago thumbnails from the local disk cache.
+    """
+
+    permission_classes = []
+
+    def perform_content_negotiation(self, request, force=False):
+        # Browsers request images with image/* Accept headers
+        return super().perform_content_negotiation(request, force=True)
+
+    def get(self, request, db, bildnummer):
+        """
+        Retrieve a thumbnail, fetching and resizing the upstream image once.
+
+        The width is chosen with ``w`` and must be one of THUMBNAIL_WIDTHS.
+        """
+        try:
+            width = int(request.query_params.get("w", settings.THUMBNAIL_DEFAULT_WIDTH))
+        except ValueError:
+            return Response({"w": ["A valid integer is required."]}, status=status.HTTP_400_BAD_REQUEST)
+
+        cache = get_thumbnail_cache()
+        try:
+            thumbnail = cache.open(db, bildnummer, width)
+        except ThumbnailNotFound:
+            return Response({"error": "Thumbnail not found"}, status=status.HTTP_404_NOT_FOUND)
+        except ThumbnailError as e:
+            logger.error(f"Error producing thumbnail {db}/{bildnummer}: {str(e)}")
+            return Response(
+                {"error": "An error occurred while fetching the image"},
+                status=status.HTTP_502_BAD_GATEWAY,
+            )
+
+        response = FileResponse(thumbnail, content_type=cache.content_type)
+        patch_cache_control(response, public=True, max_age=settings.THUMBNAIL_MAX_AGE, immutable=True)
+        return response
+
+
+class PoolStatsAPIView(APIView):
+    """
+    API view exposing the Elasticsearch connection pool state of this process.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        """
+        Retrieve connection pool statistics for the serving worker.
+        """
+        return Response(get_pool_stats())
+
+
+class RequestTimingsAPIView(APIView):
+    """
+    API view exposing the per-endpoint latency histograms of this process.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        """
+        Retrieve latency histograms per endpoint and phase, in milliseconds.
+        """
+        return Response(get_endpoint_latencies().snapshot())
+
+
+class MetricsView(View):
+    """
+    Prometheus scrape endpoint covering every worker of the deployment.
+
+    If METRICS_AUTH_TOKEN is set, scrapes must send it as a bearer token.
+    """
+
+    def get(self, request):
+        """
+        Render the metrics in the Prometheus text format.
+        """
+        token = settings.METRICS_AUTH_TOKEN
+        if token and request.headers.get("Authorization") != f"Bearer {token}":
+            return HttpResponse(status=status.HTTP_401_UNAUTHORIZED)
+        payload, content_type = render_metrics()
+        return HttpResponse(payload, content_type=content_type)
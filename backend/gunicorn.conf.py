@@ -0,0 +1,25 @@
+import glob
+import os
+
+# Share Prometheus samples between workers, so /metrics reports all of them
+# whichever worker serves the scrape. prometheus_client reads this variable
+# on import, so it must be set before the application is loaded.
+prometheus_dir = os.environ.get("PROMETHEUS_MULTIPROC_DIR") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "prometheus"
+)
+os.environ["PROMETHEUS_MULTIPROC_DIR"] = prometheus_dir
+
+
+def on_starting(server):
+    os.makedirs(prometheus_dir, exist_ok=True)
+    # Samples of a previous run would otherwise be added to this one's. Only
+    # prometheus_client's own files are removed, in case the variable points
+    # at a directory holding anything else.
+    for path in glob.glob(os.path.join(prometheus_dir, "*.db")):
+        os.remove(path)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
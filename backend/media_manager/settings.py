@@ -13,6 +13,7 @@ https://docs.djangoproject.com/en/5.0/ref/settings/
 import os
 from pathlib import Path
 from datetime import timedelta
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -54,6 +55,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "api.middleware.RequestTimingMiddleware",
+    "api.middleware.CompressionMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -93,6 +96,9 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        # Keep connections open across requests instead of reconnecting every time
+        "CONN_MAX_AGE": int(os.getenv('DB_CONN_MAX_AGE', '600')),
+        "CONN_HEALTH_CHECKS": True,
     }
 }
 
@@ -141,13 +147,39 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 # REST Framework settings
+# How JWT-authenticated requests get their user: "database" loads the row on
+# every request, "cached" at most every JWT_USER_CACHE_TTL seconds per worker,
+# and "stateless" never, building the user from the token claims (staff and
+# superuser flags then only change when a new refresh token is issued)
+JWT_AUTHENTICATION_CLASSES = {
+    'database': 'rest_framework_simplejwt.authentication.JWTAuthentication',
+    'cached': 'api.authentication.CachedJWTAuthentication',
+    'stateless': 'rest_framework_simplejwt.authentication.JWTStatelessUserAuthentication',
+}
+JWT_AUTH_MODE = os.getenv('JWT_AUTH_MODE', 'cached').lower()
+if JWT_AUTH_MODE not in JWT_AUTHENTICATION_CLASSES:
+    raise ImproperlyConfigured(
+        f"JWT_AUTH_MODE must be one of {', '.join(JWT_AUTHENTICATION_CLASSES)}, not {JWT_AUTH_MODE!r}"
+    )
+JWT_USER_CACHE_TTL = int(os.getenv('JWT_USER_CACHE_TTL', '60'))
+JWT_USER_CACHE_MAXSIZE = int(os.getenv('JWT_USER_CACHE_MAXSIZE', '1024'))
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        JWT_AUTHENTICATION_CLASSES[JWT_AUTH_MODE],
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'api.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'api.renderers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
     'DEFAULT_FILTER_BACKENDS': (
@@ -161,6 +193,7 @@ REST_FRAMEWORK = {
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=int(os.getenv('JWT_ACCESS_TOKEN_LIFETIME', '60'))),
     'REFRESH_TOKEN_LIFETIME': timedelta(minutes=int(os.getenv('JWT_REFRESH_TOKEN_LIFETIME', '1440'))),
+    'TOKEN_OBTAIN_SERIALIZER': 'api.authentication.ClaimsTokenObtainPairSerializer',
 }
 
 # CORS settings
@@ -175,46 +208,211 @@ ELASTICSEARCH_USERNAME = os.getenv('ELASTICSEARCH_USERNAME', 'elastic')
 ELASTICSEARCH_PASSWORD = os.getenv('ELASTICSEARCH_PASSWORD', 'rQQtbktwzFqAJS1h8YjP')
 ELASTICSEARCH_INDEX = os.getenv('ELASTICSEARCH_INDEX', 'imago')
 
+# Elasticsearch connection pool settings (one shared client per process)
+ELASTICSEARCH_CONNECTIONS_PER_NODE = int(os.getenv('ELASTICSEARCH_CONNECTIONS_PER_NODE', '10'))
+ELASTICSEARCH_KEEP_ALIVE = os.getenv('ELASTICSEARCH_KEEP_ALIVE', 'True').lower() == 'true'
+ELASTICSEARCH_HTTP_COMPRESS = os.getenv('ELASTICSEARCH_HTTP_COMPRESS', 'False').lower() == 'true'
+ELASTICSEARCH_REQUEST_TIMEOUT = float(os.getenv('ELASTICSEARCH_REQUEST_TIMEOUT', '10'))
+# Retries are sent within the deadline budget below, the first one after
+# ELASTICSEARCH_RETRY_BACKOFF_MS and every further one after twice as long
+ELASTICSEARCH_MAX_RETRIES = int(os.getenv('ELASTICSEARCH_MAX_RETRIES', '3'))
+ELASTICSEARCH_RETRY_BACKOFF_MS = int(os.getenv('ELASTICSEARCH_RETRY_BACKOFF_MS', '50'))
+ELASTICSEARCH_RETRY_ON_TIMEOUT = os.getenv('ELASTICSEARCH_RETRY_ON_TIMEOUT', 'True').lower() == 'true'
+ELASTICSEARCH_RETRY_ON_STATUS = [
+    int(code) for code in os.getenv('ELASTICSEARCH_RETRY_ON_STATUS', '429,502,503,504').split(',') if code
+]
+
+# Deep pagination: page-number mode stops at the index's max_result_window,
+# cursor mode keeps a point-in-time snapshot open for ELASTICSEARCH_PIT_KEEP_ALIVE
+ELASTICSEARCH_MAX_RESULT_WINDOW = int(os.getenv('ELASTICSEARCH_MAX_RESULT_WINDOW', '10000'))
+ELASTICSEARCH_PIT_KEEP_ALIVE = os.getenv('ELASTICSEARCH_PIT_KEEP_ALIVE', '1m')
+
+# Compiled search bodies: templates memoized per distinct search, optionally
+# sent to the transport as pre-serialized JSON bytes
+QUERY_CACHE_MAXSIZE = int(os.getenv('QUERY_CACHE_MAXSIZE', '1024'))
+ELASTICSEARCH_PRESERIALIZE_QUERIES = os.getenv('ELASTICSEARCH_PRESERIALIZE_QUERIES', 'False').lower() == 'true'
+
+# Page-mode searches through a stored mustache search template
+# (register it with `manage.py register_search_templates`). If the template
+# is missing, inline bodies are used and it is retried after the interval.
+ELASTICSEARCH_SEARCH_TEMPLATES = os.getenv('ELASTICSEARCH_SEARCH_TEMPLATES', 'False').lower() == 'true'
+ELASTICSEARCH_SEARCH_TEMPLATE_PREFIX = os.getenv('ELASTICSEARCH_SEARCH_TEMPLATE_PREFIX', 'media-search')
+ELASTICSEARCH_SEARCH_TEMPLATE_RETRY_INTERVAL = int(os.getenv('ELASTICSEARCH_SEARCH_TEMPLATE_RETRY_INTERVAL', '60'))
+
+# Load shedding. Every read waits at most ELASTICSEARCH_DEADLINE_BUDGET seconds
+# (shared by all calls of a search request). After
+# ELASTICSEARCH_CIRCUIT_FAILURE_THRESHOLD consecutive timeouts, connection errors
+# or 5xx/429 responses the circuit opens and calls fail immediately for
+# ELASTICSEARCH_CIRCUIT_RESET_TIMEOUT seconds, after which one probe is let through.
+ELASTICSEARCH_DEADLINE_BUDGET = float(os.getenv('ELASTICSEARCH_DEADLINE_BUDGET', '5'))
+ELASTICSEARCH_CIRCUIT_BREAKER_ENABLED = os.getenv('ELASTICSEARCH_CIRCUIT_BREAKER_ENABLED', 'True').lower() == 'true'
+ELASTICSEARCH_CIRCUIT_FAILURE_THRESHOLD = int(os.getenv('ELASTICSEARCH_CIRCUIT_FAILURE_THRESHOLD', '5'))
+ELASTICSEARCH_CIRCUIT_RESET_TIMEOUT = float(os.getenv('ELASTICSEARCH_CIRCUIT_RESET_TIMEOUT', '30'))
+# Send a second copy of a read still unanswered after this many milliseconds
+# and use whichever answers first; 0 disables hedging
+ELASTICSEARCH_HEDGE_DELAY_MS = int(os.getenv('ELASTICSEARCH_HEDGE_DELAY_MS', '0'))
+ELASTICSEARCH_HEDGE_WORKERS = int(os.getenv('ELASTICSEARCH_HEDGE_WORKERS', '16'))
+# Searches that fail while the cluster is unavailable are answered from an
+# expired cache entry, or retried without aggregations within this budget
+SEARCH_DEGRADED_RESPONSES = os.getenv('SEARCH_DEGRADED_RESPONSES', 'True').lower() == 'true'
+SEARCH_DEGRADED_BUDGET = float(os.getenv('SEARCH_DEGRADED_BUDGET', '1'))
+
+# Validate every search hit through the DRF serializers (slow, for debugging)
+SEARCH_RESPONSE_STRICT = os.getenv('SEARCH_RESPONSE_STRICT', 'False').lower() == 'true'
+
+# Media lookups by id: maximum ids per request and the per-document cache
+MEDIA_LOOKUP_MAX_IDS = int(os.getenv('MEDIA_LOOKUP_MAX_IDS', '100'))
+MEDIA_CACHE_MAXSIZE = int(os.getenv('MEDIA_CACHE_MAXSIZE', '5000'))
+MEDIA_CACHE_TTL = int(os.getenv('MEDIA_CACHE_TTL', '600'))
+
+# Global aggregations cache: served fresh for the TTL, then served stale for up
+# to AGGREGATIONS_CACHE_STALE_TTL seconds while it is refreshed in the background.
+# Set AGGREGATIONS_CACHE_BACKEND to a CACHES alias to share entries across workers.
+AGGREGATIONS_CACHE_TTL = int(os.getenv('AGGREGATIONS_CACHE_TTL', '300'))
+AGGREGATIONS_CACHE_STALE_TTL = int(os.getenv('AGGREGATIONS_CACHE_STALE_TTL', '3600'))
+AGGREGATIONS_CACHE_BACKEND = os.getenv('AGGREGATIONS_CACHE_BACKEND', '')
+
+# Pages of the /api/photographers/ facet, cached like the global aggregations
+PHOTOGRAPHER_FACET_CACHE_TTL = int(os.getenv('PHOTOGRAPHER_FACET_CACHE_TTL', '300'))
+PHOTOGRAPHER_FACET_CACHE_STALE_TTL = int(os.getenv('PHOTOGRAPHER_FACET_CACHE_STALE_TTL', '3600'))
+PHOTOGRAPHER_FACET_CACHE_MAXSIZE = int(os.getenv('PHOTOGRAPHER_FACET_CACHE_MAXSIZE', '256'))
+
+# Browser cache lifetime of /api/photographers/suggest/ answers, in seconds
+PHOTOGRAPHER_SUGGEST_MAX_AGE = int(os.getenv('PHOTOGRAPHER_SUGGEST_MAX_AGE', '60'))
+
+# Search result cache: raw responses keyed on the normalized search parameters
+SEARCH_CACHE_ENABLED = os.getenv('SEARCH_CACHE_ENABLED', 'True').lower() == 'true'
+SEARCH_CACHE_MAXSIZE = int(os.getenv('SEARCH_CACHE_MAXSIZE', '512'))
+SEARCH_CACHE_TTL = int(os.getenv('SEARCH_CACHE_TTL', '60'))
+# Expired responses are kept this much longer, to answer searches while the cluster is unavailable
+SEARCH_CACHE_STALE_TTL = int(os.getenv('SEARCH_CACHE_STALE_TTL', '600'))
+
+# /api/search/ responses carry an ETag built from the normalized query and an
+# index generation marker, read from the index stats at most every
+# INDEX_GENERATION_TTL seconds; If-None-Match is then answered with 304 without
+# searching. Cached searches are keyed on the marker too.
+SEARCH_ETAG_ENABLED = os.getenv('SEARCH_ETAG_ENABLED', 'True').lower() == 'true'
+INDEX_GENERATION_TTL = int(os.getenv('INDEX_GENERATION_TTL', '10'))
+
+# Identical searches and aggregation loads running at the same time share one
+# Elasticsearch call. Set SINGLEFLIGHT_BACKEND to a CACHES alias to also
+# coalesce them across workers, through a lock held in that cache.
+SINGLEFLIGHT_ENABLED = os.getenv('SINGLEFLIGHT_ENABLED', 'True').lower() == 'true'
+SINGLEFLIGHT_BACKEND = os.getenv('SINGLEFLIGHT_BACKEND', '')
+SINGLEFLIGHT_LOCK_TIMEOUT = int(os.getenv('SINGLEFLIGHT_LOCK_TIMEOUT', '10'))
+SINGLEFLIGHT_RESULT_TTL = int(os.getenv('SINGLEFLIGHT_RESULT_TTL', '5'))
+SINGLEFLIGHT_POLL_INTERVAL_MS = int(os.getenv('SINGLEFLIGHT_POLL_INTERVAL_MS', '20'))
+
+# Maximum number of searches accepted by /api/search/batch/
+SEARCH_BATCH_MAX_SIZE = int(os.getenv('SEARCH_BATCH_MAX_SIZE', '20'))
+
+# Hits fetched per request while streaming /api/search/export/
+EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', '1000'))
+
+# Per-query aggregations reused across pages of a search made with aggs=auto
+SEARCH_AGGREGATIONS_CACHE_MAXSIZE = int(os.getenv('SEARCH_AGGREGATIONS_CACHE_MAXSIZE', '1024'))
+SEARCH_AGGREGATIONS_CACHE_TTL = int(os.getenv('SEARCH_AGGREGATIONS_CACHE_TTL', '300'))
+
 IMAGO_BASE_URL = os.getenv('IMAGO_BASE_URL', 'https://www.imago-images.de')
 
 # Media settings
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
-# # Logging configuration
-# LOGGING = {
-#     'version': 1,
-#     'disable_existing_loggers': False,
-#     'formatters': {
-#         'verbose': {
-#             'format': '{levelname} {asctime} {module} {process:d} {thread:d} {message}',
-#             'style': '{',
-#         },
-#     },
-#     'handlers': {
-#         'console': {
-#             'class': 'logging.StreamHandler',
-#             'formatter': 'verbose',
-#         },
-#         'file': {
-#             'class': 'logging.FileHandler',
-#             'filename': os.path.join(BASE_DIR, 'logs', 'debug.log'),
-#             'formatter': 'verbose',
-#         },
-#     },
-#     'loggers': {
-#         'django': {
-#             'handlers': ['console', 'file'],
-#             'level': 'INFO',
-#             'propagate': True,
-#         },
-#         'api': {
-#             'handlers': ['console', 'file'],
-#             'level': 'DEBUG',
-#             'propagate': True,
-#         },
-#     },
-# }
-
-# # Create logs directory if it doesn't exist
-# os.makedirs(os.path.join(BASE_DIR, 'logs'), exist_ok=True)
+# Thumbnail proxy: resized Imago images cached under MEDIA_ROOT/thumbnails
+THUMBNAIL_WIDTHS = [int(width) for width in os.getenv('THUMBNAIL_WIDTHS', '160,320,640').split(',') if width]
+THUMBNAIL_DEFAULT_WIDTH = int(os.getenv('THUMBNAIL_DEFAULT_WIDTH', '320'))
+THUMBNAIL_FORMAT = os.getenv('THUMBNAIL_FORMAT', 'WEBP')
+THUMBNAIL_QUALITY = int(os.getenv('THUMBNAIL_QUALITY', '80'))
+THUMBNAIL_CACHE_MAX_BYTES = int(os.getenv('THUMBNAIL_CACHE_MAX_BYTES', str(1024 * 1024 * 1024)))
+THUMBNAIL_FETCH_TIMEOUT = float(os.getenv('THUMBNAIL_FETCH_TIMEOUT', '10'))
+THUMBNAIL_MAX_AGE = int(os.getenv('THUMBNAIL_MAX_AGE', str(60 * 60 * 24 * 365)))
+
+# Warm the thumbnail cache for the current page of every search
+THUMBNAIL_PREWARM_ENABLED = os.getenv('THUMBNAIL_PREWARM_ENABLED', 'False').lower() == 'true'
+# Also search for and warm the next page once a client has paged past the first,
+# at the cost of one extra Elasticsearch search per page
+THUMBNAIL_PREWARM_NEXT_PAGE = os.getenv('THUMBNAIL_PREWARM_NEXT_PAGE', 'False').lower() == 'true'
+THUMBNAIL_PREWARM_WIDTHS = [
+    int(width) for width in os.getenv('THUMBNAIL_PREWARM_WIDTHS', str(THUMBNAIL_DEFAULT_WIDTH)).split(',') if width
+]
+THUMBNAIL_PREWARM_WORKERS = int(os.getenv('THUMBNAIL_PREWARM_WORKERS', '4'))
+THUMBNAIL_PREWARM_MAX_PENDING = int(os.getenv('THUMBNAIL_PREWARM_MAX_PENDING', '256'))
+
+# Request timing: Server-Timing headers, one JSON log line per request on the
+# api.timing logger and per-endpoint latency histograms (see /api/timings/)
+REQUEST_TIMING_ENABLED = os.getenv('REQUEST_TIMING_ENABLED', 'True').lower() == 'true'
+REQUEST_TIMING_PATH_PREFIX = os.getenv('REQUEST_TIMING_PATH_PREFIX', '/api/')
+
+# Prometheus metrics of timed requests, scraped at /metrics. Under multiple
+# workers also set PROMETHEUS_MULTIPROC_DIR (see gunicorn.conf.py).
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True').lower() == 'true'
+METRICS_AUTH_TOKEN = os.getenv('METRICS_AUTH_TOKEN', '')
+# Under PROMETHEUS_MULTIPROC_DIR, how often each worker publishes its cache,
+# connection pool and circuit breaker state between scrapes, in seconds
+METRICS_WORKER_SYNC_INTERVAL = int(os.getenv('METRICS_WORKER_SYNC_INTERVAL', '15'))
+
+# Compress JSON, NDJSON, CSV and text responses of at least COMPRESSION_MIN_SIZE
+# bytes with brotli (if installed) or gzip, as the client accepts. Brotli quality
+# 4 and gzip level 6 trade ratio for speed on per-request dynamic content.
+COMPRESSION_ENABLED = os.getenv('COMPRESSION_ENABLED', 'True').lower() == 'true'
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', '1024'))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv('COMPRESSION_BROTLI_QUALITY', '4'))
+COMPRESSION_GZIP_LEVEL = int(os.getenv('COMPRESSION_GZIP_LEVEL', '6'))
+
+# Logging configuration
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+LOG_FILE = os.getenv('LOG_FILE', '')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'verbose': {
+            'format': '{levelname} {asctime} {module} {process:d} {thread:d} {message}',
+            'style': '{',
+        },
+        # Timing records are already JSON, so keep the line parseable
+        'structured': {
+            'format': '{message}',
+            'style': '{',
+        },
+    },
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'verbose',
+        },
+        'structured': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'structured',
+        },
+    },
+    'loggers': {
+        'django': {
+            'handlers': ['console'],
+            'level': LOG_LEVEL,
+            'propagate': True,
+        },
+        'api': {
+            'handlers': ['console'],
+            'level': LOG_LEVEL,
+            'propagate': False,
+        },
+        'api.timing': {
+            'handlers': ['structured'],
+            'level': os.getenv('REQUEST_TIMING_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
+
+if LOG_FILE:
+    os.makedirs(os.path.dirname(LOG_FILE) or '.', exist_ok=True)
+    LOGGING['handlers']['file'] = {
+        'class': 'logging.FileHandler',
+        'filename': LOG_FILE,
+        'formatter': 'verbose',
+    }
+    for logger_name in ('django', 'api'):
+        LOGGING['loggers'][logger_name]['handlers'].append('file')